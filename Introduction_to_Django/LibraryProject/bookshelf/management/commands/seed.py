@@ -0,0 +1,70 @@
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookshelf.models import Book
+
+
+
+# The one generator of synthetic books in this project. The projects in this
+# repository are separate and cannot import each other, so the vocabulary
+# and Zipf weights follow advanced-api-project's api/seeding.py by hand,
+# which keeps seeded data shaped alike everywhere.
+SYLLABLES = [
+    'an', 'bel', 'cor', 'da', 'el', 'fin', 'gar', 'hel', 'ir', 'jo', 'ka', 'lin', 'mar', 'nor', 'o',
+    'per', 'qui', 'ros', 'sa', 'tor', 'u', 'val', 'wen', 'xi', 'yor', 'zan',
+]
+
+
+def make_words(count, rng):
+    return [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights of a Zipf distribution over `count` ranks."""
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = "Add synthetic books, with power-law books per author (--skew)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10_000, help="Books to create.")
+        parser.add_argument('--authors', type=int, default=500, help="Distinct author names the books are spread over.")
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help="Zipf exponent of books per author; 0 spreads books evenly (default 1.1).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Books per bulk_create and transaction.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+
+    def handle(self, *args, **options):
+        if options['books'] < 0 or options['skew'] < 0 or options['authors'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--books and --skew cannot be negative; --authors and --chunk-size must be positive.")
+
+        start = time.perf_counter()
+        rng = random.Random(options['seed'])
+        words = make_words(3000, rng)
+        authors = ['%s %s' % (rng.choice(words).title(), rng.choice(words).title()) for _ in range(options['authors'])]
+        author_weights = zipf_weights(len(authors), options['skew'])
+        word_weights = zipf_weights(len(words), 1.0)
+
+        created = 0
+        while created < options['books']:
+            size = min(options['chunk_size'], options['books'] - created)
+            books = [
+                Book(
+                    title=' '.join(rng.choices(words, cum_weights=word_weights, k=rng.randint(1, 5))).capitalize(),
+                    author=author,
+                    publication_year=min(2025, int(rng.triangular(1850, 2026, 2010))),
+                )
+                for author in rng.choices(authors, cum_weights=author_weights, k=size)
+            ]
+            with transaction.atomic():
+                Book.objects.bulk_create(books)
+            created += size
+
+        self.stdout.write(self.style.SUCCESS("Created %d books in %.1f s." % (created, time.perf_counter() - start)))
@@ -44,10 +44,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
+    'api.throttling.RateLimitHeadersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,13 +78,84 @@ WSGI_APPLICATION = 'advanced_api_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuning profile. Django runs `init_command` on every new connection.
+# - journal_mode=WAL: readers keep reading while a writer commits
+# - synchronous=NORMAL: no fsync per commit; safe against application
+#   crashes under WAL, a power cut can only lose the last few commits
+# - mmap_size / cache_size: 128 MiB memory-mapped reads, ~20 MiB page cache
+# - timeout: wait up to 20 s for a lock instead of "database is locked"
+# - transaction_mode=IMMEDIATE: atomic blocks take the write lock at BEGIN,
+#   so two transactions can never deadlock upgrading a read lock (an error
+#   the busy timeout cannot wait out)
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        # Reuse connections for 10 minutes (checked before each request)
+        # instead of opening one per request. Set to 0 when serving over
+        # ASGI, where persistent connections are not reused.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas (see api/routers.py): aliases from DATABASES that GET
+# requests read from. To try it locally, add e.g.
+#     'replica1': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.replica1.sqlite3',
+#                  'OPTIONS': SQLITE_OPTIONS}
+# to DATABASES, list 'replica1' here and run `manage.py sync_replicas`.
+REPLICA_DATABASES = []
+
+# Upper bound on replica lag in seconds: how long a client that wrote keeps
+# reading from the primary, and how long responses read from a replica may
+# stay in the response cache.
+REPLICA_MAX_LAG = 5
+
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per-process; use a file or shared backend (Redis,
+# Memcached) in production so every worker sees the same generations.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'advanced-api-project',
     }
 }
 
+# Seconds a cached /api/books/ response lives (see api/cache.py)
+API_CACHE_TIMEOUT = 300
+
+# Change feed stream (see api/changes.py): seconds between polls for new
+# entries, and before the stream ends and the client reconnects
+API_CHANGES_POLL_INTERVAL = 1
+API_CHANGES_STREAM_TIMEOUT = 300
+
+# Author ids each process remembers for book validation (see api/validation.py)
+API_AUTHOR_CACHE_SIZE = 10_000
+
+# Request instrumentation (see api/instrumentation.py): send timings to
+# clients in a Server-Timing header (only while debugging, as they reveal
+# server internals), and log requests that run one query this many times.
+API_SERVER_TIMING = DEBUG
+API_REPEATED_QUERY_WARNING = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,9 +200,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 REST_FRAMEWORK = {
+    # Basic first so anonymous writes get 401 with a WWW-Authenticate header.
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.BasicAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
-    ]
+    ],
+    # Keyset pagination: deep pages cost the same as page one.
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    # Token buckets per client, scope and endpoint (see api/throttling.py).
+    'DEFAULT_THROTTLE_CLASSES': ['api.throttling.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': '1000/min',
+        'user_read': '5000/min',
+        'write': '300/min',
+    },
 }
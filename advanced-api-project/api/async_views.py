@@ -0,0 +1,236 @@
+"""
+ASYNC BOOK CRUD VIEWS
+---------------------
+DRF's generic views are synchronous. Under ASGI, Django runs each of them
+through sync_to_async, so every request holds a worker thread from
+authentication to rendering. The views below are async-native Django views
+that speak the same JSON as BookListView, BookDetailView and the
+create/update/delete views:
+
+- reads use the async ORM (aiterator, aget, aexists)
+- writes resolve the author with one async query and hand it to
+  BookSerializer through context['authors'] (see AuthorPrimaryKeyField), so
+  validation never touches the sync ORM; rows are written with acreate,
+  asave and adelete
+- authentication and the IsAuthenticatedOrReadOnly check are async too:
+  HTTP Basic through aauthenticate(), then the session through
+  request.auser()
+- requests draw on the same token buckets as the sync views
+  (see api/throttling.py)
+
+Filtering (?title=, ?author=, ?publication_year=), ?search=, ?ordering=
+and keyset pagination behave as on /api/books/. Caching, conditional GET
+and sparse fieldsets are left to the sync views.
+"""
+
+import base64
+import binascii
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import filters, status
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated, NotFound, PermissionDenied, Throttled,
+    ValidationError,
+)
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .models import Author, Book
+from .pagination import KeysetPagination
+from .search import FullTextSearchFilter
+from .serializers import BookSerializer
+from .throttling import TokenBucketThrottle
+
+
+async def aget_basic_user(request):
+    """The user named by an HTTP Basic header, None without one."""
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != 'basic':
+        return None
+    try:
+        username, _, password = base64.b64decode(auth[1]).decode().partition(':')
+    except (IndexError, binascii.Error, UnicodeDecodeError):
+        raise AuthenticationFailed('Invalid basic header.')
+    user = await aauthenticate(request, username=username, password=password)
+    if user is None or not user.is_active:
+        raise AuthenticationFailed('Invalid username/password.')
+    return user
+
+
+class AsyncBookView(View):
+    """Shared plumbing: DRF-style requests, errors and JSON responses."""
+
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    renderer = JSONRenderer()
+    www_authenticate = 'Basic realm="api"'
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # CSRF is only enforced for session-authenticated writes, as in DRF.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(request, parsers=[parser() for parser in self.parser_classes])
+        try:
+            # An unsupported method must not authenticate or spend a token.
+            if request.method.lower() not in self.http_method_names or not hasattr(self, request.method.lower()):
+                raise MethodNotAllowed(request.method)
+            self.request.user = await self.check_permissions(request)
+            await self.check_throttles()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            # The same error bodies as rest_framework.views.exception_handler.
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = self.render(data, exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = self.www_authenticate
+            if exc.status_code == status.HTTP_405_METHOD_NOT_ALLOWED:
+                response['Allow'] = ', '.join(self._allowed_methods())
+            if getattr(exc, 'wait', None) is not None:
+                response['Retry-After'] = '%d' % exc.wait
+            return response
+
+    async def check_permissions(self, request):
+        """IsAuthenticatedOrReadOnly, authenticating in the same order as the sync views."""
+        user = await aget_basic_user(request)
+        if user is None:
+            user = await request.auser()
+            if user.is_authenticated and request.method not in SAFE_METHODS:
+                self.enforce_csrf(request)
+        if request.method not in SAFE_METHODS and not user.is_authenticated:
+            raise NotAuthenticated()
+        return user
+
+    async def check_throttles(self):
+        """The sync views' token buckets; the cache calls run off the event loop."""
+        throttle = TokenBucketThrottle()
+        if not await sync_to_async(throttle.allow_request)(self.request, self):
+            raise Throttled(throttle.wait())
+
+    def enforce_csrf(self, request):
+        check = CsrfViewMiddleware(lambda request: None)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            raise PermissionDenied('CSRF Failed: %s' % reason.reason_phrase)
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer.render(data) if data is not None else b'',
+            status=status_code,
+            content_type='application/json',
+        )
+
+    async def aget_object(self, pk):
+        try:
+            return await self.queryset.aget(pk=pk)
+        except Book.DoesNotExist:
+            raise NotFound('No Book matches the given query.')
+
+    async def aget_serializer(self, *args, **kwargs):
+        """BookSerializer with the submitted author already looked up."""
+        data = kwargs['data']
+        authors = {}
+        if not isinstance(data, dict):
+            # A JSON array or scalar body: BookSerializer answers with the usual 400.
+            return self.serializer_class(*args, context={'authors': authors}, **kwargs)
+        try:
+            author_id = int(data.get('author'))
+        except (TypeError, ValueError):
+            pass
+        else:
+            async for author in Author.objects.filter(pk=author_id):
+                authors[author.pk] = author
+        return self.serializer_class(*args, context={'authors': authors}, **kwargs)
+
+    async def save(self, serializer, instance=None):
+        serializer.is_valid(raise_exception=True)
+        if instance is None:
+            instance = await Book.objects.acreate(**serializer.validated_data)
+        else:
+            for field, value in serializer.validated_data.items():
+                setattr(instance, field, value)
+            await instance.asave()
+        serializer.instance = instance
+        return serializer.data
+
+
+class AsyncBookListView(AsyncBookView):
+    pagination_class = KeysetPagination
+    filterset_fields = ['title', 'author', 'publication_year']
+    search_fields = ['title', 'author__name']
+    ordering_fields = ['title', 'publication_year']
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
+
+    async def filter_queryset(self, queryset):
+        query = self.request.query_params
+        errors = {}
+        for name in self.filterset_fields:
+            if not query.get(name):
+                continue
+            try:
+                value = Book._meta.get_field(name).to_python(query[name])
+            except DjangoValidationError as exc:
+                errors[name] = exc.messages
+                continue
+            if name == 'author' and not await Author.objects.filter(pk=value).aexists():
+                errors[name] = ['Select a valid choice. That choice is not one of the available choices.']
+                continue
+            queryset = queryset.filter(**{name: value})
+        if errors:
+            raise ValidationError(errors)
+
+        # Both backends only build the query; neither touches the database.
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    async def get(self, request):
+        queryset = await self.filter_queryset(self.queryset)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, self.request, view=self)
+        data = self.serializer_class(page, many=True).data
+        return self.render(paginator.get_paginated_response(data).data)
+
+    async def post(self, request):
+        serializer = await self.aget_serializer(data=self.request.data)
+        return self.render(await self.save(serializer), status.HTTP_201_CREATED)
+
+
+class AsyncBookDetailView(AsyncBookView):
+    async def get(self, request, pk):
+        return self.render(self.serializer_class(await self.aget_object(pk)).data)
+
+
+class AsyncBookCreateView(AsyncBookView):
+    async def post(self, request):
+        serializer = await self.aget_serializer(data=self.request.data)
+        return self.render(await self.save(serializer), status.HTTP_201_CREATED)
+
+
+class AsyncBookUpdateView(AsyncBookView):
+    async def put(self, request, pk, partial=False):
+        instance = await self.aget_object(pk)
+        serializer = await self.aget_serializer(instance, data=self.request.data, partial=partial)
+        return self.render(await self.save(serializer, instance))
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+
+class AsyncBookDeleteView(AsyncBookView):
+    async def delete(self, request, pk):
+        instance = await self.aget_object(pk)
+        await instance.adelete()
+        return self.render(None, status.HTTP_204_NO_CONTENT)
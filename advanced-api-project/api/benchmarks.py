@@ -0,0 +1,662 @@
+"""
+BENCHMARK SCENARIOS FOR THE BOOK API
+------------------------------------
+Each scenario is a function registered with @benchmark(...). It receives the
+parsed command options, seeds whatever data it needs and returns a list of
+result rows (dicts). Scenarios are run by `python manage.py benchmark <name>`
+inside a transaction that is rolled back, so the seeded rows never persist;
+multi-threaded scenarios work on a scratch copy of the database instead.
+
+Results can be saved as JSON (--json) and checked against a saved baseline
+(--compare): compare_results() flags every row whose timings grew by more
+than the threshold, e.g.
+
+    python manage.py benchmark hotpaths --rows 100000 --json baseline.json
+    python manage.py benchmark hotpaths --rows 100000 --compare baseline.json
+"""
+
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import OperationalError, close_old_connections, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, modify_settings, override_settings
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import Author, Book
+from .pagination import KeysetPagination
+from .seeding import seed_catalogue
+from .serializers import BookSerializer
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name, rows, transactional=True):
+    """
+    Register a scenario under `name`; `rows` is its default table size.
+
+    Non-transactional scenarios are not wrapped in a rolled-back transaction
+    and must clean up after themselves (see scratch_database()).
+    """
+    def register(func):
+        func.default_rows = rows
+        func.transactional = transactional
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+# -----------------------------
+# HELPERS
+# -----------------------------
+
+def seed_books(count, authors=None, seed=0):
+    """Insert `count` books spread evenly over `authors` new authors (see api/seeding.py)."""
+    seed_catalogue(authors or max(1, count // 20), count, skew=0, seed=seed)
+
+
+def measure(func, repeat):
+    """Call `func` `repeat` times and summarise the wall time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+    }
+
+
+def call_view(view, path, expected_status=200, headers=None, view_kwargs=None, **params):
+    # 'localhost' is always allowed while DEBUG is on, unlike 'testserver'.
+    request = APIRequestFactory(HTTP_HOST='localhost').get(path, params, **(headers or {}))
+    response = view(request, **(view_kwargs or {}))
+    assert response.status_code == expected_status, response.status_code
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def compare_results(baseline, results, threshold, metrics=('median_ms',)):
+    """
+    Compare result rows with the rows of a saved run, matched by name.
+
+    Returns (rows, regressions): for every name in both runs, the name and a
+    {metric: (old, new, relative change)} dict, and the descriptions of
+    changes above `threshold` (0.2 = 20% slower).
+    """
+    previous = {row['name']: row for row in baseline}
+    rows, regressions = [], []
+    for row in results:
+        old = previous.get(row['name'])
+        if old is None:
+            continue
+        changes = {}
+        for metric in metrics:
+            if metric not in row or not old.get(metric):
+                continue
+            change = row[metric] / old[metric] - 1
+            changes[metric] = (old[metric], row[metric], change)
+            if change > threshold:
+                regressions.append('%s: %s %.3f -> %.3f (%+.0f%%)' % (
+                    row['name'], metric, old[metric], row[metric], change * 100,
+                ))
+        rows.append((row['name'], changes))
+    return rows, regressions
+
+
+class CallCounter:
+    """Wrap `owner.name` and count how often it is called."""
+
+    def __init__(self, owner, name):
+        self.owner, self.name = owner, name
+        self.calls = 0
+
+    def __enter__(self):
+        original = getattr(self.owner, self.name)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return original(*args, **kwargs)
+
+        self.original = original
+        setattr(self.owner, self.name, counted)
+        return self
+
+    def __exit__(self, *exc_info):
+        setattr(self.owner, self.name, self.original)
+
+
+# -----------------------------
+# SCENARIOS
+# -----------------------------
+
+@benchmark('hotpaths', rows=10_000)
+def bench_hotpaths(options):
+    """Latency and throughput of the common Book API requests through the test client."""
+    from django.contrib.auth import get_user_model
+
+    seed_books(options['rows'])
+    user = get_user_model().objects.create_user(username='benchmark', password='benchmark')
+    rng = random.Random(1)
+    books = list(Book.objects.order_by('?').values_list('id', 'title', 'author_id', 'publication_year')[:100])
+    book_ids = itertools.cycle([book[0] for book in books])
+    word = books[0][1].split()[0]
+
+    reader = Client()
+    writer = Client()
+    writer.force_login(user)
+    titles = itertools.count()
+
+    def get(path, **params):
+        response = reader.get(path, params)
+        assert response.status_code == 200, response.status_code
+
+    def create():
+        response = writer.post('/api/books/create/', {
+            'title': 'Benchmark %d' % next(titles), 'publication_year': rng.randint(1900, 2024), 'author': books[0][2],
+        })
+        assert response.status_code == 201, response.status_code
+
+    def update():
+        response = writer.patch(
+            '/api/books/update/%d/' % next(book_ids),
+            json.dumps({'title': 'Updated %d' % next(titles)}), content_type='application/json',
+        )
+        assert response.status_code == 200, response.status_code
+
+    cases = [
+        ('list', lambda: get('/api/books/', page_size=50)),
+        ('filter publication_year', lambda: get('/api/books/', publication_year=books[0][3], page_size=50)),
+        ('filter author', lambda: get('/api/books/', author=books[0][2], page_size=50)),
+        ('search', lambda: get('/api/books/', search=word, page_size=50)),
+        ('ordering -publication_year', lambda: get('/api/books/', ordering='-publication_year', page_size=50)),
+        ('ordering title', lambda: get('/api/books/', ordering='title', page_size=50)),
+        ('detail', lambda: get('/api/books/%d/' % next(book_ids))),
+        ('create', create),
+        ('update', update),
+    ]
+
+    results = []
+    # A zero cache timeout measures the views rather than the response cache.
+    with override_settings(ALLOWED_HOSTS=['testserver'], API_CACHE_TIMEOUT=0):
+        for name, func in cases:
+            func()  # Warm up connections and query compilation.
+            timings = measure(func, options['repeat'])
+            results.append({
+                'name': '%s rows=%d' % (name, options['rows']),
+                **timings,
+                'req_per_sec': round(1000 / timings['median_ms']),
+            })
+    return results
+
+
+@benchmark('pagination', rows=1_000_000)
+def bench_pagination(options):
+    """Keyset vs limit/offset pagination at increasing page depths."""
+    from .views import BookListView
+
+    seed_books(options['rows'])
+    page_size = 50
+    total = Book.objects.count()
+    keyset_view = BookListView.as_view(pagination_class=KeysetPagination, cache_enabled=False)
+    offset_view = BookListView.as_view(pagination_class=LimitOffsetPagination, cache_enabled=False)
+
+    results = []
+    for fraction in (0, 0.01, 0.5, 0.99):
+        offset = int((total - page_size) * fraction)
+
+        # Build the cursor a client would hold after paging down to `offset`.
+        params = {'page_size': page_size}
+        if offset:
+            paginator = KeysetPagination()
+            paginator.ordering = paginator.get_ordering(Book.objects.all())
+            anchor = Book.objects.order_by(*paginator.ordering)[offset - 1]
+            params['cursor'] = paginator.encode_token(paginator.get_position(anchor))
+
+        results.append({
+            'name': 'keyset offset=%d' % offset,
+            **measure(lambda: call_view(keyset_view, '/api/books/', **params), options['repeat']),
+        })
+        results.append({
+            'name': 'limit/offset offset=%d' % offset,
+            **measure(
+                lambda: call_view(offset_view, '/api/books/', limit=page_size, offset=offset),
+                options['repeat'],
+            ),
+        })
+    return results
+
+
+@benchmark('conditional', rows=100_000)
+def bench_conditional(options):
+    """Full 200 responses vs 304 Not Modified, with serializer call counts."""
+    from .views import BookDetailView, BookListView
+
+    seed_books(options['rows'])
+    list_view = BookListView.as_view(cache_enabled=False)
+    detail_view = BookDetailView.as_view()
+    book_id = Book.objects.values_list('id', flat=True).first()
+    params = {'page_size': 500}
+
+    list_etag = call_view(list_view, '/api/books/', **params)['ETag']
+    detail_etag = call_view(detail_view, '/api/books/%d/' % book_id, view_kwargs={'pk': book_id})['ETag']
+
+    cases = [
+        ('list 200', lambda: call_view(list_view, '/api/books/', **params)),
+        ('list 304', lambda: call_view(
+            list_view, '/api/books/', expected_status=304,
+            headers={'HTTP_IF_NONE_MATCH': list_etag}, **params)),
+        ('detail 200', lambda: call_view(
+            detail_view, '/api/books/%d/' % book_id, view_kwargs={'pk': book_id})),
+        ('detail 304', lambda: call_view(
+            detail_view, '/api/books/%d/' % book_id, expected_status=304,
+            headers={'HTTP_IF_NONE_MATCH': detail_etag}, view_kwargs={'pk': book_id})),
+    ]
+
+    results = []
+    for name, func in cases:
+        with CallCounter(BookSerializer, 'to_representation') as counter:
+            timings = measure(func, options['repeat'])
+        results.append({
+            'name': '%s (%d serializer calls)' % (name, counter.calls),
+            **timings,
+        })
+    return results
+
+
+@benchmark('export', rows=1_000_000)
+def bench_export(options):
+    """Streaming export time and peak Python memory at two table sizes."""
+    from .views import BookExportView
+
+    view = BookExportView.as_view()
+    results = []
+    seeded = 0
+    for size in sorted({min(1000, options['rows']), options['rows']}):
+        seed_books(size - seeded, seed=size)
+        seeded = size
+
+        for export_format in ('ndjson', 'csv'):
+            def run():
+                response = call_view(view, '/api/books/export/', format=export_format)
+                for _ in response.streaming_content:
+                    pass
+
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            timings = measure(run, min(options['repeat'], 3))
+            results.append({
+                'name': '%s rows=%d' % (export_format, size),
+                **timings,
+                'peak_kb': round(peak / 1024),
+                'rows_per_sec': round(size / (timings['median_ms'] / 1000)),
+            })
+    return results
+
+
+@benchmark('search', rows=1_000_000)
+def bench_search(options):
+    """FTS5 ?search= against the SearchFilter icontains scan it replaced."""
+    from .views import BookListView
+
+    seed_books(options['rows'])
+    fts_view = BookListView.as_view(cache_enabled=False)
+    icontains_view = BookListView.as_view(
+        cache_enabled=False,
+        filter_backends=[DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter],
+    )
+    book = Book.objects.select_related('author').order_by('?').first()
+    queries = {
+        'title words': book.title,
+        'title prefix': book.title.split()[0][:3],
+        'author name': book.author.name,
+        'no match': 'zzzz',
+    }
+
+    results = []
+    for label, query in queries.items():
+        for name, view in (('fts5', fts_view), ('icontains', icontains_view)):
+            results.append({
+                'name': '%s %s' % (name, label),
+                **measure(lambda: call_view(view, '/api/books/', search=query), options['repeat']),
+            })
+    return results
+
+
+@benchmark('fastpath', rows=100_000)
+def bench_fastpath(options):
+    """BookSerializer over model instances vs RowSerializer over values_list() rows."""
+    from .fastpath import FastJSONRenderer, RowSerializer
+    from .views import BookListView
+
+    seed_books(options['rows'])
+    count = min(options['rows'], 10_000)
+    renderer = FastJSONRenderer()
+    row_serializer = RowSerializer.for_serializer(BookSerializer())
+    queryset = Book.objects.order_by('title', 'pk')[:count]
+
+    def serializer_path():
+        return JSONRenderer().render(BookSerializer(list(queryset), many=True).data)
+
+    def fast_path():
+        rows = list(queryset.values_list('pk', *row_serializer.columns, named=True))
+        return renderer.render(row_serializer.render_many(rows))
+
+    assert json.loads(serializer_path()) == json.loads(fast_path())
+
+    results = []
+    for name, func in (('serializer + JSONRenderer', serializer_path), ('rows + FastJSONRenderer', fast_path)):
+        timings = measure(func, options['repeat'])
+        results.append({
+            'name': '%s rows=%d' % (name, count),
+            **timings,
+            'rows_per_sec': round(count / (timings['median_ms'] / 1000)),
+        })
+
+    params = {'page_size': 500}
+    for name, fast_list in (('view serializer', False), ('view fast path', True)):
+        view = BookListView.as_view(cache_enabled=False, fast_list=fast_list)
+        timings = measure(lambda: call_view(view, '/api/books/', **params), options['repeat'])
+        results.append({
+            'name': '%s page_size=500' % name,
+            **timings,
+            'rows_per_sec': round(500 / (timings['median_ms'] / 1000)),
+        })
+    return results
+
+
+@benchmark('stats', rows=1_000_000)
+def bench_stats(options):
+    """/api/books/stats/ from the summary tables vs grouping the Book table."""
+    from .stats import get_book_stats
+
+    seed_books(options['rows'])
+    summary = get_book_stats()
+    with mock.patch('api.stats.has_summaries', return_value=False):
+        assert get_book_stats() == summary
+
+    results = [{'name': 'summary tables', **measure(get_book_stats, options['repeat'])}]
+    with mock.patch('api.stats.has_summaries', return_value=False):
+        results.append({'name': 'group books', **measure(get_book_stats, options['repeat'])})
+    return results
+
+
+@benchmark('asgi', rows=10_000)
+def bench_asgi(options):
+    """Sync DRF views vs the async views under the in-process ASGI handler, at rising concurrency."""
+    seed_books(options['rows'])
+    book_ids = list(Book.objects.order_by('?').values_list('id', flat=True)[:100])
+    client = AsyncClient()
+
+    async def fetch(path, latencies):
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+
+    async def load(paths, concurrency):
+        latencies = []
+        gate = asyncio.Semaphore(concurrency)
+
+        async def worker(path):
+            async with gate:
+                await fetch(path, latencies)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(path) for path in paths))
+        return latencies, time.perf_counter() - start
+
+    results = []
+    for prefix in ('/api/books/', '/api/async/books/'):
+        label = 'async' if 'async' in prefix else 'sync'
+        # A mix of list pages and detail lookups, as a client would send them.
+        paths = [
+            prefix + ('?page_size=50&ordering=-publication_year' if i % 4 == 0 else '%d/' % book_ids[i % len(book_ids)])
+            for i in range(options['repeat'] * 10)
+        ]
+        for concurrency in (1, 16, 64):
+            # AsyncClient always sends Host: testserver. A zero timeout keeps
+            # the sync list view's response cache from answering for it.
+            with override_settings(ALLOWED_HOSTS=['testserver'], API_CACHE_TIMEOUT=0):
+                latencies, elapsed = async_to_sync(load)(paths, concurrency)
+            latencies.sort()
+            results.append({
+                'name': '%s concurrency=%d' % (label, concurrency),
+                'min_ms': round(latencies[0], 3),
+                'median_ms': round(statistics.median(latencies), 3),
+                'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+                'req_per_sec': round(len(paths) / elapsed),
+            })
+    return results
+
+
+@contextmanager
+def scratch_database(options, conn_max_age):
+    """
+    Point the 'default' alias at a copy of the database in a temporary file,
+    connected with the given OPTIONS, for scenarios that need real commits
+    from several threads. Everything is restored afterwards.
+    """
+    connection = connections['default']
+    settings_dict = connection.settings_dict
+    saved = {key: settings_dict.get(key) for key in ('NAME', 'OPTIONS', 'CONN_MAX_AGE')}
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, 'scratch.sqlite3')
+
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    connection.connection.backup(target)
+    target.close()
+    connection.close()
+
+    settings_dict.update(NAME=path, OPTIONS=options, CONN_MAX_AGE=conn_max_age)
+    try:
+        yield path
+    finally:
+        connections.close_all()
+        settings_dict.update(saved)
+        directory.cleanup()
+
+
+def run_worker(func, count, results):
+    """
+    Call `func` `count` times like consecutive requests in a separate process,
+    tallying lock errors, and put (latencies, outcomes) on `results`.
+    """
+    latencies, outcomes = [], Counter()
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                func()
+                outcomes['ok'] += 1
+            except OperationalError as exc:
+                outcomes['locked' if 'locked' in str(exc) else 'errors'] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            # What the request_finished signal does: honour CONN_MAX_AGE.
+            close_old_connections()
+    finally:
+        connections.close_all()
+        results.put((func.__name__, latencies, outcomes))
+
+
+@benchmark('stress', rows=10_000, transactional=False)
+def bench_stress(options):
+    """Concurrent BookCreateView writers and BookListView readers: lock errors and throughput per SQLite profile."""
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+
+    from .views import BookCreateView, BookListView
+
+    writers, readers = 8, 16
+    profiles = [
+        ('django defaults', {}, 0),
+        ('tuned profile', getattr(settings, 'SQLITE_OPTIONS', {}), 600),
+    ]
+    create_view = BookCreateView.as_view()
+    list_view = BookListView.as_view(cache_enabled=False)
+
+    results = []
+    for label, sqlite_options, conn_max_age in profiles:
+        with scratch_database(sqlite_options, conn_max_age):
+            with transaction.atomic():
+                seed_books(options['rows'])
+            user = get_user_model().objects.create_user(username='stress-%d' % time.time_ns())
+            author_ids = list(Author.objects.values_list('id', flat=True)[:100])
+            connections.close_all()
+
+            def create():
+                request = APIRequestFactory(HTTP_HOST='localhost').post('/api/books/create/', {
+                    'title': 'Stress %d' % random.randrange(10 ** 9),
+                    'publication_year': random.randint(1900, 2024),
+                    'author': random.choice(author_ids),
+                })
+                force_authenticate(request, user)
+                response = create_view(request)
+                assert response.status_code == 201, response.status_code
+
+            def read():
+                ordering = random.choice(['title', '-publication_year'])
+                call_view(list_view, '/api/books/', page_size=50, ordering=ordering)
+
+            # Processes rather than threads, so requests really overlap
+            # instead of taking turns on the GIL.
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            workers = [
+                context.Process(target=run_worker, args=(func, options['repeat'], queue))
+                for func, count in ((create, writers), (read, readers)) for _ in range(count)
+            ]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            stats = {'create': ([], Counter()), 'read': ([], Counter())}
+            for _ in workers:
+                name, latencies, outcomes = queue.get()
+                stats[name][0].extend(latencies)
+                stats[name][1].update(outcomes)
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+        for name, (latencies, outcomes) in stats.items():
+            latencies.sort()
+            results.append({
+                'name': '%s %s' % (label, name),
+                'min_ms': round(latencies[0], 3),
+                'median_ms': round(statistics.median(latencies), 3),
+                'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+                'ok_per_sec': round(outcomes['ok'] / elapsed),
+                'locked': outcomes['locked'],
+                'errors': outcomes['errors'],
+            })
+    return results
+
+
+@benchmark('instrumentation', rows=10_000)
+def bench_instrumentation(options):
+    """Cost of InstrumentationMiddleware per request and per query, against its budget."""
+    from . import instrumentation
+
+    seed_books(options['rows'])
+    calls = 1000
+    results = []
+
+    def budget_row(name, bare, instrumented, budget_us):
+        # measure() times `calls` calls, so milliseconds per run are microseconds per call.
+        overhead = instrumented['median_ms'] - bare['median_ms']
+        return {
+            'name': name,
+            **instrumented,
+            'overhead_us': round(overhead, 2),
+            'budget_us': budget_us,
+            'within_budget': overhead <= budget_us,
+        }
+
+    # The middleware around a view that does nothing.
+    request = RequestFactory().get('/api/books/')
+    request.resolver_match = None
+    view = lambda request: HttpResponse()
+    middleware = instrumentation.InstrumentationMiddleware(view)
+    bare = measure(lambda: [view(request) for _ in range(calls)], options['repeat'])
+    instrumented = measure(lambda: [middleware(request) for _ in range(calls)], options['repeat'])
+    results.append({'name': 'empty view x%d' % calls, **bare})
+    results.append(budget_row(
+        'empty view + middleware x%d' % calls, bare, instrumented, instrumentation.REQUEST_BUDGET_US,
+    ))
+
+    # The same view and middleware under ASGI.
+    async def async_view(request):
+        return HttpResponse()
+
+    async def run_async(handler):
+        for _ in range(calls):
+            await handler(request)
+
+    async_middleware = instrumentation.InstrumentationMiddleware(async_view)
+    bare = measure(lambda: async_to_sync(run_async)(async_view), options['repeat'])
+    instrumented = measure(lambda: async_to_sync(run_async)(async_middleware), options['repeat'])
+    results.append({'name': 'async empty view x%d' % calls, **bare})
+    results.append(budget_row(
+        'async empty view + middleware x%d' % calls, bare, instrumented, instrumentation.REQUEST_BUDGET_US,
+    ))
+
+    # One trivial statement, with and without the execute_wrapper counting it.
+    connection = connections['default']
+
+    def run_queries():
+        with connection.cursor() as cursor:
+            for _ in range(calls):
+                cursor.execute('SELECT 1')
+
+    def run_recorded_queries():
+        with instrumentation.collect():
+            run_queries()
+
+    instrumentation.install_query_recorder()
+    connection.execute_wrappers.remove(instrumentation.record_query)
+    bare = measure(run_queries, options['repeat'])
+    instrumented = measure(run_recorded_queries, options['repeat'])
+    results.append({'name': 'SELECT 1 x%d' % calls, **bare})
+    results.append(budget_row(
+        'SELECT 1 recorded x%d' % calls, bare, instrumented, instrumentation.QUERY_BUDGET_US,
+    ))
+
+    # End to end through the full middleware stack, for scale.
+    for name, change in (
+        ('book list', {}),
+        ('book list, no instrumentation', {'MIDDLEWARE': {'remove': ['api.instrumentation.InstrumentationMiddleware']}}),
+    ):
+        with override_settings(ALLOWED_HOSTS=['testserver'], API_CACHE_TIMEOUT=0), modify_settings(**change):
+            client = Client()
+            results.append({
+                'name': name,
+                **measure(lambda: client.get('/api/books/', {'page_size': 50}), options['repeat']),
+            })
+    instrumentation.reset()
+    return results
@@ -0,0 +1,183 @@
+"""
+BULK BOOK WRITES
+----------------
+Creating books one request at a time pays for a request, a permission check,
+validation and an INSERT per book. The bulk endpoints take a whole batch:
+
+- a JSON array, or an NDJSON stream (one object per line) that is read and
+  processed chunk by chunk instead of being loaded up front
+- every author id of a chunk is resolved at once: from author_cache, with
+  one in_bulk() query for the ids it does not know (see api/validation.py)
+- rows are written with bulk_create / bulk_update per chunk, all inside one
+  transaction
+
+Invalid items are reported by index and the valid ones are still written,
+unless the client asks for ?atomic=true, in which case any error rolls the
+whole batch back.
+"""
+
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser
+
+from .cache import invalidate
+from .models import Book
+from .serializers import BookSerializer
+from .validation import author_cache
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON. Yields one object per line, lazily."""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self.iter_objects(stream) if stream is not None else iter(())
+
+    def iter_objects(self, stream):
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise ParseError('NDJSON parse error on line %d - %s' % (number, exc))
+
+
+def iter_chunks(items, size):
+    """Yield lists of (index, item) pairs, `size` at a time."""
+    iterator = enumerate(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def resolve_authors(items):
+    """Map every author id mentioned in `items` to its Author, in at most one query."""
+    ids = set()
+    for item in items:
+        if isinstance(item, dict):
+            try:
+                ids.add(int(item.get('author')))
+            except (TypeError, ValueError):
+                pass
+    return author_cache.get_many(ids)
+
+
+def validate_chunk(chunk, partial=False):
+    """
+    Validate a chunk with BookSerializer(many=True)'s child in a single pass.
+
+    Returns ([(index, validated_data), ...], [{'index': ..., 'errors': ...}, ...]).
+    """
+    items = [item for _, item in chunk]
+    serializer = BookSerializer(many=True, partial=partial, context={'authors': resolve_authors(items)})
+    valid, errors = [], []
+    for index, item in chunk:
+        try:
+            valid.append((index, serializer.child.run_validation(item)))
+        except ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return valid, errors
+
+
+class BulkBookWriter:
+    """Runs one bulk operation over an iterable of items."""
+
+    def __init__(self, items, atomic=False, chunk_size=500, max_items=10_000):
+        if isinstance(items, dict) or not hasattr(items, '__iter__'):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+        self.items = items
+        self.atomic = atomic
+        self.chunk_size = chunk_size
+        self.max_items = max_items
+        self.errors = []
+        self.ids = []
+
+    def run(self, process_chunk):
+        with transaction.atomic():
+            for chunk in iter_chunks(self.items, self.chunk_size):
+                if chunk[-1][0] >= self.max_items:
+                    raise ValidationError({
+                        'non_field_errors': ['A batch may contain at most %d items.' % self.max_items],
+                    })
+                process_chunk(chunk)
+                if self.errors and self.atomic:
+                    break
+
+            self.errors.sort(key=lambda error: error['index'])
+            if self.errors and self.atomic:
+                self.ids = []
+                transaction.set_rollback(True)
+            elif self.ids:
+                # bulk_create / bulk_update send no post_save signals.
+                invalidate(Book)
+        return self
+
+    def create(self):
+        def process_chunk(chunk):
+            valid, errors = validate_chunk(chunk)
+            self.errors.extend(errors)
+            books = Book.objects.bulk_create([Book(**data) for _, data in valid])
+            self.ids.extend(book.pk for book in books)
+        return self.run(process_chunk)
+
+    def update(self, partial=False):
+        def process_chunk(chunk):
+            ids = {}
+            for index, item in chunk:
+                pk = item.get('id') if isinstance(item, dict) else None
+                if isinstance(pk, int) and not isinstance(pk, bool):
+                    ids[index] = pk
+            books = Book.objects.in_bulk(set(ids.values()))
+
+            found = []
+            for index, item in chunk:
+                if ids.get(index) in books:
+                    found.append((index, item))
+                else:
+                    self.errors.append({'index': index, 'errors': {'id': ['No book with this id.']}})
+
+            valid, errors = validate_chunk(found, partial=partial)
+            self.errors.extend(errors)
+
+            changed, fields = [], {'updated_at'}
+            now = timezone.now()
+            for index, data in valid:
+                book = books[ids[index]]
+                for field, value in data.items():
+                    setattr(book, field, value)
+                    fields.add(field)
+                # bulk_update() skips auto_now, so stamp the change ourselves.
+                book.updated_at = now
+                changed.append(book)
+            if changed:
+                Book.objects.bulk_update(changed, sorted(fields))
+                self.ids.extend(book.pk for book in changed)
+        return self.run(process_chunk)
+
+    def delete(self):
+        def process_chunk(chunk):
+            wanted = {}
+            for index, item in chunk:
+                pk = item.get('id') if isinstance(item, dict) else item
+                if isinstance(pk, int) and not isinstance(pk, bool):
+                    wanted[index] = pk
+                else:
+                    self.errors.append({'index': index, 'errors': {'id': ['A valid integer is required.']}})
+
+            existing = set(Book.objects.filter(pk__in=wanted.values()).values_list('pk', flat=True))
+            for index, pk in wanted.items():
+                if pk not in existing:
+                    self.errors.append({'index': index, 'errors': {'id': ['No book with this id.']}})
+            Book.objects.filter(pk__in=existing).delete()
+            self.ids.extend(sorted(existing))
+        return self.run(process_chunk)
+
@@ -0,0 +1,179 @@
+"""
+VERSIONED RESPONSE CACHE
+------------------------
+List responses are cached under a key built from
+
+    <model generation> + <normalized query parameters> + <host/format>
+
+Expanded relations (?expand=author) add the related model's generation to
+the key, so renaming an author retires the responses that embed it.
+
+Every write to a model bumps its generation counter (see api/signals.py).
+Old entries are never looked up again and simply expire, so invalidation is
+a single cache.incr() instead of a scan over every cached query string.
+
+Everything goes through Django's cache framework: local memory in
+development and tests, a file or shared backend (Redis, Memcached) in
+production so all workers see the same generations and entries.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from .routers import current_replica, get_max_lag
+
+
+KEY_PREFIX = 'api'
+HITS_KEY = KEY_PREFIX + ':stats:hits'
+MISSES_KEY = KEY_PREFIX + ':stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def generation_key(model):
+    return '%s:gen:%s' % (KEY_PREFIX, model._meta.label_lower)
+
+
+def get_generation(model):
+    cache = get_cache()
+    key = generation_key(model)
+    # Seed missing counters from the clock rather than 1, so a counter that
+    # was evicted can never restart at a value older entries were stored under.
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_generation(model):
+    cache = get_cache()
+    try:
+        cache.incr(generation_key(model))
+    except ValueError:
+        # Evicted or never read: any fresh clock value is newer.
+        cache.set(generation_key(model), time.time_ns(), timeout=None)
+
+
+def invalidate(model):
+    """Move `model` to a new generation now and again when the transaction commits."""
+    bump_generation(model)
+    # The second bump stops a reader that cached the old rows in between
+    # from serving them until they expire.
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+def increment_counter(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+class CachedListMixin:
+    """
+    Serve GET list responses from the cache.
+
+    Only query parameters that change the result are part of the key, in a
+    stable order, so `?ordering=title&search=x` and `?search=x&ordering=title`
+    share an entry and unrelated parameters do not fragment the cache.
+    """
+
+    cache_enabled = True
+    cache_timeout = None
+
+    def get_cache_query_params(self):
+        params = set(getattr(self, 'filterset_fields', None) or [])
+        for backend in self.filter_backends:
+            for name in ('search_param', 'ordering_param'):
+                if hasattr(backend, name):
+                    params.add(getattr(backend, name))
+        for name in ('fields_query_param', 'expand_query_param'):
+            if getattr(self, name, None):
+                params.add(getattr(self, name))
+        paginator = self.paginator
+        for name in ('cursor_query_param', 'page_size_query_param',
+                     'page_query_param', 'limit_query_param', 'offset_query_param'):
+            if getattr(paginator, name, None):
+                params.add(getattr(paginator, name))
+        return params
+
+    def get_cache_models(self):
+        """The queryset's model plus any related model expanded into the response."""
+        model = self.queryset.model
+        models = [model]
+        for name in getattr(self, 'get_expanded_fields', list)():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue  # Rejected by the serializer on a cache miss.
+            if field.is_relation and field.related_model not in models:
+                models.append(field.related_model)
+        return models
+
+    def get_list_cache_key(self, request):
+        query = request.query_params
+        normalized = sorted(
+            (name, tuple(query.getlist(name)))
+            for name in self.get_cache_query_params() if name in query
+        )
+        raw = repr((
+            request.scheme,
+            request.get_host(),
+            request.path,
+            request.accepted_renderer.format,
+            normalized,
+        ))
+        return '%s:list:%s:%s:%s' % (
+            KEY_PREFIX,
+            self.queryset.model._meta.label_lower,
+            '.'.join(str(get_generation(model)) for model in self.get_cache_models()),
+            hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest(),
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.cache_enabled:
+            return super().list(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_list_cache_key(request)
+        cached = cache.get(key)
+
+        if cached is not None:
+            increment_counter(HITS_KEY)
+            data, etag = cached
+            response = get_conditional_response(request, etag=etag) or Response(data)
+            if etag:
+                response['ETag'] = etag
+            response['X-Cache'] = 'HIT'
+            return response
+
+        increment_counter(MISSES_KEY)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout
+            if timeout is None:
+                timeout = getattr(settings, 'API_CACHE_TIMEOUT', 300)
+            if current_replica() is not None:
+                # A lagging replica may have answered from before the latest
+                # generation bump; let such entries go stale no later than the lag.
+                timeout = min(timeout, get_max_lag())
+            cache.set(key, (response.data, response.get('ETag')), timeout)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,171 @@
+"""
+CHANGE FEED
+-----------
+Every insert, update and delete of a book or an author appends a
+ChangeLogEntry (SQL triggers, migration 0007), in the same transaction as
+the write, so bulk and raw SQL writes are recorded too. Consumers follow the
+log instead of polling /api/books/:
+
+    GET /api/changes/?since=<seq>&limit=<n>
+        {"results": [{"seq": 8, "model": "book", "object_id": 3,
+                      "action": "update", "data": {...}, "changed_at": ...}],
+         "next": 8, "has_more": false}
+
+    GET /api/changes/stream/?since=<seq>     (text/event-stream)
+        id: 8
+        event: book.update
+        data: {"seq": 8, ...}
+
+Pass the last seq seen as ?since= (the stream also honours the
+Last-Event-ID header browsers send when they reconnect). Both read a range
+of the primary key, at most `limit` / STREAM_BATCH entries at a time, so
+neither rescans the table nor holds more than one batch in memory. `data`
+is the row after the change, null for deletes.
+
+SQLite runs one write transaction at a time, so entries become visible in
+seq order and a consumer that resumes from its last seq misses nothing.
+The stream polls every API_CHANGES_POLL_INTERVAL seconds, sends a comment
+as a heartbeat when idle, and ends after API_CHANGES_STREAM_TIMEOUT seconds
+(EventSource clients reconnect by themselves). When a reconnecting client
+sends Last-Event-ID it wins over the ?since= still in its URL. Only SQLite
+records changes.
+
+Under WSGI every connected client holds a worker, sleeping between polls,
+for up to API_CHANGES_STREAM_TIMEOUT seconds, so the pool needs a worker per
+client on top of the ordinary traffic. Under ASGI the stream is served by
+aiter_changes() instead: it waits on the event loop and only borrows a
+thread for each poll's query.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import ChangeLogEntry
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_BATCH = 500
+HEARTBEAT_INTERVAL = 15
+
+FIELDS = ('seq', 'model', 'object_id', 'action', 'data', 'changed_at')
+
+
+def get_changes(since, limit):
+    """Up to `limit` entries after `since`, oldest first."""
+    return list(ChangeLogEntry.objects.filter(seq__gt=since).order_by('seq').values(*FIELDS)[:limit])
+
+
+# Yielded by poll_changes() where the stream should wait for the next poll.
+WAIT = object()
+DONE = object()
+
+
+def poll_changes(since, timeout=None):
+    """
+    Entries after `since` as they appear, None as a heartbeat whenever
+    HEARTBEAT_INTERVAL seconds pass without one and WAIT between polls,
+    until `timeout`.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'API_CHANGES_STREAM_TIMEOUT', 300)
+    deadline = time.monotonic() + timeout
+    last_sent = time.monotonic()
+    while True:
+        batch = get_changes(since, STREAM_BATCH)
+        for entry in batch:
+            yield entry
+        if batch:
+            since = batch[-1]['seq']
+            last_sent = time.monotonic()
+            if len(batch) == STREAM_BATCH:
+                continue  # More are waiting.
+        if time.monotonic() >= deadline:
+            return
+        if time.monotonic() - last_sent >= HEARTBEAT_INTERVAL:
+            yield None
+            last_sent = time.monotonic()
+        yield WAIT
+
+
+def get_poll_interval(poll_interval):
+    return getattr(settings, 'API_CHANGES_POLL_INTERVAL', 1) if poll_interval is None else poll_interval
+
+
+def iter_changes(since, timeout=None, poll_interval=None):
+    """poll_changes() for WSGI, sleeping in the worker between polls."""
+    poll_interval = get_poll_interval(poll_interval)
+    for item in poll_changes(since, timeout):
+        if item is WAIT:
+            time.sleep(poll_interval)
+        else:
+            yield item
+
+
+async def aiter_changes(since, timeout=None, poll_interval=None):
+    """poll_changes() for ASGI: the queries run in a thread, the waits on the event loop."""
+    poll_interval = get_poll_interval(poll_interval)
+    changes = poll_changes(since, timeout)
+    step = sync_to_async(next)
+    while (item := await step(changes, DONE)) is not DONE:
+        if item is WAIT:
+            await asyncio.sleep(poll_interval)
+        else:
+            yield item
+
+
+def log_books_after(cursor, last_id):
+    """Log the creation of books with ids above `last_id` (for loads that bypass the triggers)."""
+    cursor.execute(
+        "INSERT INTO api_changelogentry (model, object_id, action, data, changed_at) "
+        "SELECT 'book', id, 'create', "
+        "json_object('id', id, 'title', title, 'publication_year', publication_year, 'author', author_id), "
+        "strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now') "
+        "FROM api_book WHERE id > %s ORDER BY id",
+        [last_id],
+    )
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Server-Sent Events; only used through stream()."""
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Errors (e.g. a bad ?since=) are reported as a single event.
+        return self.format_event('error', json.dumps(data, cls=JSONEncoder)).encode(self.charset)
+
+    def format_event(self, event, data, event_id=None):
+        lines = [] if event_id is None else ['id: %s' % event_id]
+        lines.append('event: %s' % event)
+        lines.append('data: %s' % data)
+        return '\n'.join(lines) + '\n\n'
+
+    def format_entry(self, entry):
+        if entry is None:
+            return ': keep-alive\n\n'
+        return self.format_event(
+            '%s.%s' % (entry['model'], entry['action']),
+            json.dumps(entry, cls=JSONEncoder),
+            event_id=entry['seq'],
+        )
+
+    def stream(self, entries):
+        # Tell EventSource to wait a little before it reconnects.
+        yield 'retry: 1000\n\n'
+        for entry in entries:
+            yield self.format_entry(entry)
+
+    async def astream(self, entries):
+        """stream() over an async iterator, such as aiter_changes()."""
+        yield 'retry: 1000\n\n'
+        async for entry in entries:
+            yield self.format_entry(entry)
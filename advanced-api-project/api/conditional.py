@@ -0,0 +1,105 @@
+"""
+CONDITIONAL GET (ETag / Last-Modified)
+--------------------------------------
+Clients that poll can send back the validators they were given:
+
+    If-None-Match: "<etag>"          If-Modified-Since: <http date>
+
+When nothing has changed we answer 304 Not Modified straight away, before
+the serializer runs. The validators come from cheap data:
+
+- detail:    the row's own `updated_at`
+- paginated: (pk, updated_at) of the rows on the page plus its links. The
+             page query runs anyway, so this costs no extra SQL.
+- unpaged:   Max(updated_at) + Count(*) over the *filtered* queryset. The
+             count catches deletions, which never move the maximum.
+
+Fields expanded with ?expand= (see api/fieldsets.py) render a related row,
+so that row's `updated_at` becomes part of the validators too.
+
+Because a deletion cannot be expressed as a modification date, list
+responses only carry an ETag; Last-Modified is sent for detail responses.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def make_etag(request, *parts):
+    """ETag for this URL and representation, derived from `parts`."""
+    key = '|'.join(str(part) for part in (
+        request.get_full_path(),
+        request.accepted_renderer.format,
+        *parts,
+    ))
+    return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+
+def get_expanded_fields(view):
+    return getattr(view, 'get_expanded_fields', list)()
+
+
+def get_versions(view, instance):
+    """`updated_at` of `instance` and of every related row expanded into it."""
+    versions = [instance.updated_at]
+    for name in get_expanded_fields(view):
+        related = getattr(instance, name)
+        versions.append(related.updated_at if related is not None else None)
+    return versions
+
+
+class ConditionalListMixin:
+    """ListModelMixin companion that answers 304 for unchanged list results."""
+
+    # Keep the validator column loaded when OptimizedQuerysetMixin narrows the SELECT.
+    always_load_fields = ('updated_at',)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+
+        if page is not None:
+            etag = make_etag(
+                request,
+                [(obj.pk, *get_versions(self, obj)) for obj in page],
+                self.paginator.get_next_link(),
+                self.paginator.get_previous_link(),
+            )
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            aggregates = {'count': Count('pk'), 'last_modified': Max('updated_at')}
+            for name in get_expanded_fields(self):
+                aggregates[name] = Max(name + '__updated_at')
+            state = queryset.order_by().aggregate(**aggregates)
+            etag = make_etag(request, *sorted(state.items()))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = Response(self.get_serializer(queryset, many=True).data)
+
+        response['ETag'] = etag
+        return response
+
+
+class ConditionalRetrieveMixin:
+    """RetrieveModelMixin companion that answers 304 for an unchanged object."""
+
+    always_load_fields = ('updated_at',)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        versions = get_versions(self, instance)
+        etag = make_etag(request, instance.pk, *versions)
+        last_modified = int(max(version for version in versions if version is not None).timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
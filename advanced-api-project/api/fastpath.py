@@ -0,0 +1,181 @@
+"""
+FAST READ-ONLY LIST RENDERING
+-----------------------------
+A ModelSerializer builds every row by walking its fields, fetching each
+attribute from a model instance and calling the field's to_representation().
+For a page of plain columns almost all of that is overhead. Views that opt in
+with `fast_list = True` skip it for GET list responses:
+
+- the filtered, ordered queryset becomes values_list(..., named=True), so no
+  model instances are built
+- RowSerializer copies each tuple into a dict with the serializer's field
+  names, converting only fields whose representation differs from the
+  database value
+- FastJSONRenderer encodes the result with orjson when it is installed
+
+RowSerializer is derived from the serializer the view would have used (after
+?fields= trimming, see api/fieldsets.py) and produces identical output. Any
+field it cannot copy straight from a column - a nested serializer from
+?expand=, a SerializerMethodField, a dotted source, an overridden
+to_representation() - makes the view fall back to the serializer.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used instead.
+    orjson = None
+
+
+# Fields whose to_representation() is the identity on values the database
+# adapter already returns (str for text columns, int for integer columns).
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.ReadOnlyField)
+
+
+class RowSerializer:
+    """Renders values_list() rows exactly like `serializer` renders instances."""
+
+    def __init__(self, names, columns, converters):
+        self.names = names
+        self.columns = columns
+        self.converters = converters
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """The RowSerializer equivalent to `serializer`, or None if there is none."""
+        if type(serializer).to_representation is not serializers.ModelSerializer.to_representation:
+            return None
+
+        model = serializer.Meta.model
+        names, columns, converters = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+
+            if model_field.is_relation:
+                if not (
+                    isinstance(field, serializers.PrimaryKeyRelatedField)
+                    and type(field).to_representation is serializers.PrimaryKeyRelatedField.to_representation
+                    and field.pk_field is None
+                ):
+                    return None
+                converter = None  # The FK column already holds the pk.
+            elif type(field) in PASSTHROUGH_FIELDS:
+                converter = None
+            elif isinstance(field, serializers.Field) and not isinstance(field, serializers.BaseSerializer):
+                converter = field.to_representation
+            else:
+                return None
+
+            names.append(name)
+            columns.append(model_field.attname)
+            converters.append(converter)
+        return cls(names, columns, converters)
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, converter in zip(self.names, self.columns, self.converters):
+            value = getattr(row, column)
+            if converter is not None and value is not None:
+                value = converter(value)
+            data[name] = value
+        return data
+
+    def render_many(self, rows):
+        rows = list(rows)
+        # The common case - nothing to convert - is a straight zip per row.
+        if not any(self.converters):
+            indexes = [rows[0]._fields.index(column) for column in self.columns] if rows else []
+            names = self.names
+            return [dict(zip(names, [row[index] for index in indexes])) for row in rows]
+        return [self.to_representation(row) for row in rows]
+
+
+class RowListSerializer:
+    """Stands in for `serializer(page, many=True)`; only `.data` is used."""
+
+    def __init__(self, row_serializer, rows):
+        self.row_serializer = row_serializer
+        self.rows = rows
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return self.row_serializer.render_many(self.rows)
+
+
+class FastListMixin:
+    """
+    Generic view mixin: GET lists are read with values_list() and rendered by
+    a RowSerializer when the view sets `fast_list = True`.
+    """
+
+    fast_list = False
+    row_serializer = None
+
+    def get_row_serializer(self):
+        if not self.fast_list or self.request.method != 'GET':
+            return None
+        return RowSerializer.for_serializer(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        self.row_serializer = self.get_row_serializer()
+        return super().list(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.row_serializer is None:
+            return queryset
+
+        # Everything read off a row: the rendered columns, the keyset
+        # pagination position and the validators of ConditionalListMixin.
+        model = queryset.model
+        columns = ['pk', *self.row_serializer.columns]
+        for name in queryset.query.order_by or model._meta.ordering:
+            if not isinstance(name, str):
+                continue
+            name = name.lstrip('-')
+            if name in queryset.query.annotations:
+                columns.append(name)
+            elif name != 'pk' and '__' not in name:
+                columns.append(model._meta.get_field(name).attname)
+        for name in getattr(self, 'always_load_fields', ()):
+            columns.append(model._meta.get_field(name).attname)
+        return queryset.values_list(*dict.fromkeys(columns), named=True)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.row_serializer is not None and args and kwargs.get('many'):
+            return RowListSerializer(self.row_serializer, args[0])
+        return super().get_serializer(*args, **kwargs)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Indented output (the browsable API, ?indent) stays with the stdlib.
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            # Leave dates and dataclasses to DRF's encoder, which formats them differently.
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+        )
+        # Same escaping as JSONRenderer: these are not valid inside JavaScript strings.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
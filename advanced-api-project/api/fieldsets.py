@@ -0,0 +1,88 @@
+"""
+SPARSE FIELDSETS AND FIELD EXPANSION
+------------------------------------
+Clients choose the shape of read responses with two query parameters:
+
+    ?fields=id,title        only render these fields
+    ?expand=author          render the author as {"id": ..., "name": ...}
+                            instead of its primary key
+
+Both accept a comma separated list (or the parameter repeated) and are
+validated against the serializer, so a typo is a 400 rather than a silently
+different payload. Only safe (read) requests are affected; writes always use
+the full serializer.
+
+The serializer's field tree is what OptimizedQuerysetMixin reads (see
+api/optimization.py), so the SELECT follows the request as well:
+
+- unrendered columns are deferred with .only()
+- select_related('author') is added only when the author is expanded
+"""
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_field_list(values):
+    """['id,title', 'author'] -> ['id', 'title', 'author'], order kept, no blanks or repeats."""
+    names = []
+    for value in values:
+        for name in value.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin that takes `fields=` and `expand=` keyword arguments.
+
+    `expandable_fields` maps a field name to a callable returning the field
+    that replaces it when expanded.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.requested_fields = fields
+        self.requested_expand = expand or []
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        unknown = [name for name in self.requested_expand if name not in self.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError({'expand': ['Cannot expand: %s.' % ', '.join(unknown)]})
+        for name in self.requested_expand:
+            fields[name] = self.expandable_fields[name]()
+
+        if self.requested_fields:
+            unknown = [name for name in self.requested_fields if name not in fields]
+            if unknown:
+                raise serializers.ValidationError({'fields': ['Unknown field(s): %s.' % ', '.join(unknown)]})
+            fields = {name: field for name, field in fields.items() if name in self.requested_fields}
+        return fields
+
+
+class SparseFieldsetViewMixin:
+    """Generic view mixin that passes ?fields= / ?expand= to its serializer on reads."""
+
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_requested_fields(self):
+        return parse_field_list(self.request.query_params.getlist(self.fields_query_param))
+
+    def get_expanded_fields(self):
+        expand = parse_field_list(self.request.query_params.getlist(self.expand_query_param))
+        fields = self.get_requested_fields()
+        # Expanding a field the client did not ask to see would only add a join.
+        return [name for name in expand if not fields or name in fields]
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            kwargs.setdefault('fields', self.get_requested_fields() or None)
+            kwargs.setdefault('expand', self.get_expanded_fields())
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,306 @@
+"""
+REQUEST INSTRUMENTATION
+-----------------------
+InstrumentationMiddleware records, for every request:
+
+    wall        time spent in the middleware stack below it and the view
+    db          number of SQL statements and time spent executing them
+    repeated    statements whose SQL text already ran in this request - the
+                same query with different parameters is how an N+1 shows up
+    serialize   time spent producing serializer .data (TimedSerializerMixin)
+    render      time spent rendering the response (DRF renderers, templates)
+
+Queries are counted by an execute_wrapper installed on every database
+connection when it opens (api/signals.py), so replicas and the worker
+threads that run async views' ORM calls are covered too; under ASGI the
+middleware stays async. The numbers are
+
+- sent back in a Server-Timing header when API_SERVER_TIMING is on, which
+  browser dev tools show next to the request
+- aggregated per view name into fixed-bucket histograms, served to admins at
+  /api/instrumentation/ (GET to read, DELETE to reset)
+
+A request that repeats one statement API_REPEATED_QUERY_WARNING times or more
+is logged to 'api.instrumentation' with the statement.
+
+Histograms live in process memory: with several worker processes each
+reports its own share. The overhead budget is REQUEST_BUDGET_US per request
+plus QUERY_BUDGET_US per query; `manage.py benchmark instrumentation`
+checks it.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds; the last bucket counts everything above.
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Overhead budget in microseconds.
+REQUEST_BUDGET_US = 50
+QUERY_BUDGET_US = 5
+
+_current = ContextVar('api_request_stats', default=None)
+
+
+class RequestStats:
+    """What one request did; times are in seconds."""
+
+    __slots__ = ('queries', 'sql_time', 'phases')
+
+    def __init__(self):
+        self.queries = Counter()
+        self.sql_time = 0.0
+        self.phases = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def repeated(self):
+        return self.query_count - len(self.queries)
+
+    def most_repeated(self):
+        """(sql, times run) of the statement run most often, or None."""
+        if not self.queries:
+            return None
+        return self.queries.most_common(1)[0]
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper: counts and times statements while stats are being collected."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - start
+        stats.queries[sql] += 1
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorder():
+    # Covers this thread's connections opened before the connection_created
+    # receiver was connected; the wrapper stays installed and costs one
+    # ContextVar lookup outside collect().
+    for alias in connections:
+        instrument(connections[alias])
+
+
+@contextmanager
+def collect():
+    """Collect RequestStats for the queries and phases run inside the block."""
+    install_query_recorder()
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to `phase` of the current request, if any."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[phase] += time.perf_counter() - start
+
+
+# -----------------------------
+# AGGREGATION
+# -----------------------------
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of values (None past the last)."""
+        if not self.count:
+            return None
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= fraction * self.count:
+                return self.bounds[index] if index < len(self.bounds) else None
+        return None
+
+    def as_dict(self):
+        labels = ['le_%s' % bound for bound in self.bounds] + ['inf']
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class ViewStats:
+    METRICS = {
+        'wall_ms': MS_BUCKETS,
+        'sql_ms': MS_BUCKETS,
+        'serialize_ms': MS_BUCKETS,
+        'render_ms': MS_BUCKETS,
+        'queries': COUNT_BUCKETS,
+        'repeated_queries': COUNT_BUCKETS,
+    }
+
+    def __init__(self):
+        self.histograms = {name: Histogram(bounds) for name, bounds in self.METRICS.items()}
+        self.worst_repeat = None
+
+    def add(self, wall, stats):
+        values = {
+            'wall_ms': wall * 1000,
+            'sql_ms': stats.sql_time * 1000,
+            'serialize_ms': stats.phases['serialize'] * 1000,
+            'render_ms': stats.phases['render'] * 1000,
+            'queries': stats.query_count,
+            'repeated_queries': stats.repeated,
+        }
+        for name, value in values.items():
+            self.histograms[name].add(value)
+
+        repeat = stats.most_repeated()
+        if repeat and repeat[1] > 1 and (self.worst_repeat is None or repeat[1] > self.worst_repeat[1]):
+            self.worst_repeat = repeat
+
+    def as_dict(self):
+        data = {name: histogram.as_dict() for name, histogram in self.histograms.items()}
+        data['requests'] = self.histograms['wall_ms'].count
+        if self.worst_repeat:
+            data['most_repeated_query'] = {'sql': self.worst_repeat[0], 'times': self.worst_repeat[1]}
+        return data
+
+
+_lock = threading.Lock()
+_views = {}
+
+
+def record_request(view_name, wall, stats):
+    with _lock:
+        view_stats = _views.get(view_name)
+        if view_stats is None:
+            view_stats = _views[view_name] = ViewStats()
+        view_stats.add(wall, stats)
+
+
+def get_snapshot():
+    with _lock:
+        return {name: view_stats.as_dict() for name, view_stats in sorted(_views.items())}
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+# -----------------------------
+# MIDDLEWARE AND SERIALIZERS
+# -----------------------------
+
+def server_timing(wall, stats):
+    return ', '.join([
+        'app;dur=%.3f' % (wall * 1000),
+        'db;dur=%.3f;desc="%d queries (%d repeated)"' % (stats.sql_time * 1000, stats.query_count, stats.repeated),
+        'serialize;dur=%.3f' % (stats.phases['serialize'] * 1000),
+        'render;dur=%.3f' % (stats.phases['render'] * 1000),
+    ])
+
+
+class InstrumentationMiddleware:
+    """Times each request and its queries; see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with collect() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, time.perf_counter() - start, stats)
+
+    async def __acall__(self, request):
+        # The view's queries run in worker threads, on connections that were
+        # instrumented when they opened; the ContextVar follows them there.
+        start = time.perf_counter()
+        with collect() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, time.perf_counter() - start, stats)
+
+    def finish(self, request, response, wall, stats):
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or '<unresolved>'
+        record_request(view_name, wall, stats)
+
+        repeat = stats.most_repeated()
+        threshold = getattr(settings, 'API_REPEATED_QUERY_WARNING', 10)
+        if repeat and repeat[1] >= threshold:
+            logger.warning('%s ran the same query %d times: %s', view_name, repeat[1], repeat[0])
+        if getattr(settings, 'API_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(wall, stats)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before response.render(); the callback runs just after.
+        stats = _current.get()
+        if stats is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                stats.phases['render'] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class TimedSerializerMixin:
+    """Serializer mixin: building .data counts as the request's 'serialize' time."""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
@@ -0,0 +1,105 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from api.benchmarks import BENCHMARKS, compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a Book API benchmark scenario against synthetic data. "
+        "All seeded rows are rolled back when the run finishes. "
+        "--json saves the results; --compare fails when they regressed against a saved run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(BENCHMARKS))
+        parser.add_argument('--rows', type=int, help="Number of books to seed (scenario default if omitted).")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed repetitions per measurement.")
+        parser.add_argument('--json', metavar='PATH', help="Write the results to this file as JSON.")
+        parser.add_argument('--compare', metavar='PATH', help="A --json file to compare the results against.")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Relative slowdown that counts as a regression with --compare (default 0.2 = 20%%).",
+        )
+        parser.add_argument(
+            '--metrics', default='median_ms',
+            help="Comma separated timings to compare (default median_ms; p99_ms is noisy at low --repeat).",
+        )
+
+    def handle(self, *args, **options):
+        scenario = BENCHMARKS[options['scenario']]
+        if options['rows'] is None:
+            options['rows'] = scenario.default_rows
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError("--rows and --repeat must be positive.")
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError("Cannot read baseline %s: %s" % (options['compare'], exc))
+            if baseline.get('scenario') != options['scenario']:
+                raise CommandError("%s holds results of '%s'." % (options['compare'], baseline.get('scenario')))
+
+        self.stdout.write("Seeding %d books for '%s'..." % (options['rows'], options['scenario']))
+        # Measure the views, not the rate limiter (see api/throttling.py).
+        unthrottled = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+        with override_settings(REST_FRAMEWORK=unthrottled):
+            if scenario.transactional:
+                with transaction.atomic():
+                    results = scenario(options)
+                    transaction.set_rollback(True)
+            else:
+                results = scenario(options)
+
+        for row in results:
+            extra = ''.join(
+                "   %s %s" % (key, value) for key, value in row.items()
+                if key not in ('name', 'min_ms', 'median_ms', 'p99_ms')
+            )
+            self.stdout.write(
+                "%-40s min %9.3f ms   median %9.3f ms   p99 %9.3f ms%s"
+                % (row['name'], row['min_ms'], row['median_ms'], row['p99_ms'], extra)
+            )
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    'scenario': options['scenario'],
+                    'rows': options['rows'],
+                    'repeat': options['repeat'],
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write("Results written to %s" % options['json'])
+
+        if baseline is not None:
+            if baseline.get('rows') != options['rows']:
+                self.stderr.write("Warning: the baseline was seeded with %s rows." % baseline.get('rows'))
+            self.compare(baseline, results, options['threshold'], options['metrics'].split(','))
+
+    def compare(self, baseline, results, threshold, metrics):
+        rows, regressions = compare_results(baseline['results'], results, threshold, metrics)
+        if not rows:
+            raise CommandError("No results in common with the baseline; was it run with other --rows?")
+        self.stdout.write("\nAgainst the baseline from %s:" % baseline.get('created', 'an unknown date'))
+        for name, changes in rows:
+            self.stdout.write("%-40s%s" % (name, ''.join(
+                "   %s %.3f -> %.3f (%+.0f%%)" % (metric, old, new, change * 100)
+                for metric, (old, new, change) in changes.items()
+            )))
+        if regressions:
+            raise CommandError(
+                "%d regression(s) over %.0f%%:\n%s" % (len(regressions), threshold * 100, '\n'.join(regressions))
+            )
+        self.stdout.write("No regressions over %.0f%%." % (threshold * 100))
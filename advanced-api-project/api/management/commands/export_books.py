@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.export import CSVRenderer, NDJSONRenderer, iter_rows
+from api.views import BookExportView
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the book catalogue to a file as NDJSON or CSV. "
+        "--query takes the same filters as /api/books/, e.g. "
+        "\"search=achebe&ordering=-publication_year\"."
+    )
+
+    renderers = {renderer.format: renderer for renderer in (NDJSONRenderer, CSVRenderer)}
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(self.renderers), default='ndjson')
+        parser.add_argument('--query', default='', help="Filter/search/ordering query string.")
+        parser.add_argument('--output', '-o', help="Output file (defaults to stdout).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/books/export/', QueryDict(options['query'])))
+        view = BookExportView(request=request, format_kwarg=None, args=(), kwargs={})
+        try:
+            queryset = view.filter_queryset(view.get_queryset())
+        except ValidationError as exc:
+            raise CommandError("Invalid --query: %s" % exc.detail)
+
+        lines = self.renderers[options['format']]().stream(iter_rows(queryset, options['chunk_size']))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
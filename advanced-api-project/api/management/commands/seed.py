@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.seeding import seed_catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic catalogue: authors and books with "
+        "power-law books per author (see api/seeding.py). Rows are added to "
+        "what is already there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000, help="Authors to create (0: use existing authors).")
+        parser.add_argument('--books', type=int, default=100_000, help="Books to create.")
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help="Zipf exponent of books per author; 0 spreads books evenly (default 1.1).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=10_000, help="Books per bulk_create and transaction.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes building and inserting chunks.")
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help="SQLite: drop the book indexes and search trigger during the load and rebuild them "
+                 "afterwards. Much faster for large loads; only use it while nothing else uses the database.",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--database', default='default', help="Database alias to seed.")
+
+    def handle(self, *args, **options):
+        if min(options['authors'], options['books'], options['skew']) < 0:
+            raise CommandError("--authors, --books and --skew cannot be negative.")
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError("--chunk-size and --workers must be positive.")
+
+        start = time.perf_counter()
+        last_report = [start]
+
+        def progress(done):
+            now = time.perf_counter()
+            if now - last_report[0] >= 5 or done == options['books']:
+                last_report[0] = now
+                self.stdout.write("  %d/%d books (%.0f/s)" % (done, options['books'], done / (now - start)))
+
+        try:
+            books = seed_catalogue(
+                options['authors'], options['books'], skew=options['skew'], chunk_size=options['chunk_size'],
+                workers=options['workers'], seed=options['seed'], defer_indexes=options['defer_indexes'],
+                using=options['database'], progress=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            "Created %d authors and %d books in %.1f s." % (options['authors'], books, time.perf_counter() - start)
+        ))
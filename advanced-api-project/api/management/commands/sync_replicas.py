@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replication import sync_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the read replicas in "
+        "settings.REPLICA_DATABASES (a local stand-in for replication)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Keep copying every INTERVAL seconds.")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval is not None and interval <= 0:
+            raise CommandError("--interval must be positive.")
+
+        while True:
+            try:
+                aliases = sync_replicas()
+            except ValueError as exc:
+                raise CommandError(exc)
+            if not aliases:
+                raise CommandError("settings.REPLICA_DATABASES is empty.")
+            self.stdout.write("Synced %s." % ", ".join(aliases))
+            if interval is None:
+                return
+            time.sleep(interval)
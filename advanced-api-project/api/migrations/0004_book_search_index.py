@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:06
+
+import api.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# FTS5 index over each book's title and its author's name, with prefix
+# indexes for 2- and 3-character prefixes. rowid is the book id.
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_book_fts USING fts5(
+        title, author_name, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    INSERT INTO api_book_fts (rowid, title, author_name)
+    SELECT api_book.id, api_book.title, api_author.name
+    FROM api_book INNER JOIN api_author ON api_author.id = api_book.author_id
+    """,
+    """
+    CREATE TRIGGER api_book_fts_insert AFTER INSERT ON api_book BEGIN
+        INSERT INTO api_book_fts (rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM api_author WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER api_book_fts_update AFTER UPDATE OF title, author_id ON api_book BEGIN
+        UPDATE api_book_fts
+        SET title = new.title, author_name = (SELECT name FROM api_author WHERE id = new.author_id)
+        WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_book_fts_delete AFTER DELETE ON api_book BEGIN
+        DELETE FROM api_book_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_author_fts_update AFTER UPDATE OF name ON api_author BEGIN
+        UPDATE api_book_fts SET author_name = new.name
+        WHERE rowid IN (SELECT id FROM api_book WHERE author_id = new.id);
+    END
+    """,
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS api_author_fts_update",
+    "DROP TRIGGER IF EXISTS api_book_fts_delete",
+    "DROP TRIGGER IF EXISTS api_book_fts_update",
+    "DROP TRIGGER IF EXISTS api_book_fts_insert",
+    "DROP TABLE IF EXISTS api_book_fts",
+]
+
+
+def run_on_sqlite(statements):
+    # Other databases fall back to SearchFilter (see api/search.py).
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchIndex',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='api.book')),
+                ('title', models.TextField()),
+                ('author_name', models.TextField()),
+                ('document', api.search.FullTextField(db_column='api_book_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_book_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_on_sqlite(FTS_SQL), run_on_sqlite(DROP_FTS_SQL)),
+    ]
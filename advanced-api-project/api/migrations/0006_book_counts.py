@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def change_count(table, column, value, delta):
+    """Statements adding `delta` (+1/-1) to the count of one group, dropping it at zero."""
+    if delta > 0:
+        return [
+            "INSERT INTO {table} ({column}, book_count) VALUES ({value}, 1) "
+            "ON CONFLICT ({column}) DO UPDATE SET book_count = book_count + 1;".format(
+                table=table, column=column, value=value,
+            ),
+        ]
+    return [
+        "UPDATE {table} SET book_count = book_count - 1 WHERE {column} = {value};".format(
+            table=table, column=column, value=value,
+        ),
+        "DELETE FROM {table} WHERE {column} = {value} AND book_count = 0;".format(
+            table=table, column=column, value=value,
+        ),
+    ]
+
+
+YEAR = ('api_bookcountbyyear', 'publication_year')
+AUTHOR = ('api_bookcountbyauthor', 'author_id')
+
+
+def trigger(name, event, body, when=''):
+    return "CREATE TRIGGER {name} AFTER {event} ON api_book {when} BEGIN\n    {body}\nEND".format(
+        name=name, event=event, when=when, body='\n    '.join(body),
+    )
+
+
+# Triggers maintaining the per-year and per-author book counts, and the
+# initial counts of the books already there.
+STATS_SQL = [
+    trigger('api_book_stats_insert', 'INSERT', [
+        *change_count(*YEAR, 'new.publication_year', +1),
+        *change_count(*AUTHOR, 'new.author_id', +1),
+    ]),
+    trigger('api_book_stats_delete', 'DELETE', [
+        *change_count(*YEAR, 'old.publication_year', -1),
+        *change_count(*AUTHOR, 'old.author_id', -1),
+    ]),
+    trigger('api_book_stats_update_year', 'UPDATE OF publication_year', [
+        *change_count(*YEAR, 'old.publication_year', -1),
+        *change_count(*YEAR, 'new.publication_year', +1),
+    ], when='WHEN old.publication_year IS NOT new.publication_year'),
+    trigger('api_book_stats_update_author', 'UPDATE OF author_id', [
+        *change_count(*AUTHOR, 'old.author_id', -1),
+        *change_count(*AUTHOR, 'new.author_id', +1),
+    ], when='WHEN old.author_id IS NOT new.author_id'),
+    """
+    INSERT INTO api_bookcountbyyear (publication_year, book_count)
+    SELECT publication_year, COUNT(*) FROM api_book GROUP BY publication_year
+    """,
+    """
+    INSERT INTO api_bookcountbyauthor (author_id, book_count)
+    SELECT author_id, COUNT(*) FROM api_book GROUP BY author_id
+    """,
+]
+
+DROP_STATS_SQL = [
+    "DROP TRIGGER IF EXISTS api_book_stats_update_author",
+    "DROP TRIGGER IF EXISTS api_book_stats_update_year",
+    "DROP TRIGGER IF EXISTS api_book_stats_delete",
+    "DROP TRIGGER IF EXISTS api_book_stats_insert",
+]
+
+
+def run_on_sqlite(statements):
+    # Other databases count the books on every request (see api/stats.py).
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_book_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookCountByYear',
+            fields=[
+                ('publication_year', models.IntegerField(primary_key=True, serialize=False)),
+                ('book_count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookCountByAuthor',
+            fields=[
+                ('author', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='book_stats', serialize=False, to='api.author')),
+                ('book_count', models.PositiveIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-book_count', 'author'], name='bookcount_author_top_idx')],
+            },
+        ),
+        migrations.RunPython(run_on_sqlite(STATS_SQL), run_on_sqlite(DROP_STATS_SQL)),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:53
+
+from django.db import migrations, models
+
+
+# JSON snapshots of a row, as the change feed reports it.
+BOOK_JSON = "json_object('id', {row}.id, 'title', {row}.title, 'publication_year', {row}.publication_year, 'author', {row}.author_id)"
+AUTHOR_JSON = "json_object('id', {row}.id, 'name', {row}.name)"
+
+
+def log_trigger(table, model, action, data):
+    event, row = {'create': ('INSERT', 'new'), 'update': ('UPDATE', 'new'), 'delete': ('DELETE', 'old')}[action]
+    return """
+    CREATE TRIGGER {table}_changelog_{action} AFTER {event} ON {table} BEGIN
+        INSERT INTO api_changelogentry (model, object_id, action, data, changed_at)
+        VALUES ('{model}', {row}.id, '{action}', {data}, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """.format(
+        table=table, model=model, action=action, event=event, row=row,
+        data=data.format(row=row) if data else 'NULL',
+    )
+
+
+CHANGELOG_SQL = [
+    log_trigger('api_book', 'book', 'create', BOOK_JSON),
+    log_trigger('api_book', 'book', 'update', BOOK_JSON),
+    log_trigger('api_book', 'book', 'delete', None),
+    log_trigger('api_author', 'author', 'create', AUTHOR_JSON),
+    log_trigger('api_author', 'author', 'update', AUTHOR_JSON),
+    log_trigger('api_author', 'author', 'delete', None),
+]
+
+DROP_CHANGELOG_SQL = [
+    'DROP TRIGGER IF EXISTS %s_changelog_%s' % (table, action)
+    for table in ('api_author', 'api_book') for action in ('delete', 'update', 'create')
+]
+
+
+def run_on_sqlite(statements):
+    # The change feed is only recorded on SQLite (see api/changes.py).
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_book_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'create'), ('update', 'update'), ('delete', 'delete')], max_length=6)),
+                ('data', models.JSONField(null=True)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(run_on_sqlite(CHANGELOG_SQL), run_on_sqlite(DROP_CHANGELOG_SQL)),
+    ]
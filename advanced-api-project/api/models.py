@@ -1,8 +1,12 @@
 from django.db import models
 
+from .search import FullTextField
+
 # Author model represents a book author
 class Author(models.Model):
     name = models.CharField(max_length=255)
+    # Change tracking for conditional GET (see api/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -13,10 +17,86 @@ class Book(models.Model):
     title = models.CharField(max_length=255)
     publication_year = models.IntegerField()
     author = models.ForeignKey(Author, related_name="books", on_delete=models.CASCADE)
+    # Change tracking for conditional GET; indexed so Max() is a single seek
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         # Added for clarity in admin
         ordering = ["title"]
+        # One index per orderable field, with id as the keyset tie-breaker,
+        # so every cursor page is an index seek (see api/pagination.py).
+        # The composites serve each filterset field combined with each
+        # ordering of BookListView without a full scan or a sort; the
+        # query-plan suite in api/test_query_plans.py keeps them honest.
+        indexes = [
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(fields=["publication_year", "id"], name="book_year_id_idx"),
+            models.Index(fields=["title", "publication_year", "id"], name="book_title_year_id_idx"),
+            models.Index(fields=["publication_year", "title", "id"], name="book_year_title_id_idx"),
+            models.Index(fields=["author", "title", "id"], name="book_author_title_id_idx"),
+            models.Index(fields=["author", "publication_year", "id"], name="book_author_year_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+
+# BookSearchIndex maps the FTS5 virtual table behind ?search= (see
+# api/search.py). It is not managed by Django: migration 0004 creates the
+# table and the triggers that keep it in sync with Book and Author.
+# NOTE: on SQLite, field changes that make Django rebuild api_book (most
+# AlterField operations) drop those triggers; such migrations must
+# re-create them.
+class BookSearchIndex(models.Model):
+    book = models.OneToOneField(
+        Book, primary_key=True, db_column="rowid", on_delete=models.DO_NOTHING, related_name="search_index"
+    )
+    title = models.TextField()
+    author_name = models.TextField()
+    # FTS5 hidden columns: the table-named column accepts MATCH, rank is bm25
+    document = FullTextField(db_column="api_book_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "api_book_fts"
+
+
+# BookCountByYear and BookCountByAuthor are the materialized book counts
+# behind /api/books/stats/ (see api/stats.py). SQL triggers from migration
+# 0006 keep them current on every insert, update and delete of api_book, so
+# the endpoint reads one row per group instead of counting every book. A
+# group's row disappears when its count drops to zero. The same NOTE as for
+# BookSearchIndex applies: migrations that rebuild api_book must re-create
+# the triggers.
+class BookCountByYear(models.Model):
+    publication_year = models.IntegerField(primary_key=True)
+    book_count = models.PositiveIntegerField()
+
+
+class BookCountByAuthor(models.Model):
+    author = models.OneToOneField(
+        Author, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="book_stats"
+    )
+    book_count = models.PositiveIntegerField()
+
+    class Meta:
+        # Top-N authors is a walk down this index.
+        indexes = [models.Index(fields=["-book_count", "author"], name="bookcount_author_top_idx")]
+
+
+# ChangeLogEntry is the append-only change feed behind /api/changes/ (see
+# api/changes.py). SQL triggers from migration 0007 add one entry for every
+# insert, update and delete of api_book and api_author, inside the writing
+# transaction, so an entry exists exactly when its change was committed.
+# seq never goes backwards and is never reused (AUTOINCREMENT).
+class ChangeLogEntry(models.Model):
+    ACTIONS = [("create", "create"), ("update", "update"), ("delete", "delete")]
+
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTIONS)
+    # The row after the change; null for deletes
+    data = models.JSONField(null=True)
+    changed_at = models.DateTimeField()
@@ -0,0 +1,126 @@
+"""
+QUERYSET OPTIMIZATION FROM SERIALIZER FIELDS
+--------------------------------------------
+Nested serializers quietly cause N+1 queries: AuthorSerializer renders
+`books` for every author, and without a prefetch that is one extra query per
+author. Instead of hand-writing select_related/prefetch_related for every
+view, optimize_queryset() walks the serializer's field tree and applies them:
+
+- nested serializer on a forward FK / one-to-one  -> select_related
+- nested serializer on a reverse FK / many-to-many -> Prefetch (recursively
+  optimized for the child serializer)
+- related fields that only need the primary key   -> nothing (the FK column
+  is already on the row)
+- other related fields (StringRelatedField, ...)  -> select_related / prefetch
+
+narrow_queryset() then defers every column nobody reads with .only(): the
+serializer's own fields, the ordering columns (keyset cursors read them) and
+the view's `always_load_fields`. That is what makes ?fields= (see
+api/fieldsets.py) cheaper in SQL as well as in the payload.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def optimize_queryset(queryset, serializer):
+    """Return `queryset` with the joins/prefetches `serializer` will need."""
+    select, prefetch = collect_lookups(serializer, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def collect_lookups(serializer, model, prefix=''):
+    select, prefetch = [], []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        path = prefix + field.source
+        related_model = model_field.related_model
+
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(field, serializers.ListSerializer):
+                child_queryset = optimize_queryset(related_model._default_manager.all(), field.child)
+                prefetch.append(Prefetch(path, queryset=child_queryset))
+            else:
+                prefetch.append(path)
+
+        elif isinstance(field, serializers.BaseSerializer):
+            select.append(path)
+            nested_select, nested_prefetch = collect_lookups(field, related_model, path + '__')
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+
+        elif not (isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization()):
+            select.append(path)
+
+    return select, prefetch
+
+
+def get_loaded_fields(serializer, model):
+    """
+    Names of the concrete `model` fields `serializer` reads, or None when it
+    renders something that is not a plain model field (a method, a property,
+    a dotted source) and nothing may safely be deferred.
+    """
+    names = [model._meta.pk.name]
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            continue  # Prefetched separately; nothing to load on this row.
+        if not model_field.concrete:
+            return None
+        # A forward FK is loaded through its own column; select_related()
+        # brings in the related row in full.
+        names.append(model_field.name)
+    return names
+
+
+def narrow_queryset(queryset, serializer, always_load=()):
+    """Return `queryset` limited with .only() to the columns that will be read."""
+    names = get_loaded_fields(serializer, queryset.model)
+    if names is None:
+        return queryset
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    for name in ordering:
+        if isinstance(name, str):
+            name = name.lstrip('-')
+            if name != 'pk' and '__' not in name and name not in queryset.query.annotations:
+                names.append(name)
+    names.extend(always_load)
+    return queryset.only(*dict.fromkeys(names))
+
+
+class OptimizedQuerysetMixin:
+    """Generic view mixin that optimizes get_queryset() for its serializer."""
+
+    # Model fields to load even though the serializer does not render them.
+    always_load_fields = ()
+
+    def get_queryset(self):
+        return optimize_queryset(super().get_queryset(), self.get_serializer())
+
+    def filter_queryset(self, queryset):
+        # After filtering, so the final ordering is known.
+        queryset = super().filter_queryset(queryset)
+        return narrow_queryset(queryset, self.get_serializer(), self.always_load_fields)
@@ -0,0 +1,243 @@
+"""
+KEYSET (CURSOR) PAGINATION
+--------------------------
+LimitOffsetPagination makes the database walk past every skipped row, so
+page 10,000 costs far more than page 1. Keyset pagination instead remembers
+the sort values of the last row it returned and asks for rows that sort
+strictly after them:
+
+    WHERE title > 'X' OR (title = 'X' AND id > 42) ORDER BY title, id
+
+The ordering is whatever the filter chain applied (OrderingFilter's
+?ordering=... or Model.Meta.ordering), with the primary key appended as a
+tie-breaker so every row has a unique, stable position.
+"""
+
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.db.models.expressions import Col
+from django.db.models.lookups import Exact
+from django.db.models.sql.where import AND
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views (see api/async_views.py)."""
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([row async for row in queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.ordering_fields = [self.get_ordering_field(queryset, field.lstrip('-')) for field in self.ordering]
+        position, self.reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+
+        queryset = queryset.order_by(*self.get_query_ordering())
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+
+        # Fetch one extra row to find out whether there is another page.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # -----------------------------
+    # ORDERING
+    # -----------------------------
+
+    def get_ordering(self, queryset):
+        # Local fields and annotations only: values on related rows are not
+        # on the instance and could not be put into the cursor.
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field:
+                raise ValueError(
+                    'KeysetPagination only supports ordering on local fields or annotations, got %r.' % (field,)
+                )
+
+        # A column pinned by an equality filter (?title=X&ordering=title) does
+        # not order anything. Leaving it in makes SQLite treat the keyset
+        # range on it as the index constraint and sort the rest in a temp
+        # B-tree, so drop it from both the ORDER BY and the cursor.
+        constant = get_equality_filtered_fields(queryset)
+        ordering = [field for field in ordering if field.lstrip('-') not in constant]
+
+        pk_names = {'pk', queryset.model._meta.pk.name}
+        if not any(field.lstrip('-') in pk_names for field in ordering):
+            # Tie-break in the same direction as the last field, so that
+            # `ORDER BY title DESC, id DESC` can walk a (title, id) index backwards.
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def get_ordering_field(self, queryset, name):
+        """The model field, or the annotation's output field, that `name` orders by."""
+        if name == 'pk':
+            return self.model._meta.pk
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field
+
+    def get_query_ordering(self):
+        if not self.reverse:
+            return self.ordering
+        return [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+
+    def keyset_filter(self, position):
+        """Rows that sort strictly after `position` in the current direction."""
+        keyset = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            after = 'lt' if field.startswith('-') != self.reverse else 'gt'
+            keyset |= equal & Q(**{'%s__%s' % (name, after): value})
+            equal &= Q(**{name: value})
+
+        # Redundant bound on the leading column so SQLite can seek the index
+        # instead of evaluating the OR chain against every row.
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') != self.reverse else 'gte'
+        return Q(**{'%s__%s' % (first.lstrip('-'), bound): position[0]}) & keyset
+
+    def get_position(self, instance):
+        # Rows from values_list(named=True) (see api/fastpath.py) have no _meta.
+        opts = getattr(instance, '_meta', None) or self.model._meta
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if name == 'pk':
+                position.append(instance.pk)
+                continue
+            try:
+                name = opts.get_field(name).attname
+            except FieldDoesNotExist:
+                pass  # An annotation such as FullTextSearchFilter's search_rank
+            position.append(getattr(instance, name))
+        return position
+
+    # -----------------------------
+    # LINKS AND CURSORS
+    # -----------------------------
+
+    def get_next_link(self):
+        if self.reverse:
+            # We came from the following page, so it always exists.
+            if not self.page:
+                return None
+        elif not self.has_more:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if self.reverse:
+            if not self.has_more:
+                return None
+        elif not self.has_cursor or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        token = self.encode_token(position, reverse)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def encode_token(self, position, reverse=False):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        return b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(b64decode(token.encode(), validate=True).decode())
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            # The cursor was issued for a different ?ordering=...
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [self.to_python(field, value) for field, value in zip(self.ordering_fields, position)]
+        except (TypeError, ValueError, ValidationError):
+            # A hand-edited position would otherwise fail in the query.
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def to_python(self, field, value):
+        # Ordered fields are non-null here, and keyset_filter could not
+        # compare with NULL anyway.
+        if value is None:
+            raise ValueError('Cursor values cannot be null.')
+        return field.to_python(value)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+
+def get_equality_filtered_fields(queryset):
+    """Names of local fields the queryset's WHERE pins with `field = value`."""
+    where = queryset.query.where
+    if where.connector != AND or where.negated:
+        return set()
+
+    fields = set()
+    for child in where.children:
+        if isinstance(child, Exact) and isinstance(child.lhs, Col) and not hasattr(child.rhs, 'resolve_expression'):
+            if child.lhs.alias == queryset.query.base_table:
+                fields.add(child.lhs.target.name)
+    return fields
@@ -0,0 +1,31 @@
+"""
+REPLICATION STAND-IN FOR LOCAL SQLITE REPLICAS
+----------------------------------------------
+Production replicas are kept in sync by the database server. Locally the
+replicas in settings.REPLICA_DATABASES are plain SQLite files, and
+sync_replicas() plays the server's part: it copies the primary onto each of
+them with SQLite's online backup API, schema (including the FTS5 table and
+its triggers) and rows alike.
+
+Run it once after migrating, then either call it when a test wants the
+replicas to catch up or keep `python manage.py sync_replicas --interval 1`
+running to get a replica that trails the primary by about a second.
+"""
+
+from django.db import connections
+
+from .routers import PRIMARY, get_replicas
+
+
+def sync_replicas(aliases=None):
+    """Copy the primary database onto every replica alias in `aliases`."""
+    source = connections[PRIMARY]
+    source.ensure_connection()
+    aliases = get_replicas() if aliases is None else aliases
+    for alias in aliases:
+        target = connections[alias]
+        if target.vendor != 'sqlite' or source.vendor != 'sqlite':
+            raise ValueError('The replication stand-in only copies SQLite databases.')
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+    return aliases
@@ -0,0 +1,128 @@
+"""
+READ-REPLICA ROUTING
+--------------------
+With replicas listed in settings.REPLICA_DATABASES, PrimaryReplicaRouter
+sends
+
+- every write, and every query of a non-safe (POST/PUT/PATCH/DELETE)
+  request, to the primary ('default')
+- queries of GET/HEAD/OPTIONS requests to one replica, picked at random once
+  per request so a response never mixes two replicas' states
+
+Replicas lag behind the primary, so a client that just wrote would not see
+its own change. After a request that wrote, ReplicaRoutingMiddleware sets a
+cookie that keeps that client on the primary for REPLICA_MAX_LAG seconds
+(read-your-writes). Clients that send no cookies only get this within a
+request.
+
+Code running outside a request (management commands, the shell, signals
+fired from them) always uses the primary. Without replicas configured the
+router has no effect.
+"""
+
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+
+PRIMARY = 'default'
+PIN_COOKIE = 'api_read_primary'
+
+
+@dataclass
+class RoutingState:
+    replica: str = None
+    wrote: bool = False
+
+
+_state = ContextVar('api_routing_state', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+def get_max_lag():
+    """Seconds a replica may trail the primary."""
+    return getattr(settings, 'REPLICA_MAX_LAG', 5)
+
+
+def current_replica():
+    """The replica this request reads from, or None when it reads the primary."""
+    state = _state.get()
+    if state is None or state.wrote:
+        return None
+    return state.replica
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Everything else this request reads must see the write.
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary (see api/replication.py).
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Chooses the database a request reads from and pins writers to the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI, stay async so async views are not pushed onto a thread.
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        replicas = get_replicas()
+        state = RoutingState()
+        if replicas and request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES:
+            state.replica = random.choice(replicas)
+        return state
+
+    def finish(self, state, response):
+        if state.wrote and get_replicas():
+            response.set_cookie(PIN_COOKIE, '1', max_age=get_max_lag(), httponly=True, samesite='Lax')
+        return response
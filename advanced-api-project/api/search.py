@@ -0,0 +1,62 @@
+"""
+FULL-TEXT SEARCH (SQLite FTS5)
+------------------------------
+SearchFilter turns ?search=term into `title LIKE '%term%' OR name LIKE
+'%term%'` across a join, which has to look at every row. Instead, the
+`api_book_fts` FTS5 table indexes each book's title and author name:
+
+- it is kept in sync by SQL triggers on api_book / api_author (see migration
+  0004), so bulk_create, bulk_update and raw SQL writes are covered too
+- every search term becomes a prefix query ("ach" finds "Achebe")
+- results are ordered by bm25 relevance unless the client asks for an
+  explicit ?ordering=...
+
+FullTextSearchFilter is a drop-in replacement for SearchFilter and falls
+back to it on databases other than SQLite.
+"""
+
+from django.db import connections, models
+from rest_framework import filters
+
+
+class FullTextField(models.TextField):
+    """The hidden FTS5 column named after its table; supports `__match`."""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s MATCH %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+def build_match_query(terms):
+    """Turn search terms into an FTS5 query: every term, as a prefix, ANDed."""
+    phrases = []
+    for term in terms:
+        term = term.strip()
+        if term:
+            # Quoting makes FTS5 treat operators and punctuation literally.
+            phrases.append('"%s"*' % term.replace('"', '""'))
+    return ' '.join(phrases)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != 'sqlite':
+            return super().filter_queryset(request, queryset, view)
+
+        match = build_match_query(self.get_search_terms(request))
+        if not match:
+            return queryset
+
+        # bm25() scores are negative: the best match sorts first ascending.
+        return (
+            queryset
+            .filter(search_index__document__match=match)
+            .annotate(search_rank=models.F('search_index__rank'))
+            .order_by('search_rank', 'pk')
+        )
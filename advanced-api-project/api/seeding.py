@@ -0,0 +1,194 @@
+"""
+SYNTHETIC CATALOGUE DATA
+------------------------
+seed_catalogue() fills Author and Book with generated data shaped like a real
+catalogue rather than a uniform grid:
+
+- books per author follow a power law (Zipf with exponent `skew`): a few
+  prolific authors, a long tail with one or two books; skew=0 is uniform
+- titles come from a fixed vocabulary, so words repeat across titles as
+  they do in practice (and full-text search has something to rank)
+- publication years cluster around recent decades
+
+Books are inserted with bulk_create in chunks of `chunk_size`, one
+transaction per chunk. With `workers` > 1 the chunks are built and inserted
+by forked processes; SQLite still takes one writer at a time, so this mostly
+overlaps generating rows with writing them, while a server database writes
+in parallel too. Every chunk is generated from its own seeded RNG, so the
+data is the same for any number of workers.
+
+Maintaining api_book's eight indexes and the insert triggers of the search
+index, the book counts (see api/stats.py) and the change feed (see
+api/changes.py) row by row costs about twice as much as the inserts
+themselves. With
+`defer_indexes=True` (SQLite only) they are dropped for the load and rebuilt
+afterwards in one pass each. Meanwhile the table is unindexed and new books
+are not searchable, so only do this on a database nobody else is using.
+"""
+
+import itertools
+import multiprocessing
+import random
+from contextlib import contextmanager, nullcontext
+
+from django.db import connections, transaction
+
+from .cache import invalidate
+from .changes import log_books_after
+from .models import Author, Book
+from .stats import count_books_after
+
+
+SYLLABLES = [
+    'an', 'bel', 'cor', 'da', 'el', 'fin', 'gar', 'hel', 'ir', 'jo', 'ka', 'lin', 'mar', 'nor', 'o',
+    'per', 'qui', 'ros', 'sa', 'tor', 'u', 'val', 'wen', 'xi', 'yor', 'zan',
+]
+
+
+def make_words(count, rng):
+    return [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights of a Zipf distribution over `count` ranks."""
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class CatalogueGenerator:
+    """Builds unsaved Author and Book instances; see the module docstring."""
+
+    def __init__(self, seed=0, vocabulary=5000):
+        self.seed = seed
+        self.words = make_words(vocabulary, random.Random(seed))
+        # Common words are common in titles too.
+        self.word_weights = zipf_weights(vocabulary, 1.0)
+
+    def authors(self, count):
+        rng = random.Random('%s:authors' % self.seed)
+        return [
+            Author(name='%s %s' % (rng.choice(self.words).title(), rng.choice(self.words).title()))
+            for _ in range(count)
+        ]
+
+    def books(self, chunk, size, author_ids, author_weights):
+        rng = random.Random('%s:books:%d' % (self.seed, chunk))
+        books = []
+        for author_id in rng.choices(author_ids, cum_weights=author_weights, k=size):
+            title = ' '.join(rng.choices(self.words, cum_weights=self.word_weights, k=rng.randint(1, 5)))
+            books.append(Book(
+                title=title.capitalize(),
+                publication_year=min(2025, int(rng.triangular(1850, 2026, 2010))),
+                author_id=author_id,
+            ))
+        return books
+
+
+INSERT_TRIGGERS = ('api_book_fts_insert', 'api_book_stats_insert', 'api_book_changelog_create')
+
+
+@contextmanager
+def deferred_indexes(using):
+    """Drop api_book's indexes and insert triggers inside the block, rebuild them after it."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE tbl_name = %s AND type IN ('index', 'trigger') AND sql IS NOT NULL "
+            "AND (type = 'index' OR name IN (%s, %s, %s))",
+            [Book._meta.db_table, *INSERT_TRIGGERS],
+        )
+        deferred = cursor.fetchall()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM %s' % Book._meta.db_table)
+        last_id = cursor.fetchone()[0]
+        for kind, name, _ in deferred:
+            cursor.execute('DROP %s %s' % (kind.upper(), connection.ops.quote_name(name)))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for kind, name, sql in deferred:
+                cursor.execute(sql)
+            # What the triggers would have done for each new book.
+            dropped = {name for _, name, _ in deferred}
+            if 'api_book_stats_insert' in dropped:
+                count_books_after(cursor, last_id)
+            if 'api_book_changelog_create' in dropped:
+                log_books_after(cursor, last_id)
+            if 'api_book_fts_insert' in dropped:
+                cursor.execute(
+                    "INSERT INTO api_book_fts (rowid, title, author_name) "
+                    "SELECT api_book.id, api_book.title, api_author.name "
+                    "FROM api_book INNER JOIN api_author ON api_author.id = api_book.author_id "
+                    "WHERE api_book.id > %s",
+                    [last_id],
+                )
+
+
+# Set before the worker pool forks, so the children inherit it instead of
+# receiving the (possibly millions of) author ids by pickle.
+_job = None
+
+
+def insert_chunk(task):
+    chunk, size = task
+    generator, author_ids, author_weights, using = _job
+    books = generator.books(chunk, size, author_ids, author_weights)
+    with transaction.atomic(using=using):
+        Book.objects.using(using).bulk_create(books)
+    return len(books)
+
+
+def seed_catalogue(
+    authors, books, skew=1.1, chunk_size=10_000, workers=1, seed=0, defer_indexes=False, using='default', progress=None,
+):
+    """
+    Insert `authors` authors and `books` books, spreading the books over the
+    new authors (over all existing authors when `authors` is 0). `progress`
+    is called with the number of books inserted so far after every chunk.
+    """
+    global _job
+    generator = CatalogueGenerator(seed)
+    with transaction.atomic(using=using):
+        Author.objects.using(using).bulk_create(generator.authors(authors), batch_size=chunk_size)
+    author_ids = list(Author.objects.using(using).order_by('pk').values_list('pk', flat=True))
+    if authors:
+        author_ids = author_ids[-authors:]
+    if books and not author_ids:
+        raise ValueError('There are no authors to attribute books to.')
+    # Rank authors in random order so the prolific ones are not simply the oldest rows.
+    random.Random('%s:ranks' % seed).shuffle(author_ids)
+
+    tasks = list(enumerate(min(chunk_size, books - start) for start in range(0, books, chunk_size)))
+    _job = (generator, author_ids, zipf_weights(len(author_ids), skew), using)
+    try:
+        with deferred_indexes(using) if defer_indexes else nullcontext():
+            done = insert_chunks(tasks, workers, progress)
+    finally:
+        _job = None
+
+    # bulk_create sends no signals.
+    invalidate(Author)
+    invalidate(Book)
+    return done
+
+
+def insert_chunks(tasks, workers, progress):
+    done = 0
+    if workers > 1:
+        # Children must open their own connections.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            for inserted in pool.imap_unordered(insert_chunk, tasks):
+                done += inserted
+                if progress:
+                    progress(done)
+    else:
+        for task in tasks:
+            done += insert_chunk(task)
+            if progress:
+                progress(done)
+    return done
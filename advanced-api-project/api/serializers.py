@@ -1,24 +1,68 @@
 from rest_framework import serializers
+from .fieldsets import SparseFieldsMixin
+from .instrumentation import TimedSerializerMixin
 from .models import Author, Book
-from datetime import datetime
+from .validation import author_cache, current_year
 
 
-class BookSerializer(serializers.ModelSerializer):
+class AuthorPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that looks authors up in context['authors'] (a
+    pk -> Author map) when one is given, so bulk writes can resolve every
+    author of a batch with a single in_bulk() query instead of one each.
+    Otherwise known authors come from author_cache (see api/validation.py)
+    rather than a query per write.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        authors = self.context.get('authors')
+        author = authors.get(pk) if authors is not None else author_cache.get(pk)
+        if author is None:
+            self.fail('does_not_exist', pk_value=data)
+        return author
+
+
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    """The author as embedded in a book by ?expand=author."""
+
+    class Meta:
+        model = Author
+        fields = ['id', 'name']
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class BookSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    author = AuthorPrimaryKeyField(queryset=Author.objects.all())
+
+    expandable_fields = {
+        'author': lambda: AuthorSummarySerializer(read_only=True),
+    }
+
     class Meta:
         model = Book
         fields = ['id', 'title', 'publication_year', 'author']
+        list_serializer_class = TimedListSerializer
 
     # Custom validation for publication_year
     def validate_publication_year(self, value):
-        current_year = datetime.now().year
-        if value > current_year:
+        if value > current_year():
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     books = BookSerializer(many=True, read_only=True)
 
     class Meta:
         model = Author
         fields = ['id', 'name', 'books']
+        list_serializer_class = TimedListSerializer
@@ -0,0 +1,34 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .instrumentation import instrument
+from .models import Author, Book
+
+
+# -----------------------------------------------
+# CACHE INVALIDATION (see api/cache.py)
+# -----------------------------------------------
+# Any write to a Book or Author - through the API views, the admin or a
+# cascade - moves that model to a new cache generation. Bulk writes send no
+# signals, so api/bulk.py calls invalidate() itself.
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_cached_responses(sender, **kwargs):
+    invalidate(sender)
+
+
+# -----------------------------------------------
+# QUERY INSTRUMENTATION (see api/instrumentation.py)
+# -----------------------------------------------
+# Connections are opened lazily, per thread and alias. Instrumenting each
+# one as it opens covers the worker threads where async views run their
+# queries, which the middleware never runs in.
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrument(connection)
@@ -0,0 +1,84 @@
+"""
+BOOK STATISTICS
+---------------
+/api/books/stats/ returns grouped book counts:
+
+    total_books     number of books
+    by_year         [{"publication_year": 1958, "count": 3}, ...]
+    by_decade       [{"decade": 1950, "count": 5}, ...]
+    top_authors     [{"id": 1, "name": "Chinua Achebe", "count": 4}, ...],
+                    the ?top= (default 10, at most 1000) authors with the
+                    most books
+
+On SQLite the counts are read from the BookCountByYear / BookCountByAuthor
+summary tables, which triggers keep current on every Book write (see
+migration 0006), so a request costs O(years + top) rather than O(books).
+Other databases group the Book table itself with the same queries.
+"""
+
+from django.db import connections, router
+from django.db.models import Count, F, Sum
+
+from .models import Author, Book, BookCountByAuthor, BookCountByYear
+
+
+DEFAULT_TOP = 10
+MAX_TOP = 1000
+
+
+def has_summaries(using):
+    return connections[using].vendor == 'sqlite'
+
+
+def get_year_rows(using):
+    """The rows to group by year, and the aggregate that counts their books."""
+    if has_summaries(using):
+        return BookCountByYear.objects.using(using), Sum('book_count')
+    return Book.objects.using(using), Count('pk')
+
+
+def get_book_stats(top=DEFAULT_TOP, using=None):
+    using = using or router.db_for_read(Book)
+    rows, book_count = get_year_rows(using)
+    by_year = list(rows.values('publication_year').annotate(count=book_count).order_by('publication_year'))
+    by_decade = list(
+        rows.values(decade=F('publication_year') / 10 * 10).annotate(count=book_count).order_by('decade')
+    )
+
+    if has_summaries(using):
+        authors = (
+            BookCountByAuthor.objects.using(using)
+            .values(id=F('author_id'), name=F('author__name'), count=F('book_count'))
+            .order_by('-book_count', 'author_id')
+        )
+    else:
+        authors = (
+            Author.objects.using(using)
+            .annotate(count=Count('books'))
+            .filter(count__gt=0)
+            .values('id', 'name', 'count')
+            .order_by('-count', 'id')
+        )
+
+    return {
+        'total_books': sum(row['count'] for row in by_year),
+        'by_year': by_year,
+        'by_decade': by_decade,
+        'top_authors': list(authors[:top]),
+    }
+
+
+def count_books_after(cursor, last_id):
+    """Add books with ids above `last_id` to the summary tables (for loads that bypass the triggers)."""
+    cursor.execute(
+        "INSERT INTO api_bookcountbyyear (publication_year, book_count) "
+        "SELECT publication_year, COUNT(*) FROM api_book WHERE id > %s GROUP BY publication_year "
+        "ON CONFLICT (publication_year) DO UPDATE SET book_count = book_count + excluded.book_count",
+        [last_id],
+    )
+    cursor.execute(
+        "INSERT INTO api_bookcountbyauthor (author_id, book_count) "
+        "SELECT author_id, COUNT(*) FROM api_book WHERE id > %s GROUP BY author_id "
+        "ON CONFLICT (author_id) DO UPDATE SET book_count = book_count + excluded.book_count",
+        [last_id],
+    )
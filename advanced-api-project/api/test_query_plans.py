@@ -0,0 +1,106 @@
+"""
+Query-plan regression suite for BookListView
+
+Every filter / ordering / cursor combination the list endpoint supports is
+requested through the test client, and each SELECT it runs is fed to
+SQLite's EXPLAIN QUERY PLAN. A combination fails if its plan
+
+- scans api_book without an index ("SCAN api_book" with no "USING ... INDEX"), or
+- sorts in a temporary B-tree ("USE TEMP B-TREE FOR ORDER BY").
+
+Ranked full-text search is the one exception to the second rule: ordering
+matches by relevance always needs a sort over the matching rows.
+"""
+
+from itertools import combinations
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Author, Book
+
+
+FILTERS = ["title", "author", "publication_year"]
+ORDERINGS = [None, "title", "-title", "publication_year", "-publication_year"]
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class BookListQueryPlanTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name="Chinua Achebe")
+        # Two identical books so every combination has a second page.
+        for _ in range(2):
+            Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+
+    def filter_values(self):
+        return {"title": "Things Fall Apart", "author": self.author.id, "publication_year": 1958}
+
+    def plans_for(self, url):
+        """EXPLAIN QUERY PLAN lines for every book query `url` runs."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query["sql"]
+                if sql.startswith("SELECT") and '"api_book"' in sql:
+                    cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                    plans.append([row[-1] for row in cursor.fetchall()])
+        self.assertTrue(plans, "no book query captured for %s" % url)
+        return response, plans
+
+    def assertNoFullScan(self, plans, url):
+        for plan in plans:
+            for line in plan:
+                if line.startswith("SCAN api_book") and "INDEX" not in line and "VIRTUAL TABLE" not in line:
+                    self.fail("Full table scan for %s:\n%s" % (url, "\n".join(plan)))
+
+    def assertNoTempSort(self, plans, url):
+        for plan in plans:
+            for line in plan:
+                if "USE TEMP B-TREE" in line:
+                    self.fail("Temp B-tree sort for %s:\n%s" % (url, "\n".join(plan)))
+
+    def combinations(self):
+        values = self.filter_values()
+        for size in range(len(FILTERS) + 1):
+            for fields in combinations(FILTERS, size):
+                for ordering in ORDERINGS:
+                    params = ["%s=%s" % (field, values[field]) for field in fields]
+                    if ordering:
+                        params.append("ordering=" + ordering)
+                    params.append("page_size=1")
+                    yield reverse("book-list") + "?" + "&".join(params)
+
+    def test_filter_and_ordering_combinations_use_indexes(self):
+        for url in self.combinations():
+            with self.subTest(url=url):
+                response, plans = self.plans_for(url)
+                self.assertNoFullScan(plans, url)
+                self.assertNoTempSort(plans, url)
+
+                # The second page adds the keyset condition to the same query.
+                next_url = response.data["next"]
+                self.assertIsNotNone(next_url, url)
+                _, plans = self.plans_for(next_url)
+                self.assertNoFullScan(plans, next_url)
+                self.assertNoTempSort(plans, next_url)
+
+    def test_search_never_scans_books(self):
+        for ordering in ORDERINGS:
+            url = reverse("book-list") + "?search=things&page_size=1"
+            if ordering:
+                url += "&ordering=" + ordering
+            with self.subTest(url=url):
+                response, plans = self.plans_for(url)
+                self.assertNoFullScan(plans, url)
+                _, plans = self.plans_for(response.data["next"])
+                self.assertNoFullScan(plans, url)
@@ -7,12 +7,42 @@ This file contains:
 - Tests for authentication and permission handling
 """
 
+from unittest import mock, skipUnless
+
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
 from django.contrib.auth import get_user_model
 
-from .models import Author, Book
+from . import instrumentation
+from .benchmarks import compare_results
+from .cache import get_cache
+from .models import Author, Book, BookCountByAuthor, BookCountByYear, BookSearchIndex, ChangeLogEntry
+from .replication import sync_replicas
+from .routers import PIN_COOKIE, ReplicaRoutingMiddleware, current_replica
+from .throttling import RateLimitHeadersMiddleware, TokenBucketThrottle
+from .validation import AuthorCache
+from . import validation
+from .serializers import BookSerializer
+from .views import BookListView
+from .testing import QueryCountAssertionsMixin
 
 
 User = get_user_model()
@@ -23,7 +53,7 @@ class BookAPITests(APITestCase):
 
     def setUp(self):
         # Create a user for authenticated operations
-        self.user = User.objects.create_user(email="test@example.com", password="password123")
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="password123")
 
         # Create sample authors
         self.author1 = Author.objects.create(name="Chinua Achebe")
@@ -44,7 +74,7 @@ class BookAPITests(APITestCase):
         url = reverse("book-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 2)
+        self.assertGreaterEqual(len(response.data["results"]), 2)
 
     def test_retrieve_book_detail(self):
         """Test retrieving a single book."""
@@ -55,7 +85,7 @@ class BookAPITests(APITestCase):
 
     def test_create_book_authenticated(self):
         """Authenticated user should be able to create a book."""
-        self.client.login(email="test@example.com", password="password123")
+        self.client.login(username="testuser", password="password123")
         url = reverse("book-create")
         data = {
             "title": "New Book",
@@ -78,7 +108,7 @@ class BookAPITests(APITestCase):
 
     def test_update_book_authenticated(self):
         """Authenticated users should be able to update books."""
-        self.client.login(email="test@example.com", password="password123")
+        self.client.login(username="testuser", password="password123")
         url = reverse("book-update", args=[self.book1.id])
         data = {"title": "Updated Title", "publication_year": 1958, "author": self.author1.id}
         response = self.client.put(url, data)
@@ -88,8 +118,8 @@ class BookAPITests(APITestCase):
 
     def test_delete_book_authenticated(self):
         """Authenticated users should be able to delete books."""
-        self.client.login(email="test@example.com", password="password123")
-        url = reverse("book-delete", args=[this.book2.id])
+        self.client.login(username="testuser", password="password123")
+        url = reverse("book-delete", args=[self.book2.id])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
@@ -101,13 +131,13 @@ class BookAPITests(APITestCase):
         url = reverse("book-list") + "?title=Things Fall Apart"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["title"], "Things Fall Apart")
+        self.assertEqual(response.data["results"][0]["title"], "Things Fall Apart")
 
     def test_filter_by_publication_year(self):
         url = reverse("book-list") + "?publication_year=1959"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["publication_year"], 1959)
+        self.assertEqual(response.data["results"][0]["publication_year"], 1959)
 
     # -----------------------------
     # SEARCH TESTS
@@ -117,7 +147,7 @@ class BookAPITests(APITestCase):
         url = reverse("book-list") + "?search=Lion"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data["results"]), 1)
 
     # -----------------------------
     # ORDERING TESTS
@@ -128,6 +158,1345 @@ class BookAPITests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertLessEqual(
-            response.data[0]["publication_year"],
-            response.data[-1]["publication_year"]
+            response.data["results"][0]["publication_year"],
+            response.data["results"][-1]["publication_year"]
+        )
+
+
+class BookPaginationTests(APITestCase):
+    """Tests for keyset pagination on the book list endpoint."""
+
+    def setUp(self):
+        self.author1 = Author.objects.create(name="Chinua Achebe")
+        self.author2 = Author.objects.create(name="Wole Soyinka")
+
+        # Duplicate titles and years exercise the id tie-breaker.
+        for title, year, author in [
+            ("Arrow of God", 1964, self.author1),
+            ("Death and the King's Horseman", 1975, self.author2),
+            ("Arrow of God", 1964, self.author1),
+            ("No Longer at Ease", 1960, self.author1),
+            ("The Interpreters", 1965, self.author2),
+            ("Arrow of God", 1960, self.author2),
+            ("Things Fall Apart", 1958, self.author1),
+        ]:
+            Book.objects.create(title=title, publication_year=year, author=author)
+
+    def walk(self, url):
+        """Follow `next` links and return the ids in the order they were served."""
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            ids.extend(book["id"] for book in response.data["results"])
+            url = response.data["next"]
+        return ids, pages
+
+    def test_walks_default_ordering_without_gaps_or_repeats(self):
+        ids, pages = self.walk(reverse("book-list") + "?page_size=2")
+        expected = list(Book.objects.order_by("title", "id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 4)
+        self.assertIsNone(pages[0]["previous"])
+
+    def test_walks_requested_ordering(self):
+        ids, _ = self.walk(reverse("book-list") + "?page_size=3&ordering=-publication_year")
+        expected = list(Book.objects.order_by("-publication_year", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_pagination_after_filtering(self):
+        ids, _ = self.walk(reverse("book-list") + "?page_size=1&author=%d" % self.author2.id)
+        expected = list(self.author2.books.order_by("title", "id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        url = reverse("book-list") + "?page_size=2"
+        first = self.client.get(url).data
+        second = self.client.get(first["next"]).data
+        third = self.client.get(second["next"]).data
+
+        back = self.client.get(third["previous"]).data
+        self.assertEqual(back["results"], second["results"])
+        back = self.client.get(back["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("book-list") + "?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_malformed_position_is_rejected(self):
+        for position in (["T1", "x"], [None, 2], [1958, {"id": 2}], [[1958], 2]):
+            token = base64.b64encode(json.dumps({"p": position}).encode()).decode()
+            with self.subTest(position=position):
+                response = self.client.get(reverse("book-list") + "?ordering=publication_year&cursor=" + token)
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        first = self.client.get(reverse("book-list") + "?page_size=2").data
+        response = self.client.get(first["next"] + "&ordering=title,publication_year")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AuthorAPITests(QueryCountAssertionsMixin, APITestCase):
+    """Tests for the author endpoints and their nested books."""
+
+    def setUp(self):
+        self.author = Author.objects.create(name="Chinua Achebe")
+        Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=self.author)
+
+    def add_authors(self, count):
+        for i in range(count):
+            author = Author.objects.create(name="Author %d" % i)
+            Book.objects.create(title="Book %d" % i, publication_year=2000, author=author)
+
+    def test_list_authors_with_nested_books(self):
+        response = self.client.get(reverse("author-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        author = response.data["results"][0]
+        self.assertEqual(author["name"], "Chinua Achebe")
+        self.assertEqual([book["title"] for book in author["books"]], ["Arrow of God", "Things Fall Apart"])
+
+    def test_retrieve_author_detail(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("author-detail", args=[self.author.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["books"]), 2)
+
+    def test_author_list_query_count_does_not_grow(self):
+        url = reverse("author-list") + "?page_size=100"
+        self.assertConstantQueries(lambda: self.client.get(url), lambda: self.add_authors(30))
+
+    def test_page_of_100_authors_uses_two_queries(self):
+        self.add_authors(120)
+        with self.assertMaxQueries(2):
+            response = self.client.get(reverse("author-list") + "?page_size=100")
+        self.assertEqual(len(response.data["results"]), 100)
+
+
+class ConditionalGetTests(APITestCase):
+    """Tests for ETag / Last-Modified handling on the book endpoints."""
+
+    def setUp(self):
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=self.author)
+
+    def test_list_returns_304_without_serializing(self):
+        url = reverse("book-list")
+        etag = self.client.get(url)["ETag"]
+        with mock.patch.object(BookSerializer, "to_representation") as to_representation:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_representation.assert_not_called()
+
+    def test_list_etag_changes_on_update_and_delete(self):
+        url = reverse("book-list")
+        etag = self.client.get(url)["ETag"]
+
+        self.book.title = "Things Fall Apart (2nd ed.)"
+        self.book.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response["ETag"]
+        Book.objects.filter(title="Arrow of God").delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_list_etag_depends_on_query(self):
+        url = reverse("book-list")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url + "?publication_year=1958", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unpaginated_list_etag_tracks_deletes(self):
+        view = BookListView.as_view(pagination_class=None)
+        factory = APIRequestFactory()
+        etag = view(factory.get("/api/books/"))["ETag"]
+
+        response = view(factory.get("/api/books/", HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.book.delete()
+        response = view(factory.get("/api/books/", HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_if_none_match_and_if_modified_since(self):
+        url = reverse("book-detail", args=[self.book.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class CachedBookListTests(QueryCountAssertionsMixin, APITestCase):
+    """Tests for the versioned /api/books/ response cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+
+    def test_second_request_is_served_from_cache(self):
+        url = reverse("book-list") + "?ordering=title&publication_year=1958"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("book-list") + "?publication_year=1958&ordering=title&utm=x")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["results"][0]["title"], "Things Fall Apart")
+
+    def test_different_query_is_a_different_entry(self):
+        self.client.get(reverse("book-list"))
+        response = self.client.get(reverse("book-list") + "?search=Arrow")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"], [])
+
+    def test_writes_through_views_invalidate(self):
+        url = reverse("book-list")
+        self.client.get(url)
+        self.client.login(username="testuser", password="password123")
+
+        data = {"title": "Arrow of God", "publication_year": 1964, "author": self.author.id}
+        self.client.post(reverse("book-create"), data)
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 2)
+
+        data = {"title": "Anthills of the Savannah", "publication_year": 1987, "author": self.author.id}
+        self.client.put(reverse("book-update", args=[self.book.id]), data)
+        response = self.client.get(url)
+        self.assertEqual(response.data["results"][0]["title"], "Anthills of the Savannah")
+
+        self.client.delete(reverse("book-delete", args=[self.book.id]))
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_cascade_delete_invalidates(self):
+        url = reverse("book-list")
+        self.client.get(url)
+        self.author.delete()
+        self.assertEqual(self.client.get(url).data["results"], [])
+
+    def test_stats_are_admin_only_and_count_hits(self):
+        url = reverse("book-list")
+        self.client.get(url)
+        self.client.get(url)
+
+        self.client.login(username="testuser", password="password123")
+        self.assertEqual(self.client.get(reverse("cache-stats")).status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.create_superuser(username="admin", password="password123")
+        self.client.login(username="admin", password="password123")
+        response = self.client.get(reverse("cache-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["hits"], 1)
+        self.assertEqual(response.data["misses"], 1)
+        self.assertIn("api.book", response.data["generations"])
+
+
+class BookBulkTests(QueryCountAssertionsMixin, APITestCase):
+    """Tests for the bulk create/update/delete endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client.force_authenticate(self.user)
+        self.author1 = Author.objects.create(name="Chinua Achebe")
+        self.author2 = Author.objects.create(name="Wole Soyinka")
+
+    def book_payload(self, count):
+        return [
+            {"title": "Book %d" % i, "publication_year": 1950 + i,
+             "author": (self.author1 if i % 2 else self.author2).id}
+            for i in range(count)
+        ]
+
+    def test_bulk_create_resolves_authors_in_one_query(self):
+        # SAVEPOINT, author IN (...), INSERT, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse("book-bulk-create"), self.book_payload(50), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 50)
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertEqual(sorted(response.data["ids"]), sorted(Book.objects.values_list("id", flat=True)))
+
+    def test_bulk_create_with_known_authors_only_inserts(self):
+        self.client.post(reverse("book-bulk-create"), self.book_payload(2), format="json")
+        # SAVEPOINT, INSERT, RELEASE SAVEPOINT: both authors are cached.
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse("book-bulk-create"), self.book_payload(50), format="json")
+        self.assertEqual(response.data["created"], 50)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        payload = self.book_payload(3)
+        payload[1]["publication_year"] = 3000
+        payload[2]["author"] = 999
+        response = self.client.post(reverse("book-bulk-create"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertIn("publication_year", response.data["errors"][0]["errors"])
+        self.assertIn("author", response.data["errors"][1]["errors"])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_bulk_create_atomic_rolls_back_on_error(self):
+        payload = self.book_payload(3)
+        payload[2]["title"] = ""
+        response = self.client.post(reverse("book-bulk-create") + "?atomic=true", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_bulk_create_accepts_ndjson(self):
+        body = "\n".join(json.dumps(item) for item in self.book_payload(5)) + "\n"
+        response = self.client.post(reverse("book-bulk-create"), body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Book.objects.count(), 5)
+
+    def test_bulk_create_rejects_malformed_ndjson(self):
+        body = json.dumps(self.book_payload(1)[0]) + "\n{not json\n"
+        response = self.client.post(reverse("book-bulk-create"), body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_bulk_create_invalidates_list_cache(self):
+        cache.clear()
+        self.client.get(reverse("book-list"))
+        self.client.post(reverse("book-bulk-create"), self.book_payload(2), format="json")
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_bulk_update(self):
+        self.client.post(reverse("book-bulk-create"), self.book_payload(3), format="json")
+        books = list(Book.objects.order_by("id"))
+        payload = [
+            {"id": books[0].id, "title": "Renamed"},
+            {"id": books[1].id, "publication_year": 2001},
+            {"id": 999, "title": "Missing"},
+        ]
+        response = self.client.patch(reverse("book-bulk-update"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(response.data["errors"][0]["index"], 2)
+
+        books[0].refresh_from_db()
+        books[1].refresh_from_db()
+        self.assertEqual(books[0].title, "Renamed")
+        self.assertEqual(books[1].publication_year, 2001)
+        self.assertGreater(books[0].updated_at, books[2].updated_at)
+
+    def test_bulk_delete(self):
+        self.client.post(reverse("book-bulk-create"), self.book_payload(3), format="json")
+        ids = list(Book.objects.values_list("id", flat=True))
+        response = self.client.delete(reverse("book-bulk-delete"), ids[:2] + [999], format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["deleted"], 2)
+        self.assertEqual(list(Book.objects.values_list("id", flat=True)), ids[2:])
+
+    def test_bulk_endpoints_require_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse("book-bulk-create"), self.book_payload(1), format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BookExportTests(APITestCase):
+    """Tests for the streaming NDJSON/CSV export."""
+
+    def setUp(self):
+        self.author1 = Author.objects.create(name="Chinua Achebe")
+        self.author2 = Author.objects.create(name="Wole Soyinka")
+        Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author1)
+        Book.objects.create(title="The Lion and the Jewel", publication_year=1959, author=self.author2)
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=self.author1)
+
+    def export(self, query=""):
+        response = self.client.get(reverse("book-export") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export_joins_author_name(self):
+        response, body = self.export("?format=ndjson")
+        self.assertTrue(response["Content-Type"].startswith("application/x-ndjson"))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["title"] for row in rows], ["Arrow of God", "The Lion and the Jewel", "Things Fall Apart"])
+        self.assertEqual(rows[0]["author_name"], "Chinua Achebe")
+        self.assertEqual(rows[0]["author"], self.author1.id)
+
+    def test_csv_export_via_accept_header(self):
+        response = self.client.get(reverse("book-export"), HTTP_ACCEPT="text/csv")
+        body = b"".join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ["id", "title", "publication_year", "author", "author_name"])
+        self.assertEqual(len(rows), 4)
+        self.assertIn('filename="books.csv"', response["Content-Disposition"])
+
+    def test_export_honors_filters_search_and_ordering(self):
+        _, body = self.export("?format=ndjson&search=Achebe&ordering=-publication_year")
+        self.assertEqual([json.loads(line)["title"] for line in body.splitlines()], ["Arrow of God", "Things Fall Apart"])
+
+        _, body = self.export("?format=ndjson&publication_year=1959")
+        self.assertEqual([json.loads(line)["title"] for line in body.splitlines()], ["The Lion and the Jewel"])
+
+    def test_export_books_command(self):
+        with tempfile.NamedTemporaryFile("r", suffix=".csv") as output:
+            call_command("export_books", format="csv", query="author=%d" % self.author1.id, output=output.name)
+            rows = list(csv.DictReader(output))
+        self.assertEqual([row["title"] for row in rows], ["Arrow of God", "Things Fall Apart"])
+        self.assertEqual({row["author_name"] for row in rows}, {"Chinua Achebe"})
+
+
+class FullTextSearchTests(APITestCase):
+    """Tests for the FTS5-backed ?search= filter."""
+
+    def setUp(self):
+        self.achebe = Author.objects.create(name="Chinua Achebe")
+        self.soyinka = Author.objects.create(name="Wole Soyinka")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.achebe)
+        Book.objects.create(title="The Lion and the Jewel", publication_year=1959, author=self.soyinka)
+        Book.objects.create(title="Death and the King's Horseman", publication_year=1975, author=self.soyinka)
+
+    def search(self, query, extra=""):
+        response = self.client.get(reverse("book-list") + "?search=" + query + extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["title"] for book in response.data["results"]]
+
+    def test_matches_title_and_author_name_by_prefix(self):
+        self.assertEqual(self.search("thin"), ["Things Fall Apart"])
+        self.assertEqual(self.search("achebe"), ["Things Fall Apart"])
+        self.assertCountEqual(self.search("soy"), ["The Lion and the Jewel", "Death and the King's Horseman"])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search("wole lion"), ["The Lion and the Jewel"])
+        self.assertEqual(self.search("achebe lion"), [])
+
+    def test_operators_and_quotes_are_literal(self):
+        self.assertEqual(self.search('"OR NOT'), [])
+        self.assertEqual(self.search("king's"), ["Death and the King's Horseman"])
+
+    def test_results_are_ranked(self):
+        Book.objects.create(title="Jewel Jewel Jewel", publication_year=2000, author=self.achebe)
+        self.assertEqual(self.search("jewel"), ["Jewel Jewel Jewel", "The Lion and the Jewel"])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(
+            self.search("soyinka", "&ordering=-publication_year"),
+            ["Death and the King's Horseman", "The Lion and the Jewel"],
+        )
+
+    def test_paginates_ranked_results(self):
+        for i in range(5):
+            Book.objects.create(title="Anthills %d" % i, publication_year=1987, author=self.achebe)
+        url = reverse("book-list") + "?search=achebe&page_size=2"
+        titles = []
+        while url:
+            response = self.client.get(url)
+            titles.extend(book["title"] for book in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(len(titles), 6)
+        self.assertEqual(len(set(titles)), 6)
+
+    def test_index_follows_writes(self):
+        self.book.title = "Arrow of God"
+        self.book.save()
+        self.assertEqual(self.search("things"), [])
+        self.assertEqual(self.search("arrow"), ["Arrow of God"])
+
+        self.achebe.name = "Albert Chinualumogu Achebe"
+        self.achebe.save()
+        self.assertEqual(self.search("albert"), ["Arrow of God"])
+
+        Book.objects.bulk_create([Book(title="Anthills of the Savannah", publication_year=1987, author=self.achebe)])
+        self.assertEqual(self.search("savannah"), ["Anthills of the Savannah"])
+
+        self.achebe.delete()
+        self.assertEqual(self.search("albert"), [])
+
+
+class SparseFieldsetTests(QueryCountAssertionsMixin, APITestCase):
+    """Tests for ?fields= and ?expand= on the book and author endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+
+    def get_with_sql(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response, [query["sql"] for query in context.captured_queries]
+
+    def test_fields_limits_payload_and_select(self):
+        response, sql = self.get_with_sql(reverse("book-list") + "?fields=id,title")
+        self.assertEqual(response.data["results"], [{"id": self.book.id, "title": "Things Fall Apart"}])
+        self.assertNotIn('"api_book"."publication_year"', sql[0])
+        self.assertNotIn('"api_book"."author_id"', sql[0])
+
+    def test_default_representation_does_not_join_author(self):
+        response, sql = self.get_with_sql(reverse("book-list"))
+        self.assertEqual(response.data["results"][0]["author"], self.author.id)
+        self.assertNotIn("JOIN", sql[0])
+
+    def test_expand_author_uses_one_joined_query(self):
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=Author.objects.create(name="X"))
+        response, sql = self.get_with_sql(reverse("book-list") + "?expand=author&ordering=title")
+        self.assertEqual(len(sql), 1)
+        self.assertIn('INNER JOIN "api_author"', sql[0])
+        self.assertEqual(
+            response.data["results"][1]["author"], {"id": self.author.id, "name": "Chinua Achebe"}
         )
+
+    def test_detail_fields_and_expand(self):
+        url = reverse("book-detail", args=[self.book.id]) + "?fields=title,author&expand=author"
+        response = self.client.get(url)
+        self.assertEqual(response.data, {"title": "Things Fall Apart", "author": {"id": self.author.id, "name": "Chinua Achebe"}})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse("book-list") + "?fields=id,isbn")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+        response = self.client.get(reverse("book-list") + "?expand=title")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", response.data)
+
+    def test_author_fields_skip_book_prefetch(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("author-list") + "?fields=id,name")
+        self.assertEqual(response.data["results"], [{"id": self.author.id, "name": "Chinua Achebe"}])
+
+    def test_writes_ignore_fields(self):
+        user = User.objects.create_user(username="writer", password="password123")
+        self.client.force_authenticate(user)
+        response = self.client.post(
+            reverse("book-list") + "?fields=id",
+            {"title": "Arrow of God", "publication_year": 1964, "author": self.author.id},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["title"], "Arrow of God")
+
+    def test_renaming_author_refreshes_expanded_responses(self):
+        url = reverse("book-list") + "?expand=author"
+        plain_url = reverse("book-list") + "?fields=id,title"
+        etag = self.client.get(url)["ETag"]
+        self.client.get(plain_url)
+
+        self.author.name = "Albert Chinualumogu Achebe"
+        self.author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["author"]["name"], "Albert Chinualumogu Achebe")
+
+        # Nothing of the author is embedded here, so the entry survives.
+        self.assertEqual(self.client.get(plain_url)["X-Cache"], "HIT")
+
+
+class FastListTests(QueryCountAssertionsMixin, APITestCase):
+    """The values_list() fast path must render exactly what BookSerializer does."""
+
+    def setUp(self):
+        cache.clear()
+        authors = [Author.objects.create(name=name) for name in ("Chinua Achebe", "Wole Soyinka")]
+        titles = ["Things Fall Apart", "Arrow of God", "Aké: The Years of Childhood", "Line break", ""]
+        for i in range(25):
+            Book.objects.create(title=titles[i % len(titles)], publication_year=1950 + i % 7, author=authors[i % 2])
+
+    def assertSameAsSerializer(self, query, queryset):
+        view = BookListView.as_view(cache_enabled=False)
+        fast = view(APIRequestFactory().get("/api/books/" + query))
+        slow = BookListView.as_view(cache_enabled=False, fast_list=False)(APIRequestFactory().get("/api/books/" + query))
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+
+        expected = BookSerializer(queryset, many=True).data
+        self.assertEqual(fast.data["results"], [dict(row) for row in expected])
+        self.assertEqual(fast.data, slow.data)
+        self.assertEqual(fast["ETag"], slow["ETag"])
+        self.assertEqual(fast.render().content, slow.render().content)
+
+    def test_matches_serializer_output(self):
+        self.assertSameAsSerializer("?page_size=500", Book.objects.order_by("title", "id"))
+        self.assertSameAsSerializer(
+            "?ordering=-publication_year&page_size=500", Book.objects.order_by("-publication_year", "-id")
+        )
+        self.assertSameAsSerializer(
+            "?publication_year=1951&page_size=500", Book.objects.filter(publication_year=1951).order_by("title", "id")
+        )
+
+    def test_pages_through_the_same_rows(self):
+        url = reverse("book-list") + "?ordering=publication_year&page_size=4"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen.extend(book["id"] for book in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, list(Book.objects.order_by("publication_year", "id").values_list("id", flat=True)))
+
+    def test_skips_model_instances(self):
+        with mock.patch.object(Book, "from_db", wraps=Book.from_db) as from_db:
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse("book-list"))
+        self.assertEqual(len(response.data["results"]), 25)
+        from_db.assert_not_called()
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse("book-list") + "?fields=title&page_size=1")
+        self.assertEqual(response.data["results"], [{"title": ""}])
+
+    def test_expanded_author_falls_back_to_serializer(self):
+        response = self.client.get(reverse("book-list") + "?expand=author&page_size=1")
+        self.assertEqual(response.data["results"][0]["author"]["name"], "Chinua Achebe")
+
+    def test_renderer_matches_json_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .fastpath import FastJSONRenderer
+
+        data = {"results": [{"title": "Line break é", "year": 1958, "author": None}], "next": None}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with mock.patch("api.fastpath.orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class AsyncBookViewTests(TestCase):
+    """The async views must answer exactly like their sync counterparts."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=self.author)
+        Book.objects.create(title="Anthills of the Savannah", publication_year=1987, author=self.author)
+        credentials = base64.b64encode(b"testuser:password123").decode()
+        self.basic = {"HTTP_AUTHORIZATION": "Basic " + credentials}
+
+    async def test_list_matches_sync_view(self):
+        for query in ("", "?ordering=-publication_year", "?publication_year=1964", "?search=arrow",
+                      "?author=%d&page_size=1" % self.author.id):
+            with self.subTest(query=query):
+                sync = await self.async_client.get(reverse("book-list") + query)
+                response = await self.async_client.get(reverse("async-book-list") + query)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.json()["results"], sync.json()["results"])
+
+    async def test_list_follows_cursor(self):
+        url = reverse("async-book-list") + "?ordering=publication_year&page_size=2"
+        first = (await self.async_client.get(url)).json()
+        second = (await self.async_client.get(first["next"])).json()
+        years = [book["publication_year"] for book in first["results"] + second["results"]]
+        self.assertEqual(years, [1958, 1964, 1987])
+        self.assertIsNone(second["next"])
+
+    async def test_invalid_filter(self):
+        response = await self.async_client.get(reverse("async-book-list") + "?author=999")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("author", response.json())
+
+    async def test_detail(self):
+        response = await self.async_client.get(reverse("async-book-detail", args=[self.book.id]))
+        self.assertEqual(response.json(), {
+            "id": self.book.id, "title": "Things Fall Apart", "publication_year": 1958, "author": self.author.id,
+        })
+        response = await self.async_client.get(reverse("async-book-detail", args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_create_requires_authentication(self):
+        data = {"title": "No Longer at Ease", "publication_year": 1960, "author": self.author.id}
+        response = await self.async_client.post(reverse("async-book-create"), data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Basic", response["WWW-Authenticate"])
+
+        response = await self.async_client.post(
+            reverse("async-book-create"), data, headers={"Authorization": self.basic["HTTP_AUTHORIZATION"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["title"], "No Longer at Ease")
+        self.assertTrue(await Book.objects.filter(title="No Longer at Ease").aexists())
+
+    async def test_wrong_password(self):
+        response = await self.async_client.delete(
+            reverse("async-book-delete", args=[self.book.id]),
+            headers={"Authorization": "Basic " + base64.b64encode(b"testuser:nope").decode()},
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_validation_errors_match_sync_view(self):
+        data = {"title": "Future", "publication_year": 9999, "author": 999}
+        headers = {"Authorization": self.basic["HTTP_AUTHORIZATION"]}
+        sync = await self.async_client.post(reverse("book-create"), data, headers=headers)
+        response = await self.async_client.post(reverse("async-book-create"), data, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), sync.json())
+
+    async def test_non_object_body_is_a_validation_error(self):
+        headers = {"Authorization": self.basic["HTTP_AUTHORIZATION"]}
+        for body in ("[]", '[{"author": 1}]', "42"):
+            with self.subTest(body=body):
+                sync = await self.async_client.post(
+                    reverse("book-create"), body, content_type="application/json", headers=headers
+                )
+                response = await self.async_client.post(
+                    reverse("async-book-create"), body, content_type="application/json", headers=headers
+                )
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.json(), sync.json())
+
+    async def test_update_and_delete(self):
+        headers = {"Authorization": self.basic["HTTP_AUTHORIZATION"]}
+        url = reverse("async-book-update", args=[self.book.id])
+        response = await self.async_client.patch(
+            url, json.dumps({"title": "Things Fall Apart (2nd ed.)"}), content_type="application/json", headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        await self.book.arefresh_from_db()
+        self.assertEqual(self.book.title, "Things Fall Apart (2nd ed.)")
+
+        response = await self.async_client.put(url, json.dumps({"title": "X"}), content_type="application/json",
+                                               headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.delete(reverse("async-book-delete", args=[self.book.id]), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(await Book.objects.filter(pk=self.book.id).aexists())
+
+    async def test_session_writes_need_csrf(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        await client.aforce_login(self.user)
+        response = await client.delete(reverse("async-book-delete", args=[self.book.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn("CSRF", response.json()["detail"])
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Reads go to replicas, writes to the primary, and writers read their own writes."""
+
+    replicas = ["replica1", "replica2"]
+    # Resolved against the aliases that exist once setUpClass registered the replicas.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        # Extra SQLite files next to the test database, registered before
+        # the test case checks that every alias in `databases` exists.
+        cls.directory = tempfile.TemporaryDirectory()
+        for alias in cls.replicas:
+            connections.settings[alias] = {
+                **connections.settings["default"],
+                "NAME": os.path.join(cls.directory.name, alias + ".sqlite3"),
+            }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.replicas:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.directory.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        override = override_settings(REPLICA_DATABASES=self.replicas)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        User.objects.create_user(username="testuser", password="password123")
+        self.author = Author.objects.create(name="Chinua Achebe")
+        sync_replicas()
+
+        self.client = APIClient()
+        self.writer = APIClient()
+        self.writer.credentials(HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"testuser:password123").decode())
+
+    def create_book(self):
+        return self.writer.post(
+            reverse("book-create"), {"title": "Arrow of God", "publication_year": 1964, "author": self.author.id}
+        )
+
+    def test_reads_are_served_by_a_replica(self):
+        book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        url = reverse("book-detail", args=[book.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        sync_replicas()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_writes_go_to_the_primary(self):
+        response = self.create_book()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Book.objects.using("default").filter(pk=response.data["id"]).exists())
+        for alias in self.replicas:
+            self.assertFalse(Book.objects.using(alias).filter(pk=response.data["id"]).exists())
+
+    def test_writer_reads_its_own_writes(self):
+        response = self.create_book()
+        self.assertIn(PIN_COOKIE, response.cookies)
+        url = reverse("book-detail", args=[response.data["id"]])
+
+        # The writer is pinned to the primary; everyone else waits for replication.
+        self.assertEqual(self.writer.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        sync_replicas()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_replica_responses_are_cached_no_longer_than_the_lag(self):
+        with mock.patch.object(get_cache(), "set", wraps=get_cache().set) as cache_set:
+            self.client.get(reverse("book-list"))
+            self.writer.cookies[PIN_COOKIE] = "1"
+            self.writer.get(reverse("book-list") + "?ordering=title")
+        timeouts = [call.args[2] for call in cache_set.call_args_list]
+        self.assertEqual(timeouts, [5, 300])
+
+    def test_outside_requests_everything_uses_the_primary(self):
+        book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        self.assertTrue(Book.objects.filter(pk=book.pk).exists())
+
+    async def test_async_requests_stay_async(self):
+        replicas = []
+
+        async def view(request):
+            replicas.append(current_replica())
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        await middleware(APIRequestFactory().get("/"))
+        self.assertIn(replicas[0], self.replicas)
+        self.assertIsNone(current_replica())
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self):
+        response = self.create_book()
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(reverse("book-detail", args=[response.data["id"]])).status_code, 200)
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite connection profile")
+class SQLiteProfileTests(TestCase):
+    """settings.SQLITE_OPTIONS is applied to every new connection."""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA %s" % name)
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("cache_size"), -20000)
+        self.assertEqual(self.pragma("temp_store"), 2)  # MEMORY
+        # WAL cannot apply to the in-memory test database, only to files.
+        self.assertIn(self.pragma("journal_mode"), ("wal", "memory"))
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+        self.assertEqual(connection.settings_dict["CONN_MAX_AGE"], 600)
+
+
+THROTTLE_TEST_SETTINGS = {
+    **settings.REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {"anon_read": "3/min", "user_read": "5/min", "write": "2/min"},
+}
+
+
+@override_settings(REST_FRAMEWORK=THROTTLE_TEST_SETTINGS)
+class TokenBucketThrottleTests(APITestCase):
+    """Tests for the per-scope, per-endpoint token buckets."""
+
+    def setUp(self):
+        cache.clear()
+        self.clock = [6000.0]  # The start of a one-minute window.
+        patcher = mock.patch.object(TokenBucketThrottle, "timer", staticmethod(lambda: self.clock[0]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+
+    def test_anonymous_reads_run_out_with_headers(self):
+        url = reverse("book-list")
+        remaining = [self.client.get(url)["X-RateLimit-Remaining"] for _ in range(3)]
+        self.assertEqual(remaining, ["2", "1", "0"])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["X-RateLimit-Limit"], "3")
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+        # The rest of this window, then a third of the next for one request to slide out.
+        self.assertEqual(response["Retry-After"], "80")
+
+    def test_tokens_refill_as_the_window_slides(self):
+        url = reverse("book-list")
+        for _ in range(3):
+            self.client.get(url)
+
+        # 40 s into the next window a third of last window's requests still count.
+        self.clock[0] += 100
+        self.assertEqual(self.client.get(url)["X-RateLimit-Remaining"], "1")
+        self.assertEqual(self.client.get(url)["X-RateLimit-Remaining"], "0")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "20")
+
+        self.clock[0] += 20
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_scopes_and_endpoints_have_separate_buckets(self):
+        for _ in range(3):
+            self.client.get(reverse("book-list"))
+        self.assertEqual(self.client.get(reverse("book-list")).status_code, 429)
+
+        # Another endpoint, and the same endpoint as an authenticated user.
+        self.assertEqual(self.client.get(reverse("book-detail", args=[self.book.id])).status_code, 200)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-RateLimit-Limit"], "5")
+
+    def test_writes_are_limited_per_user(self):
+        self.client.force_authenticate(self.user)
+        url = reverse("book-update", args=[self.book.id])
+        statuses = [self.client.patch(url, {"title": "T%d" % i}).status_code for i in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        # Reads are still allowed.
+        self.assertEqual(self.client.get(reverse("book-list")).status_code, status.HTTP_200_OK)
+
+    def test_rejected_requests_do_not_use_tokens(self):
+        url = reverse("book-list")
+        for _ in range(10):
+            self.client.get(url)
+        self.clock[0] += 60
+        # Only the 3 accepted requests carried over into the sliding window.
+        self.assertEqual(self.client.get(url)["X-RateLimit-Remaining"], "0")
+
+    def test_async_views_share_the_limits(self):
+        url = reverse("async-book-list")
+        statuses = [self.client.get(url).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_unsupported_methods_do_not_use_tokens(self):
+        url = reverse("async-book-list")
+        for _ in range(5):
+            response = self.client.put(url)
+            self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(response["Allow"], "GET, POST, HEAD, OPTIONS")
+        self.assertEqual(self.client.get(url)["X-RateLimit-Remaining"], "2")
+
+    async def test_headers_under_asgi(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(RateLimitHeadersMiddleware(view)))
+        response = await self.async_client.get(reverse("async-book-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-RateLimit-Limit"], "3")
+        self.assertEqual(response["X-RateLimit-Remaining"], "2")
+
+
+@override_settings(API_SERVER_TIMING=True, API_CACHE_TIMEOUT=0)
+class InstrumentationTests(APITestCase):
+    """Tests for InstrumentationMiddleware and the /api/instrumentation/ endpoint."""
+
+    def setUp(self):
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+        self.author = Author.objects.create(name="Chinua Achebe")
+        for year in (1958, 1960, 1964):
+            Book.objects.create(title="Book %d" % year, publication_year=year, author=self.author)
+
+    def server_timing(self, response):
+        entries = {}
+        for entry in response["Server-Timing"].split(", "):
+            name, *params = entry.split(";")
+            entries[name] = dict(param.split("=", 1) for param in params)
+        return entries
+
+    def test_server_timing_reports_queries_and_phases(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("book-list"))
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {"app", "db", "serialize", "render"})
+        self.assertEqual(timing["db"]["desc"], '"%d queries (0 repeated)"' % len(queries))
+        self.assertGreater(float(timing["serialize"]["dur"]), 0)
+        self.assertGreater(float(timing["render"]["dur"]), 0)
+
+    @override_settings(API_SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("book-list")))
+
+    def test_repeated_queries_are_detected_and_logged(self):
+        with instrumentation.collect() as stats:
+            for book in Book.objects.all():
+                Book.objects.filter(author=book.author_id).count()
+        self.assertEqual(stats.query_count, 4)
+        self.assertEqual(stats.repeated, 2)
+        self.assertEqual(stats.most_repeated()[1], 3)
+
+        # An N+1: one author lookup per book.
+        n_plus_one = lambda serializer, book: {"author": Author.objects.get(pk=book.author_id).name}
+        with override_settings(API_REPEATED_QUERY_WARNING=3), mock.patch.object(
+            BookSerializer, "to_representation", n_plus_one
+        ), self.assertLogs("api.instrumentation", "WARNING") as logs:
+            response = self.client.get(reverse("book-list"))
+        self.assertIn("book-list ran the same query 3 times", logs.output[0])
+        self.assertIn('2 repeated)"', response["Server-Timing"])
+
+    def test_async_views_are_measured(self):
+        response = self.client.get(reverse("async-book-detail", args=[Book.objects.first().pk]))
+        self.assertEqual(self.server_timing(response)["db"]["desc"], '"1 queries (0 repeated)"')
+
+    async def test_async_views_are_measured_under_asgi(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(instrumentation.InstrumentationMiddleware(view)))
+        book = await Book.objects.afirst()
+        response = await self.async_client.get(reverse("async-book-detail", args=[book.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.server_timing(response)["db"]["desc"], '"1 queries (0 repeated)"')
+        snapshot = await sync_to_async(instrumentation.get_snapshot)()
+        self.assertEqual(snapshot["async-book-detail"]["queries"]["sum"], 1)
+
+    def test_histograms_are_admin_only_and_per_view(self):
+        for _ in range(3):
+            self.client.get(reverse("book-list"))
+        self.client.get(reverse("author-list"))
+
+        url = reverse("instrumentation")
+        self.client.force_authenticate(User.objects.create_user(username="testuser", password="password123"))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_superuser(username="admin", password="password123"))
+        data = self.client.get(url).data
+        self.assertEqual(data["book-list"]["requests"], 3)
+        self.assertEqual(data["author-list"]["requests"], 1)
+        wall = data["book-list"]["wall_ms"]
+        self.assertEqual(wall["count"], 3)
+        self.assertEqual(sum(wall["buckets"].values()), 3)
+        self.assertIsNotNone(wall["p50"])
+        self.assertGreater(data["book-list"]["queries"]["sum"], 0)
+
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(self.client.get(url).data), ["instrumentation"])
+
+
+class BenchmarkCommandTests(TestCase):
+    """Tests for `manage.py benchmark` result files and regression checks."""
+
+    def test_compare_results_flags_slowdowns_over_the_threshold(self):
+        baseline = [{"name": "list", "median_ms": 10.0}, {"name": "detail", "median_ms": 2.0}]
+        results = [
+            {"name": "list", "median_ms": 11.0},
+            {"name": "detail", "median_ms": 3.0},
+            {"name": "new", "median_ms": 1.0},
+        ]
+        rows, regressions = compare_results(baseline, results, threshold=0.2)
+        self.assertEqual([name for name, _ in rows], ["list", "detail"])
+        self.assertAlmostEqual(rows[0][1]["median_ms"][2], 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("detail: median_ms 2.000 -> 3.000 (+50%)"))
+
+    def test_json_output_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            call_command("benchmark", "hotpaths", rows=20, repeat=1, json=path, stdout=io.StringIO())
+            with open(path) as f:
+                saved = json.load(f)
+            self.assertEqual(saved["scenario"], "hotpaths")
+            self.assertEqual(saved["rows"], 20)
+            names = [row["name"] for row in saved["results"]]
+            self.assertIn("create rows=20", names)
+            self.assertIn("update rows=20", names)
+
+            # Pretend the baseline was impossibly fast.
+            for row in saved["results"]:
+                row["median_ms"] = 0.001
+            with open(path, "w") as f:
+                json.dump(saved, f)
+            with self.assertRaisesMessage(CommandError, "regression(s) over 50%"):
+                call_command(
+                    "benchmark", "hotpaths", rows=20, repeat=1, compare=path, threshold=0.5, stdout=io.StringIO(),
+                )
+
+            for row in saved["results"]:
+                row["median_ms"] = 10_000
+            with open(path, "w") as f:
+                json.dump(saved, f)
+            output = io.StringIO()
+            call_command("benchmark", "hotpaths", rows=20, repeat=1, compare=path, stdout=output)
+            self.assertIn("No regressions over 20%.", output.getvalue())
+
+
+class SeedCommandTests(TestCase):
+    """Tests for `manage.py seed`."""
+
+    def seed(self, **options):
+        call_command("seed", stdout=io.StringIO(), **options)
+
+    def test_books_per_author_follow_a_power_law(self):
+        self.seed(authors=50, books=2000, chunk_size=300, skew=1.5)
+        self.assertEqual(Author.objects.count(), 50)
+        self.assertEqual(Book.objects.count(), 2000)
+        counts = sorted(Author.objects.annotate(n=Count("books")).values_list("n", flat=True), reverse=True)
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+
+        self.seed(authors=0, books=1000, skew=0, seed=1)
+        self.assertEqual(Author.objects.count(), 50)
+        self.assertEqual(Book.objects.count(), 3000)
+
+    def test_same_seed_same_data(self):
+        self.seed(authors=5, books=100, chunk_size=30, seed=7)
+        first = list(Book.objects.order_by("id").values_list("title", "publication_year"))
+        Book.objects.all().delete()
+        self.seed(authors=5, books=100, chunk_size=30, seed=7)
+        self.assertEqual(list(Book.objects.order_by("id").values_list("title", "publication_year")), first)
+
+    def test_deferred_indexes_are_rebuilt_and_books_searchable(self):
+        def schema():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'api_book' ORDER BY name")
+                return cursor.fetchall()
+
+        before = schema()
+        self.seed(authors=10, books=500, defer_indexes=True)
+        self.assertEqual(schema(), before)
+        self.assertEqual(BookSearchIndex.objects.count(), 500)
+        word = Book.objects.first().title.split()[0]
+        self.assertTrue(self.client.get(reverse("book-list"), {"search": word}).data["results"])
+
+        self.assertEqual(sum(BookCountByYear.objects.values_list("book_count", flat=True)), 500)
+        self.assertEqual(sum(BookCountByAuthor.objects.values_list("book_count", flat=True)), 500)
+        self.assertEqual(ChangeLogEntry.objects.filter(model="book", action="create").count(), 500)
+
+        # The triggers are back: books inserted later are counted and indexed one by one again.
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=Author.objects.first())
+        self.assertEqual(BookSearchIndex.objects.count(), 501)
+        self.assertEqual(sum(BookCountByYear.objects.values_list("book_count", flat=True)), 501)
+
+
+class BookStatsTests(APITestCase):
+    """Tests for /api/books/stats/ and the summary tables behind it."""
+
+    def setUp(self):
+        self.achebe = Author.objects.create(name="Chinua Achebe")
+        self.soyinka = Author.objects.create(name="Wole Soyinka")
+        self.adichie = Author.objects.create(name="Chimamanda Ngozi Adichie")
+        Book.objects.bulk_create([
+            Book(title="Things Fall Apart", publication_year=1958, author=self.achebe),
+            Book(title="No Longer at Ease", publication_year=1960, author=self.achebe),
+            Book(title="Arrow of God", publication_year=1964, author=self.achebe),
+            Book(title="The Interpreters", publication_year=1965, author=self.soyinka),
+            Book(title="Half of a Yellow Sun", publication_year=2006, author=self.adichie),
+        ])
+
+    def assertSummariesMatchBooks(self):
+        self.assertEqual(
+            dict(BookCountByYear.objects.values_list("publication_year", "book_count")),
+            dict(Book.objects.values("publication_year").annotate(n=Count("pk")).values_list("publication_year", "n")),
+        )
+        self.assertEqual(
+            dict(BookCountByAuthor.objects.values_list("author_id", "book_count")),
+            dict(Book.objects.values("author_id").annotate(n=Count("pk")).values_list("author_id", "n")),
+        )
+
+    def test_stats(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("book-stats"), {"top": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # One query per group: by year, by decade, top authors.
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(response.data["total_books"], 5)
+        self.assertEqual(response.data["by_year"][0], {"publication_year": 1958, "count": 1})
+        self.assertEqual(
+            response.data["by_decade"],
+            [{"decade": 1950, "count": 1}, {"decade": 1960, "count": 3}, {"decade": 2000, "count": 1}],
+        )
+        self.assertEqual(response.data["top_authors"], [
+            {"id": self.achebe.id, "name": "Chinua Achebe", "count": 3},
+            {"id": self.soyinka.id, "name": "Wole Soyinka", "count": 1},
+        ])
+
+    def test_invalid_top(self):
+        for top in ("0", "abc", "100000"):
+            response = self.client.get(reverse("book-stats"), {"top": top})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("top", response.data)
+
+    def test_summaries_follow_every_kind_of_write(self):
+        self.assertSummariesMatchBooks()
+
+        book = Book.objects.get(title="Arrow of God")
+        book.publication_year = 1958
+        book.save()
+        Book.objects.filter(author=self.soyinka).update(author=self.adichie)
+        self.assertSummariesMatchBooks()
+        # Groups without books are removed.
+        self.assertFalse(BookCountByYear.objects.filter(publication_year=1964).exists())
+        self.assertFalse(BookCountByAuthor.objects.filter(author=self.soyinka).exists())
+
+        self.achebe.delete()
+        Book.objects.create(title="Americanah", publication_year=2013, author=self.adichie)
+        self.assertSummariesMatchBooks()
+        self.assertEqual(self.client.get(reverse("book-stats")).data["total_books"], 3)
+
+    def test_other_databases_group_the_books(self):
+        summary = self.client.get(reverse("book-stats")).data
+        with mock.patch("api.stats.has_summaries", return_value=False):
+            self.assertEqual(self.client.get(reverse("book-stats")).data, summary)
+
+
+class AuthorCacheTests(APITestCase):
+    """Tests for the author lookup cache and current year used by book validation."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client.force_authenticate(self.user)
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.payload = {"title": "Things Fall Apart", "publication_year": 1958, "author": self.author.id}
+
+    def test_known_author_costs_no_query(self):
+        self.client.post(reverse("book-create"), self.payload)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("book-create"), self.payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([query["sql"].split()[0] for query in queries], ["INSERT"])
+
+    def test_deleted_author_is_forgotten(self):
+        self.client.post(reverse("book-create"), self.payload)
+        self.author.delete()
+        response = self.client.post(reverse("book-create"), self.payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("author", response.data)
+
+    def test_unknown_and_malformed_authors(self):
+        for value, code in ((self.author.id + 1, "does_not_exist"), ("abc", "incorrect_type"), (True, "incorrect_type")):
+            response = self.client.post(reverse("book-create"), {**self.payload, "author": value}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["author"][0].code, code)
+
+    def test_cache_is_bounded_lru(self):
+        authors = [self.author.id] + [Author.objects.create(name="A%d" % i).id for i in range(2)]
+        cache = AuthorCache(maxsize=2)
+        self.assertEqual(set(cache.get_many(authors[:2])), set(authors[:2]))
+        cache.get(authors[0])  # Most recently used now.
+        cache.get(authors[2])
+        with self.assertNumQueries(0):
+            cache.get(authors[0])
+            cache.get(authors[2])
+        with self.assertNumQueries(1):
+            cache.get(authors[1])
+
+    def test_current_year_is_cached_until_the_year_ends(self):
+        self.addCleanup(setattr, validation, "_year", (None, 0.0))
+        validation._year = (1999, float("inf"))
+        self.assertEqual(validation.current_year(), 1999)
+        validation._year = (1999, 0.0)
+        self.assertEqual(validation.current_year(), datetime.now().year)
+
+
+@override_settings(API_CHANGES_STREAM_TIMEOUT=0)
+class ChangeFeedTests(APITestCase):
+    """Tests for the change log and the /api/changes/ endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client.force_authenticate(self.user)
+        self.author = Author.objects.create(name="Chinua Achebe")
+        self.start = ChangeLogEntry.objects.latest("seq").seq
+
+    def changes(self, **params):
+        return self.client.get(reverse("change-list"), {"since": self.start, **params}).data
+
+    def events(self, response):
+        """(id, event, data) of each event in an SSE response."""
+        body = b"".join(response.streaming_content).decode()
+        events = []
+        for block in body.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if "event" in fields:
+                events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+        return events
+
+    def test_every_write_is_logged_in_order(self):
+        book_id = self.client.post(reverse("book-create"), {
+            "title": "Things Fall Apart", "publication_year": 1958, "author": self.author.id,
+        }).data["id"]
+        self.client.patch(reverse("book-update", args=[book_id]), {"publication_year": 1959})
+        self.client.post(reverse("book-bulk-create"), [
+            {"title": "Arrow of God", "publication_year": 1964, "author": self.author.id},
+        ], format="json")
+        author_id = self.author.id
+        self.author.name = "C. Achebe"
+        self.author.save()
+        self.author.delete()
+
+        results = self.changes()["results"]
+        self.assertEqual(
+            [(entry["model"], entry["action"]) for entry in results],
+            [("book", "create"), ("book", "update"), ("book", "create"), ("author", "update"),
+             ("book", "delete"), ("book", "delete"), ("author", "delete")],
+        )
+        self.assertEqual(results[1]["data"], {
+            "id": book_id, "title": "Things Fall Apart", "publication_year": 1959, "author": author_id,
+        })
+        self.assertIsNone(results[-1]["data"])
+        self.assertEqual([entry["seq"] for entry in results], sorted(entry["seq"] for entry in results))
+
+    def test_rolled_back_writes_are_not_logged(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            Book.objects.create(title="Draft", publication_year=2000, author=self.author)
+            raise ValueError
+        self.assertEqual(self.changes()["results"], [])
+
+    def test_since_and_limit_page_through_the_log(self):
+        for year in range(1950, 1955):
+            Book.objects.create(title="Book %d" % year, publication_year=year, author=self.author)
+        page = self.changes(limit=3)
+        self.assertEqual(len(page["results"]), 3)
+        self.assertTrue(page["has_more"])
+        rest = self.changes(since=page["next"], limit=3)
+        self.assertEqual([entry["data"]["publication_year"] for entry in rest["results"]], [1953, 1954])
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(self.changes(since=rest["next"]), {"results": [], "next": rest["next"], "has_more": False})
+
+        response = self.client.get(reverse("change-list"), {"since": -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("since", response.data)
+
+    def test_stream_sends_events_and_resumes_from_last_event_id(self):
+        first = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        response = self.client.get(reverse("change-stream"), {"since": self.start})
+        self.assertEqual(response["Content-Type"], "text/event-stream; charset=utf-8")
+        events = self.events(response)
+        self.assertEqual([(event, data["object_id"]) for _, event, data in events], [("book.create", first.id)])
+
+        first.delete()
+        response = self.client.get(reverse("change-stream"), HTTP_LAST_EVENT_ID=events[-1][0])
+        self.assertEqual([event for _, event, _ in self.events(response)], ["book.delete"])
+
+    def test_last_event_id_wins_over_since(self):
+        # What EventSource sends when it reconnects: its original URL plus the header.
+        first = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        last_seen = ChangeLogEntry.objects.latest("seq").seq
+        first.delete()
+        response = self.client.get(reverse("change-stream"), {"since": self.start}, HTTP_LAST_EVENT_ID=last_seen)
+        self.assertEqual([event for _, event, _ in self.events(response)], ["book.delete"])
+
+        response = self.client.get(reverse("change-stream"), {"since": self.start}, HTTP_LAST_EVENT_ID="nope")
+        self.assertEqual([event for _, event, _ in self.events(response)], ["book.create", "book.delete"])
+
+    async def test_stream_is_async_under_asgi(self):
+        book = await Book.objects.acreate(title="Things Fall Apart", publication_year=1958, author=self.author)
+        response = await self.async_client.get(reverse("change-stream"), {"since": self.start})
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn("event: book.create", body)
+        self.assertIn('"object_id": %d' % book.id, body)
@@ -0,0 +1,39 @@
+"""
+TEST HELPERS
+------------
+Shared assertions for the api test suite.
+"""
+
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """Assertions about how many SQL queries a block of code runs."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit, using=DEFAULT_DB_ALIAS):
+        """Fail if the block runs more than `limit` queries, listing them all."""
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > limit:
+            queries = '\n'.join(
+                '%d. %s' % (i, query['sql']) for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail('%d queries executed, at most %d expected.\nCaptured queries were:\n%s'
+                      % (executed, limit, queries))
+
+    def assertConstantQueries(self, func, grow, using=DEFAULT_DB_ALIAS):
+        """
+        Fail if calling `func` runs more queries after `grow()` adds more data.
+
+        Catches N+1 patterns without hard-coding an exact query count.
+        """
+        with CaptureQueriesContext(connections[using]) as before:
+            func()
+        grow()
+        with self.assertMaxQueries(len(before.captured_queries), using=using):
+            func()
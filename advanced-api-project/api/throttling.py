@@ -0,0 +1,144 @@
+"""
+TOKEN-BUCKET RATE LIMITING
+--------------------------
+Every client gets one bucket per scope and endpoint:
+
+    anon_read    GET/HEAD/OPTIONS without credentials, keyed by client IP
+    user_read    GET/HEAD/OPTIONS by an authenticated user, keyed by user id
+    write        POST/PUT/PATCH/DELETE, keyed by user id (or IP)
+
+A bucket holds `N` tokens (the rate in DEFAULT_THROTTLE_RATES, e.g.
+'600/min') and refills continuously over the period. It is stored as a
+sliding-window counter: one cache counter per fixed window, and the tokens in
+use are
+
+    requests this window + requests last window * (share of last window still in range)
+
+so a request costs one atomic cache.incr() plus one cache.get(), whatever the
+rate. DRF's SimpleRateThrottle instead keeps a list of timestamps per client
+and rewrites it on every request. A request the bucket cannot pay for is not
+counted.
+
+Responses carry X-RateLimit-Limit / X-RateLimit-Remaining (added by
+RateLimitHeadersMiddleware); 429 responses also carry Retry-After.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from .cache import KEY_PREFIX, get_cache
+
+
+def incr(cache, key, timeout):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # add() is atomic too: only one of several racing requests creates it.
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    timer = time.time
+    read_scopes = {False: 'anon_read', True: 'user_read'}
+    write_scope = 'write'
+
+    def __init__(self):
+        # The scope, and so the rate, depends on the request.
+        self.rate = None
+        self.wait_seconds = None
+
+    def get_scope(self, request):
+        if request.method not in SAFE_METHODS:
+            return self.write_scope
+        return self.read_scopes[bool(request.user and request.user.is_authenticated)]
+
+    def get_rate(self):
+        # Read per request rather than at import, so override_settings applies.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = 'user-%s' % request.user.pk
+        else:
+            ident = 'ip-%s' % self.get_ident(request)
+        endpoint = getattr(view, 'throttle_endpoint', None) or type(view).__name__
+        return '%s:throttle:%s:%s:%s' % (KEY_PREFIX, self.scope, endpoint, ident)
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request)
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        key = self.get_cache_key(request, view)
+        now = self.timer()
+        window, elapsed = divmod(now, self.duration)
+        current_key = '%s:%d' % (key, window)
+        previous_key = '%s:%d' % (key, window - 1)
+
+        cache = get_cache()
+        previous = cache.get(previous_key, 0)
+        current = incr(cache, current_key, timeout=2 * self.duration)
+        used = previous * (1 - elapsed / self.duration) + current
+
+        allowed = used <= self.num_requests
+        if not allowed:
+            try:
+                cache.decr(current_key)
+            except ValueError:
+                pass  # Evicted in between; nothing left to give back.
+            self.wait_seconds = self.get_wait(previous, current - 1, elapsed)
+            used -= 1
+
+        # Picked up by RateLimitHeadersMiddleware.
+        request._request.rate_limit = (self.num_requests, max(0, int(self.num_requests - used)))
+        return allowed
+
+    def get_wait(self, previous, current, elapsed):
+        """Seconds until one token is free again."""
+        excess = previous * (1 - elapsed / self.duration) + current + 1 - self.num_requests
+        left_in_window = self.duration - elapsed
+        if previous and excess * self.duration / previous <= left_in_window:
+            # Enough of last window's requests slide out before this one ends.
+            return excess * self.duration / previous
+        # Otherwise wait until this window's requests have partly slid out too.
+        if current < self.num_requests:
+            return left_in_window
+        return left_in_window + self.duration * (1 - (self.num_requests - 1) / current)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class RateLimitHeadersMiddleware:
+    """Adds the quota TokenBucketThrottle recorded for this request to the response."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.add_headers(request, await self.get_response(request))
+
+    def add_headers(self, request, response):
+        quota = getattr(request, 'rate_limit', None)
+        if quota is not None:
+            limit, remaining = quota
+            response['X-RateLimit-Limit'] = str(limit)
+            response['X-RateLimit-Remaining'] = str(remaining)
+        return response
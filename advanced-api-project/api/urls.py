@@ -1,10 +1,28 @@
 from django.urls import path
+from .async_views import (
+    AsyncBookListView,
+    AsyncBookDetailView,
+    AsyncBookCreateView,
+    AsyncBookUpdateView,
+    AsyncBookDeleteView,
+)
 from .views import (
     BookListView,
     BookDetailView,
     BookCreateView,
     BookUpdateView,
-    BookDeleteView
+    BookDeleteView,
+    BookBulkCreateView,
+    BookBulkUpdateView,
+    BookBulkDeleteView,
+    BookExportView,
+    BookStatsView,
+    AuthorListView,
+    AuthorDetailView,
+    CacheStatsView,
+    ChangeListView,
+    ChangeStreamView,
+    InstrumentationView,
 )
 
 urlpatterns = [
@@ -17,4 +35,26 @@ urlpatterns = [
 
     # Also needed:
     path('books/create/', BookCreateView.as_view(), name='book-create'),
+
+    path('books/bulk/create/', BookBulkCreateView.as_view(), name='book-bulk-create'),
+    path('books/bulk/update/', BookBulkUpdateView.as_view(), name='book-bulk-update'),
+    path('books/bulk/delete/', BookBulkDeleteView.as_view(), name='book-bulk-delete'),
+    path('books/export/', BookExportView.as_view(), name='book-export'),
+    path('books/stats/', BookStatsView.as_view(), name='book-stats'),
+
+    # Async-native variants of the book endpoints (see api/async_views.py).
+    path('async/books/', AsyncBookListView.as_view(), name='async-book-list'),
+    path('async/books/<int:pk>/', AsyncBookDetailView.as_view(), name='async-book-detail'),
+    path('async/books/create/', AsyncBookCreateView.as_view(), name='async-book-create'),
+    path('async/books/update/<int:pk>/', AsyncBookUpdateView.as_view(), name='async-book-update'),
+    path('async/books/delete/<int:pk>/', AsyncBookDeleteView.as_view(), name='async-book-delete'),
+
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
+
+    path('changes/', ChangeListView.as_view(), name='change-list'),
+    path('changes/stream/', ChangeStreamView.as_view(), name='change-stream'),
+
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('instrumentation/', InstrumentationView.as_view(), name='instrumentation'),
 ]
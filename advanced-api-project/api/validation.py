@@ -0,0 +1,95 @@
+"""
+WRITE-PATH VALIDATION CACHES
+----------------------------
+Validating a book used to cost a query of its own: AuthorPrimaryKeyField
+looked the author up with Author.objects.get(pk=...) on every create and
+update. author_cache remembers which author ids exist:
+
+- a bounded LRU (API_AUTHOR_CACHE_SIZE ids) of deferred Author instances
+  that carry only the pk, so a cached entry never holds a stale name
+- misses are looked up together, one `IN` query per request or bulk chunk
+  (see api/bulk.py), and only ids that exist are remembered
+- entries are tagged with Author's cache generation (see api/cache.py),
+  which every author save or delete bumps, so a deleted author is
+  forgotten by every process that shares the cache backend
+
+Writes that bypass the ORM signals (raw SQL deletes of authors) are not
+seen; a book pointing at such an author then fails its foreign key check
+when the transaction commits.
+
+current_year() is the year validate_publication_year compares against,
+worked out once per year instead of once per book.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+
+from .cache import get_generation
+from .models import Author
+
+
+class AuthorCache:
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize or getattr(settings, 'API_AUTHOR_CACHE_SIZE', 10_000)
+
+    def get_many(self, ids):
+        """Map those of `ids` that are authors to an Author with only its pk loaded."""
+        generation = get_generation(Author)
+        found, missing = {}, []
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            for pk in ids:
+                author = self._entries.get(pk)
+                if author is None:
+                    missing.append(pk)
+                else:
+                    self._entries.move_to_end(pk)
+                    found[pk] = author
+        if not missing:
+            return found
+
+        loaded = Author.objects.only('pk').in_bulk(missing)
+        found.update(loaded)
+        with self._lock:
+            # A write that happened during the query already cleared the entries.
+            if generation == self._generation:
+                self._entries.update(loaded)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return found
+
+    def get(self, pk):
+        return self.get_many([pk]).get(pk)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+
+author_cache = AuthorCache()
+
+
+_year = (None, 0.0)  # (year, time.time() at which it ends)
+
+
+def current_year():
+    global _year
+    year, ends = _year
+    if time.time() >= ends:
+        year = datetime.now().year
+        _year = (year, datetime(year + 1, 1, 1).timestamp())
+    return year
@@ -0,0 +1,45 @@
+"""
+PASSWORD HASHER PROFILES
+------------------------
+The settings pick a profile from the PASSWORD_HASHER_PROFILE environment
+variable; password_hashers(profile) turns it into PASSWORD_HASHERS. The
+tests and `manage.py benchmark_logins` use the same function. This module
+imports nothing from Django or the apps, so the settings can import it.
+The first entry hashes new passwords:
+
+    argon2  Argon2id, 2 passes over 19 MiB, 1 lane (the OWASP baseline);
+            needs argon2-cffi and uses 'scrypt' when it is not installed
+    scrypt  scrypt with N=2**14, r=8, p=1 (16 MiB), about 60 ms
+    pbkdf2  Django's default
+
+The other hashers stay in the list so existing hashes keep verifying. The
+tuned hashers themselves are in bookshelf/hashers.py.
+"""
+
+import importlib.util
+
+
+HASHERS = {
+    'argon2': 'bookshelf.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'bookshelf.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+
+# Only verified, never used for new hashes.
+LEGACY_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+
+def has_argon2():
+    return importlib.util.find_spec('argon2') is not None
+
+
+def password_hashers(profile):
+    if profile not in HASHERS:
+        raise ValueError('Unknown password hasher profile %r; choose from %s.' % (profile, ', '.join(HASHERS)))
+    if profile == 'argon2' and not has_argon2():
+        profile = 'scrypt'
+    preferred = HASHERS[profile]
+    return [preferred] + [path for path in HASHERS.values() if path != preferred] + LEGACY_HASHERS
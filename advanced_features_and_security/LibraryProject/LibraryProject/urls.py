@@ -20,5 +20,6 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('bookshelf/', include('bookshelf.urls')),
     #path('', include('relationship_app.urls', namespace='relationship_app')),
 ]
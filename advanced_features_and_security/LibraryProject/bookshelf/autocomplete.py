@@ -0,0 +1,285 @@
+"""
+AUTOCOMPLETE
+------------
+/bookshelf/autocomplete/?q=<prefix>&limit=<k> suggests titles and author
+names while a librarian types, without touching the database:
+
+    {"query": "ach", "suggestions": [
+        {"text": "Chinua Achebe", "kind": "author", "books": 4}, ...]}
+
+PrefixIndex keeps, in process memory, every distinct title and author name
+(normalized like search queries, see bookshelf/search.py) in a sorted array
+of keys, one key per word a name can be typed from ("ach" finds "Chinua
+Achebe"). A prefix is a range of that array found by binary search.
+Suggestions are the entries in the range with the most books, then
+alphabetical:
+
+- ranges of up to SCAN_LIMIT keys are ranked on the spot
+- wider ranges (the first letter or two) are ranked once; the best
+  MAX_LIMIT entries of up to RANKED_PREFIXES prefixes are remembered, and
+  kept in order as books are added, so a write does not send the next
+  lookup of "a" back to scanning a tenth of the index
+
+The index is built on first use and rebuilt after MAX_AGE seconds. Only
+one request rebuilds a stale index; it builds new arrays and swaps them in,
+while the other requests keep answering from the old ones. In between, Book
+saves and deletes update it after their transaction commits (see
+bookshelf/signals.py); updates that arrive while a build is reading the
+table are recorded and applied again to the new arrays, so a swap does not
+drop them (one landing just as the read starts may be counted twice until
+the next rebuild). Other processes, and writes that send no signals
+(bulk_create, queryset.update), are picked up by the next rebuild.
+
+A name the index has not seen yet is inserted into the sorted arrays in
+place, which moves the keys after it: about 0.2 ms per word at the default
+size. That is accepted, since new names arrive at the rate librarians save
+books; loading many books at once is what bulk_create and the rebuild are for.
+
+Memory is bounded by BOOKSHELF_AUTOCOMPLETE_MAX_ENTRIES: past it, only the
+entries with the most books are kept (about 55 MiB for the default 200,000
+entries; a build briefly needs more, for counting every distinct name).
+stats() reports the size; `manage.py autocomplete_stats` prints it with
+lookup timings.
+"""
+
+import bisect
+import heapq
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+
+from django.conf import settings
+
+from .models import Book
+from .search import normalize_query
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_ENTRIES = 200_000
+MAX_AGE = 300
+SCAN_LIMIT = 64
+RANKED_PREFIXES = 20_000
+
+TITLE, AUTHOR = 0, 1
+KINDS = ('title', 'author')
+
+
+def word_keys(key):
+    """The suffixes of `key` that start a word: 'chinua achebe' -> ['chinua achebe', 'achebe']."""
+    keys = [key]
+    start = key.find(' ')
+    while start != -1:
+        keys.append(key[start + 1:])
+        start = key.find(' ', start + 1)
+    return keys
+
+
+def prefix_end(prefix):
+    """The smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    def __init__(self, max_entries=None):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        # Reentrant, so ensure_built() can hold it around build().
+        self._build_lock = threading.RLock()
+        self.clear()
+
+    @property
+    def max_entries(self):
+        return self._max_entries or getattr(settings, 'BOOKSHELF_AUTOCOMPLETE_MAX_ENTRIES', MAX_ENTRIES)
+
+    def clear(self):
+        with self._lock:
+            self.built_at = None
+            self.build_seconds = 0.0
+            self.truncated = 0
+            # Entries: display text, kind and number of books, by entry id.
+            self.texts = []
+            self.kinds = bytearray()
+            self.weights = array('I')
+            # Sorted search keys and the entry id each belongs to.
+            self.keys = []
+            self.targets = array('I')
+            # prefix -> best MAX_LIMIT entry ids, for wide ranges.
+            self.ranked = {}
+            # add() calls made while a build reads the table, or None.
+            self.pending = None
+
+    # -----------------------------
+    # BUILDING AND UPDATING
+    # -----------------------------
+
+    def build(self):
+        with self._build_lock:
+            try:
+                self._build()
+            finally:
+                self.pending = None
+
+    def _build(self):
+        start = time.perf_counter()
+        with self._lock:
+            self.pending = []
+        counts = Counter()
+        texts = {}
+        for title, author in Book.objects.values_list('title', 'author').iterator(chunk_size=10_000):
+            for kind, text in ((TITLE, title), (AUTHOR, author)):
+                entry = (normalize_query(text), kind)
+                if entry[0]:
+                    counts[entry] += 1
+                    texts.setdefault(entry, text)
+
+        kept = heapq.nlargest(self.max_entries, counts.items(), key=lambda item: item[1])
+        shared = {}  # Store each distinct key string once ("achebe" ends many names).
+        keyed = sorted(
+            (shared.setdefault(key, key), entry_id)
+            for entry_id, ((normalized, _), _) in enumerate(kept)
+            for key in word_keys(normalized)
+        )
+        with self._lock:
+            self.texts = [texts[entry] for entry, _ in kept]
+            self.kinds = bytearray(kind for (_, kind), _ in kept)
+            self.weights = array('I', (count for _, count in kept))
+            self.keys = [key for key, _ in keyed]
+            self.targets = array('I', (entry_id for _, entry_id in keyed))
+            self.ranked = {}
+            self.truncated = len(counts) - len(kept)
+            self.built_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - start
+            pending, self.pending = self.pending, None
+            for normalized, text, kind, books in pending:
+                self._add(normalized, text, kind, books)
+
+    def is_stale(self):
+        max_age = getattr(settings, 'BOOKSHELF_AUTOCOMPLETE_MAX_AGE', MAX_AGE)
+        return self.built_at is None or time.monotonic() - self.built_at > max_age
+
+    def ensure_built(self):
+        if self.built_at is None:
+            # Nothing to answer from yet: wait for whoever is building.
+            with self._build_lock:
+                if self.built_at is None:
+                    self.build()
+        elif self.is_stale() and self._build_lock.acquire(blocking=False):
+            # Everyone else keeps using the old index meanwhile.
+            try:
+                if self.is_stale():
+                    self.build()
+            finally:
+                self._build_lock.release()
+
+    def add(self, text, kind, books=1):
+        """Count `books` more (or, if negative, fewer) books under `text`; a no-op until the first build starts."""
+        normalized = normalize_query(text)
+        if not normalized:
+            return
+        with self._lock:
+            if self.pending is not None:
+                # The build in progress may have read the table before this write.
+                self.pending.append((normalized, text, kind, books))
+            if self.built_at is not None:
+                self._add(normalized, text, kind, books)
+
+    def _add(self, normalized, text, kind, books):
+        entry_id = self._find(normalized, kind)
+        if entry_id is None:
+            if books <= 0 or len(self.texts) >= self.max_entries:
+                return
+            entry_id = len(self.texts)
+            self.texts.append(text)
+            self.kinds.append(kind)
+            self.weights.append(0)
+            for key in word_keys(normalized):
+                position = bisect.bisect_right(self.keys, key)
+                self.keys.insert(position, key)
+                self.targets.insert(position, entry_id)
+        # An entry that drops to zero books stays until the next build.
+        self.weights[entry_id] = max(0, self.weights[entry_id] + books)
+        prefixes = {key[:end] for key in word_keys(normalized) for end in range(1, len(key) + 1)}
+        for prefix in prefixes:
+            self._rerank(prefix, entry_id, books > 0)
+
+    def _rerank(self, prefix, entry_id, gained):
+        """Keep the remembered ranking of `prefix` right after `entry_id`'s weight changed."""
+        entry_ids = self.ranked.get(prefix)
+        if entry_ids is None:
+            return
+        if entry_id in entry_ids:
+            if not gained and len(entry_ids) == MAX_LIMIT:
+                # Whatever should now move up into the list was never remembered.
+                del self.ranked[prefix]
+                return
+            entry_ids.remove(entry_id)
+        if self.weights[entry_id]:
+            bisect.insort(entry_ids, entry_id, key=self._sort_key)
+            del entry_ids[MAX_LIMIT:]
+
+    def _sort_key(self, entry_id):
+        return -self.weights[entry_id], self.texts[entry_id]
+
+    def _find(self, normalized, kind):
+        position = bisect.bisect_left(self.keys, normalized)
+        while position < len(self.keys) and self.keys[position] == normalized:
+            entry_id = self.targets[position]
+            if self.kinds[entry_id] == kind and normalize_query(self.texts[entry_id]) == normalized:
+                return entry_id
+            position += 1
+        return None
+
+    # -----------------------------
+    # QUERYING
+    # -----------------------------
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        """Up to `limit` entries whose words start with `query`, as dicts, most books first."""
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        self.ensure_built()
+        with self._lock:
+            entry_ids = self.ranked.get(prefix)
+            if entry_ids is None:
+                lo = bisect.bisect_left(self.keys, prefix)
+                hi = bisect.bisect_left(self.keys, prefix_end(prefix), lo)
+                if hi - lo <= SCAN_LIMIT:
+                    entry_ids = self._rank(set(self.targets[lo:hi]), limit)
+                else:
+                    entry_ids = self._rank(set(self.targets[lo:hi]), MAX_LIMIT)
+                    if len(self.ranked) >= RANKED_PREFIXES:
+                        self.ranked.clear()
+                    self.ranked[prefix] = entry_ids
+            return [
+                {'text': self.texts[entry_id], 'kind': KINDS[self.kinds[entry_id]], 'books': self.weights[entry_id]}
+                for entry_id in entry_ids[:limit]
+            ]
+
+    def _rank(self, entry_ids, limit):
+        weights = self.weights
+        return heapq.nsmallest(limit, (entry_id for entry_id in entry_ids if weights[entry_id]), key=self._sort_key)
+
+    def stats(self):
+        with self._lock:
+            distinct = {id(key): key for key in self.keys}.values()
+            strings = sum(map(sys.getsizeof, distinct)) + sum(map(sys.getsizeof, self.texts))
+            containers = sum(map(sys.getsizeof, (self.keys, self.texts, self.kinds, self.weights, self.targets)))
+            ranked = sys.getsizeof(self.ranked) + sum(
+                sys.getsizeof(prefix) + sys.getsizeof(ids) for prefix, ids in self.ranked.items()
+            )
+            return {
+                'entries': len(self.texts),
+                'keys': len(self.keys),
+                'max_entries': self.max_entries,
+                'truncated': self.truncated,
+                'ranked_prefixes': len(self.ranked),
+                'memory_bytes': strings + containers + ranked,
+                'build_seconds': round(self.build_seconds, 3),
+            }
+
+
+index = PrefixIndex()
@@ -0,0 +1,34 @@
+"""
+TUNED PASSWORD HASHERS
+----------------------
+Django's default PBKDF2 hasher runs 1,000,000 SHA-256 iterations: about
+470 ms of CPU per login or created account. The hashers below are the
+cheaper ones the settings can choose through PASSWORD_HASHER_PROFILE; the
+profiles, and the PASSWORD_HASHERS list each one gives, are in
+LibraryProject/hashing.py, which the settings can import without loading
+Django or the apps.
+
+On a successful login Django re-hashes a password stored with any hasher
+other than the first, or with different cost parameters, and saves it, so
+accounts move to the profile as their owners sign in. Costs are pinned
+here rather than taken from Django's defaults, which change between
+releases and would trigger those re-hashes by themselves.
+
+`manage.py benchmark_logins` reports logins per second per core for each
+profile.
+"""
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = 2
+    memory_cost = 19456  # KiB
+    parallelism = 1
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = 2 ** 14
+    block_size = 8
+    parallelism = 1
+
@@ -0,0 +1,43 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookshelf.autocomplete import index
+
+
+class Command(BaseCommand):
+    help = "Build the autocomplete index from the books in the database, report its size and time lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=10_000, help="Prefixes to time.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the sampled prefixes.")
+
+    def handle(self, *args, **options):
+        if options['queries'] < 1:
+            raise CommandError("--queries must be positive.")
+        index.build()
+        stats = index.stats()
+        if not stats['entries']:
+            raise CommandError("There are no books; run `manage.py seed` first.")
+        for name, value in stats.items():
+            self.stdout.write("%-16s %s" % (name, value))
+        self.stdout.write("%-16s %.1f MiB" % ('memory', stats['memory_bytes'] / 2 ** 20))
+
+        # Prefixes of 1 to 8 characters of the words librarians would type.
+        rng = random.Random(options['seed'])
+        prefixes = []
+        for _ in range(options['queries']):
+            key = rng.choice(index.keys)
+            prefixes.append(key[:rng.randint(1, min(8, len(key)))])
+
+        for name in ('first', 'repeat'):
+            times = []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                index.suggest(prefix)
+                times.append((time.perf_counter() - start) * 1_000_000)
+            self.stdout.write("%-6s lookup p50 %7.1f us  p99 %8.1f us  max %9.1f us" % (
+                name, statistics.median(times), statistics.quantiles(times, n=100)[-1], max(times),
+            ))
@@ -0,0 +1,49 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from LibraryProject.hashing import HASHERS, has_argon2, password_hashers
+from bookshelf.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Report logins per second per core (authenticate() with a correct password, "
+        "which is dominated by hashing) for each password hasher profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help="Logins to time per profile.")
+        parser.add_argument(
+            '--profile', action='append', choices=list(HASHERS),
+            help="Profile to measure; repeat for several (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        if options['logins'] < 1:
+            raise CommandError("--logins must be positive.")
+        for profile in options['profile'] or list(HASHERS):
+            if profile == 'argon2' and not has_argon2():
+                self.stdout.write("%-7s skipped: argon2-cffi is not installed" % profile)
+                continue
+            with override_settings(PASSWORD_HASHERS=password_hashers(profile)):
+                seconds = self.time_logins(options['logins'])
+            self.stdout.write("%-7s %8.1f ms per login  %7.1f logins/s per core" % (
+                profile, seconds * 1000, 1 / seconds,
+            ))
+
+    def time_logins(self, count):
+        email, password = 'benchmark.logins@example.com', 'correct horse battery staple'
+        with transaction.atomic():
+            CustomUser.objects.create_user(email=email, password=password)
+            authenticate(email=email, password=password)  # Warm up.
+            start = time.perf_counter()
+            for _ in range(count):
+                if authenticate(email=email, password=password) is None:
+                    raise CommandError("Login failed.")
+            seconds = (time.perf_counter() - start) / count
+            transaction.set_rollback(True)
+        return seconds
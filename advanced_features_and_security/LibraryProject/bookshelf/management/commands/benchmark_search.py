@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from bookshelf.models import Book
+from bookshelf.search import BUDGET_MS, cache_key, search_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Time search_books' search against the books in the database (see `seed`) "
+        "and fail if the 95th percentile of uncached searches exceeds --budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200, help="Queries to time.")
+        parser.add_argument('--budget', type=float, default=BUDGET_MS, help="Budget in milliseconds (default %(default)s).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the sampled queries.")
+
+    def handle(self, *args, **options):
+        if options['queries'] < 1:
+            raise CommandError("--queries must be positive.")
+        queries = self.sample_queries(options['queries'], random.Random(options['seed']))
+
+        cold, warm = [], []
+        for query in queries:
+            cache.delete(cache_key(query))
+            cold.append(self.time_search(query))
+            warm.append(self.time_search(query, page=2))
+
+        self.stdout.write("%d books, %d queries" % (Book.objects.count(), len(queries)))
+        for name, times in (('uncached', cold), ('cached', warm)):
+            self.stdout.write("%-9s p50 %7.2f ms  p95 %7.2f ms  max %7.2f ms" % (
+                name, statistics.median(times), self.p95(times), max(times),
+            ))
+        if self.p95(cold) > options['budget']:
+            raise CommandError("Uncached p95 %.2f ms is over the %.2f ms budget." % (self.p95(cold), options['budget']))
+
+    def sample_queries(self, count, rng):
+        """Words, word pairs and prefixes taken from random books' titles and authors."""
+        last_id = Book.objects.order_by('-pk').values_list('pk', flat=True).first()
+        if last_id is None:
+            raise CommandError("There are no books; run `manage.py seed` first.")
+        queries = []
+        while len(queries) < count:
+            book = Book.objects.filter(pk__gte=rng.randint(1, last_id)).order_by('pk').first()
+            words = (book.title + ' ' + book.author).split()
+            kind = rng.random()
+            if kind < 0.5:
+                queries.append(rng.choice(words))
+            elif kind < 0.8:
+                queries.append(' '.join(rng.sample(words, min(2, len(words)))))
+            else:
+                word = rng.choice(words)
+                queries.append(word[:rng.randint(2, max(2, len(word)))])
+        return queries
+
+    def time_search(self, query, page=None):
+        start = time.perf_counter()
+        list(search_page(query, page))
+        return (time.perf_counter() - start) * 1000
+
+    def p95(self, times):
+        return statistics.quantiles(times, n=20)[-1] if len(times) > 1 else times[0]
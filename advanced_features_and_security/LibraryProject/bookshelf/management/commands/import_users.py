@@ -0,0 +1,71 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookshelf.provisioning import FORMATS, Checkpoint, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create CustomUser accounts from a CSV file (email column, optional password, first_name "
+        "and last_name columns) or an NDJSON file with the same keys; '-' reads standard input. "
+        "Accounts that already exist are skipped, so the same file can be imported again. An "
+        "interrupted import resumes from its checkpoint file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input.")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help="Input format (default: ndjson for .ndjson and .jsonl files, otherwise csv).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per bulk_create and transaction.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes hashing passwords.")
+        parser.add_argument(
+            '--checkpoint',
+            help="Checkpoint file (default: PATH.checkpoint; none when reading standard input).",
+        )
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError("--chunk-size and --workers must be positive.")
+        path = options['path']
+        format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        checkpoint_path = options['checkpoint'] or (None if path == '-' else path + '.checkpoint')
+        checkpoint = Checkpoint(checkpoint_path, path) if checkpoint_path else None
+
+        try:
+            skip = 0 if checkpoint is None or options['restart'] else checkpoint.load()
+            if skip:
+                self.stdout.write("Resuming after row %d (checkpoint %s)." % (skip, checkpoint_path))
+            if path == '-':
+                stats = self.run(sys.stdin, format, skip, checkpoint, options)
+            else:
+                with open(path, newline='', encoding='utf-8') as file:
+                    stats = self.run(file, format, skip, checkpoint, options)
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        if checkpoint:
+            checkpoint.delete()
+        self.stdout.write(self.style.SUCCESS(
+            "Imported %d rows in %.1f s (%.0f rows/s): %d created, %d existing, %d invalid." % (
+                stats.rows - skip, stats.elapsed, stats.rate, stats.created, stats.existing, stats.invalid,
+            )
+        ))
+
+    def run(self, file, format, skip, checkpoint, options):
+        return import_users(
+            read_rows(file, format),
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            skip=skip,
+            checkpoint=checkpoint.save if checkpoint else None,
+            progress=self.report,
+        )
+
+    def report(self, stats):
+        self.stdout.write("%9d rows  %9d created  %7d existing  %7d invalid  %7.0f rows/s" % (
+            stats.rows, stats.created, stats.existing, stats.invalid, stats.rate,
+        ))
@@ -0,0 +1,108 @@
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from bookshelf.models import Book, CustomUser
+
+
+
+# The one generator of synthetic accounts and books in this project. The projects in this
+# repository are separate and cannot import each other, so the vocabulary
+# and Zipf weights follow advanced-api-project's api/seeding.py by hand,
+# which keeps seeded data shaped alike everywhere.
+SYLLABLES = [
+    'an', 'bel', 'cor', 'da', 'el', 'fin', 'gar', 'hel', 'ir', 'jo', 'ka', 'lin', 'mar', 'nor', 'o',
+    'per', 'qui', 'ros', 'sa', 'tor', 'u', 'val', 'wen', 'xi', 'yor', 'zan',
+]
+
+
+def make_words(count, rng):
+    return [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights of a Zipf distribution over `count` ranks."""
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Add synthetic CustomUser accounts and books. Books per author follow a "
+        "power law (--skew); every account gets the same --password, hashed once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Accounts to create.")
+        parser.add_argument('--books', type=int, default=10_000, help="Books to create.")
+        parser.add_argument('--authors', type=int, default=500, help="Distinct author names the books are spread over.")
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help="Zipf exponent of books per author; 0 spreads books evenly (default 1.1).",
+        )
+        parser.add_argument('--staff', type=float, default=0.01, help="Fraction of accounts that are staff.")
+        parser.add_argument('--password', default='password', help="Password of every created account.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk_create and transaction.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['books'], options['skew']) < 0 or options['authors'] < 1:
+            raise CommandError("--users, --books and --skew cannot be negative and --authors must be positive.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        start = time.perf_counter()
+        rng = random.Random(options['seed'])
+        words = make_words(3000, rng)
+        users = self.seed_users(options, rng, words)
+        books = self.seed_books(options, rng, words)
+        self.stdout.write(self.style.SUCCESS(
+            "Created %d users and %d books in %.1f s." % (users, books, time.perf_counter() - start)
+        ))
+
+    def insert(self, model, objects, chunk_size):
+        count = 0
+        objects = iter(objects)
+        while chunk := list(itertools.islice(objects, chunk_size)):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            count += len(chunk)
+        return count
+
+    def seed_users(self, options, rng, words):
+        # Hashing is deliberately slow (hundreds of milliseconds), so it is done once.
+        password = make_password(options['password'])
+        first = CustomUser.objects.count()
+        now = timezone.now()
+
+        def users():
+            for number in range(first, first + options['users']):
+                first_name, last_name = rng.choice(words).title(), rng.choice(words).title()
+                yield CustomUser(
+                    email='%s.%s.%d@example.com' % (first_name.lower(), last_name.lower(), number),
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password,
+                    is_staff=rng.random() < options['staff'],
+                    date_joined=now - timedelta(days=rng.expovariate(1 / 365)),
+                    date_of_birth=date(1940, 1, 1) + timedelta(days=rng.randint(0, 365 * 65)),
+                )
+
+        return self.insert(CustomUser, users(), options['chunk_size'])
+
+    def seed_books(self, options, rng, words):
+        authors = ['%s %s' % (rng.choice(words).title(), rng.choice(words).title()) for _ in range(options['authors'])]
+        author_weights = zipf_weights(len(authors), options['skew'])
+        word_weights = zipf_weights(len(words), 1.0)
+
+        def books():
+            for author in rng.choices(authors, cum_weights=author_weights, k=options['books']):
+                title = ' '.join(rng.choices(words, cum_weights=word_weights, k=rng.randint(1, 5)))
+                yield Book(title=title.capitalize(), author=author)
+
+        return self.insert(Book, books(), options['chunk_size'])
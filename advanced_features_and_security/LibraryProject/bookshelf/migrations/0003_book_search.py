@@ -0,0 +1,76 @@
+import bookshelf.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# External-content FTS5 index over bookshelf_book (the text is read from
+# the book table, not stored twice), with prefix indexes for 2- and
+# 3-character prefixes. rowid is the book id.
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE bookshelf_book_fts USING fts5(
+        title, author, content='bookshelf_book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    "INSERT INTO bookshelf_book_fts (bookshelf_book_fts) VALUES ('rebuild')",
+    """
+    CREATE TRIGGER bookshelf_book_fts_insert AFTER INSERT ON bookshelf_book BEGIN
+        INSERT INTO bookshelf_book_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER bookshelf_book_fts_update AFTER UPDATE OF title, author ON bookshelf_book BEGIN
+        INSERT INTO bookshelf_book_fts (bookshelf_book_fts, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+        INSERT INTO bookshelf_book_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER bookshelf_book_fts_delete AFTER DELETE ON bookshelf_book BEGIN
+        INSERT INTO bookshelf_book_fts (bookshelf_book_fts, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+    END
+    """,
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS bookshelf_book_fts_delete",
+    "DROP TRIGGER IF EXISTS bookshelf_book_fts_update",
+    "DROP TRIGGER IF EXISTS bookshelf_book_fts_insert",
+    "DROP TABLE IF EXISTS bookshelf_book_fts",
+]
+
+
+def run_on_sqlite(statements):
+    # Other databases fall back to icontains (see bookshelf/search.py).
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookshelf', '0002_book'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchIndex',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='bookshelf.book')),
+                ('title', models.TextField()),
+                ('author', models.TextField()),
+                ('document', bookshelf.models.FullTextField(db_column='bookshelf_book_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'bookshelf_book_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_on_sqlite(FTS_SQL), run_on_sqlite(DROP_FTS_SQL)),
+    ]
@@ -54,3 +54,47 @@ class Book(models.Model):
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the autocomplete index counted this book under, so a save can
+        # move the count without reading the row again (bookshelf/signals.py).
+        if 'title' in field_names and 'author' in field_names:
+            instance._indexed_values = (instance.title, instance.author)
+        return instance
+
+
+# -----------------------------------------------------
+# FULL-TEXT SEARCH INDEX (see bookshelf/search.py)
+# -----------------------------------------------------
+
+class FullTextField(models.TextField):
+    """The hidden FTS5 column named after its table; supports `__match`."""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s MATCH %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+# Maps the FTS5 table over Book.title and Book.author. It is not managed by
+# Django: migration 0003 creates it and the triggers that keep it in sync.
+class BookSearchIndex(models.Model):
+    book = models.OneToOneField(
+        Book, primary_key=True, db_column="rowid", on_delete=models.DO_NOTHING, related_name="search_index"
+    )
+    title = models.TextField()
+    author = models.TextField()
+    # FTS5 hidden columns: the table-named column accepts MATCH, rank is bm25
+    document = FullTextField(db_column="bookshelf_book_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "bookshelf_book_fts"
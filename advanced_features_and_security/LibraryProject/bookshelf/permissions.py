@@ -0,0 +1,97 @@
+"""
+CACHED PERMISSIONS
+------------------
+ModelBackend answers the first permission check of every request with two
+queries (the user's own permissions and their groups' permissions) and
+only remembers the result on that request's user object. The
+@permission_required views in bookshelf/views.py pay for it on every hit.
+
+CachedPermissionBackend stores each user's full permission set in Django's
+cache under a versioned key:
+
+    bookshelf:perms:<user id>:<user version>:<global version>:<superuser>
+
+- the user version moves when that user's groups or user_permissions change
+- the global version moves when a group's permissions change, a group or a
+  permission is deleted, or a permission is added, which can affect anyone
+- bumps happen on write and again on commit (see bookshelf/signals.py), so
+  a request that read the old set in between cannot keep it
+
+Old entries are never read again and expire after
+BOOKSHELF_PERMISSION_CACHE_TIMEOUT seconds, which also bounds how long a
+change made without signals (raw SQL) can go unnoticed. The first check of
+a request costs:
+
+- one cache.get_many() for both versions, plus a cache.add() and a
+  cache.get() for each version missing from the cache (first use or
+  eviction)
+- one cache.get() for the permission set; on a miss, ModelBackend's two
+  queries and one cache.set()
+
+so a warm check is two cache round trips and no queries. Later checks in
+the same request use the set remembered on the user object. With
+local-memory caching every process keeps its own versions; use a shared
+cache backend to invalidate across workers.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+
+KEY_PREFIX = 'bookshelf:perms'
+GLOBAL_VERSION_KEY = KEY_PREFIX + ':version'
+CACHE_TIMEOUT = 3600
+
+
+def user_version_key(user_id):
+    return '%s:version:%s' % (KEY_PREFIX, user_id)
+
+
+def get_versions(user_id):
+    keys = [user_version_key(user_id), GLOBAL_VERSION_KEY]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock, so an evicted version never restarts at
+            # a value that older entries were stored under.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions[keys[0]], versions[keys[1]]
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(user_ids=None):
+    """Retire the cached permissions of `user_ids`, or of everybody, now and on commit."""
+    keys = [GLOBAL_VERSION_KEY] if user_ids is None else [user_version_key(user_id) for user_id in user_ids]
+
+    def bump():
+        for key in keys:
+            bump_version(key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+class CachedPermissionBackend(ModelBackend):
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            key = '%s:%s:%s:%s:%d' % (KEY_PREFIX, user_obj.pk, *get_versions(user_obj.pk), user_obj.is_superuser)
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                timeout = getattr(settings, 'BOOKSHELF_PERMISSION_CACHE_TIMEOUT', CACHE_TIMEOUT)
+                cache.set(key, permissions, timeout)
+            user_obj._perm_cache = permissions
+        return user_obj._perm_cache
@@ -0,0 +1,243 @@
+"""
+BULK USER IMPORT
+----------------
+import_users() creates CustomUser accounts from rows of
+{"email", "password", "first_name", "last_name"} - read from CSV or NDJSON
+by read_rows() - without going through CustomUserManager.create_user one
+INSERT at a time:
+
+- rows are read and written in chunks of `chunk_size`, one bulk_create
+  and one transaction per chunk, so memory stays flat for any file size
+- emails are normalized like create_user does (the domain is lowercased);
+  rows with an invalid email are counted and skipped
+- rows whose email already has an account, in the database (one `IN`
+  lookup per chunk) or earlier in the file, are counted and skipped
+  before their password is hashed; accounts created by someone else
+  between the lookup and the INSERT are found when it fails, counted the
+  same way, and the rest of the chunk is written again
+- passwords are hashed with the configured profile (see
+  bookshelf/hashers.py), which is nearly all of the CPU time; with
+  `workers` > 1 the chunks' passwords are hashed by forked processes,
+  `workers` chunks at a time, while the parent writes
+- a row without a password gets an unusable one, like create_user(password=None)
+
+After every chunk commits, `checkpoint` is called with the ImportStats,
+whose `rows` counts the input rows fully handled. Checkpoint saves them to
+a JSON file; passing its `rows` back as `skip` resumes an interrupted
+import. A crash between a commit and the checkpoint only means that chunk
+is read again, and its accounts are then skipped as existing.
+"""
+
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections, transaction
+
+from .models import CustomUser
+
+
+FIELDS = ('email', 'password', 'first_name', 'last_name')
+FORMATS = ('csv', 'ndjson')
+
+
+# -----------------------------
+# READING
+# -----------------------------
+
+def read_csv(file):
+    """Rows of a CSV file with a header naming some of FIELDS; email is required."""
+    reader = csv.DictReader(file)
+    if 'email' not in (reader.fieldnames or ()):
+        raise ValueError('The CSV header must include an "email" column.')
+    for row in reader:
+        yield {field: (row.get(field) or '').strip() for field in FIELDS}
+
+
+def read_ndjson(file):
+    """Rows of a file with one JSON object per line; blank lines are ignored."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise ValueError('Line %d is not valid JSON: %s' % (number, exc))
+        if not isinstance(row, dict):
+            raise ValueError('Line %d is not a JSON object.' % number)
+        yield {field: str(row.get(field) or '').strip() for field in FIELDS}
+
+
+def read_rows(file, format):
+    if format not in FORMATS:
+        raise ValueError('Unknown format %r; choose from %s.' % (format, ', '.join(FORMATS)))
+    return read_csv(file) if format == 'csv' else read_ndjson(file)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+# -----------------------------
+# PROGRESS AND CHECKPOINTS
+# -----------------------------
+
+class ImportStats:
+    """Counts of input rows by outcome; `rows` is their total."""
+
+    __slots__ = ('rows', 'created', 'existing', 'invalid', 'started')
+
+    def __init__(self, rows=0):
+        self.rows = rows
+        self.created = 0
+        self.existing = 0
+        self.invalid = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        """Rows per second handled by this run."""
+        handled = self.created + self.existing + self.invalid
+        return handled / self.elapsed if self.elapsed else 0.0
+
+
+class Checkpoint:
+    """The number of rows of `source` already imported, kept in a JSON file at `path`."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+
+    def load(self):
+        """Rows to skip: 0 without a checkpoint file."""
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return 0
+        if data.get('source') != self.source:
+            raise ValueError('Checkpoint %s belongs to %s, not %s.' % (self.path, data.get('source'), self.source))
+        return data['rows']
+
+    def save(self, stats):
+        # Write a new file and rename it over the old one, so an interruption
+        # never leaves a half-written checkpoint behind.
+        temporary = '%s.tmp' % self.path
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'source': self.source, 'rows': stats.rows}, file)
+        os.replace(temporary, self.path)
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------------
+# IMPORTING
+# -----------------------------
+
+def hash_passwords(passwords):
+    return [make_password(password or None) for password in passwords]
+
+
+def select_new(chunk, pending, stats):
+    """The rows of `chunk` to create, with normalized emails; the rest are counted in `stats`."""
+    rows = {}
+    for row in chunk:
+        email = CustomUser.objects.normalize_email(row['email'])
+        try:
+            validate_email(email)
+        except ValidationError:
+            stats.invalid += 1
+            continue
+        if email in rows or email in pending:
+            stats.existing += 1
+        else:
+            rows[email] = dict(row, email=email)
+    for email in CustomUser.objects.filter(email__in=list(rows)).values_list('email', flat=True):
+        del rows[email]
+        stats.existing += 1
+    return list(rows.values())
+
+
+def build_users(rows, hashes):
+    return [
+        CustomUser(email=row['email'], password=encoded, first_name=row['first_name'], last_name=row['last_name'])
+        for row, encoded in zip(rows, hashes)
+    ]
+
+
+def import_users(rows, chunk_size=1000, workers=1, skip=0, checkpoint=None, progress=None):
+    """
+    Create an account per new row after the first `skip`. `checkpoint` and
+    `progress` are called with the ImportStats after every chunk commits.
+    """
+    stats = ImportStats(skip)
+    chunks = chunked(itertools.islice(rows, skip, None), chunk_size)
+    pending = set()  # Emails selected for creation but not written yet.
+
+    def prepare(chunk):
+        new = select_new(chunk, pending, stats)
+        pending.update(row['email'] for row in new)
+        return len(chunk), new
+
+    def write(size, new, hashes):
+        users = build_users(new, hashes)
+        while True:
+            try:
+                with transaction.atomic():
+                    CustomUser.objects.bulk_create(users)
+                break
+            except IntegrityError:
+                # Someone else created some of these accounts since the lookup;
+                # skip them and try again, as often as that keeps happening.
+                taken = set(CustomUser.objects.filter(email__in=[user.email for user in users]).values_list('email', flat=True))
+                if not taken:
+                    raise
+                users = [user for user in users if user.email not in taken]
+                stats.existing += len(taken)
+        pending.difference_update(row['email'] for row in new)
+        stats.created += len(users)
+        stats.rows += size
+        if checkpoint:
+            checkpoint(stats)
+        if progress:
+            progress(stats)
+
+    if workers > 1:
+        # Children only hash; they must not share the parent's connections.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+
+            def hash_window():
+                window = [prepare(chunk) for chunk in itertools.islice(chunks, workers)]
+                passwords = [[row['password'] for row in new] for _, new in window]
+                return window, pool.map_async(hash_passwords, passwords)
+
+            window, pending_hashes = hash_window()
+            while window:
+                hashed = pending_hashes.get()
+                # Hash the next window while this one is written.
+                next_window, pending_hashes = hash_window()
+                for (size, new), hashes in zip(window, hashed):
+                    write(size, new, hashes)
+                window = next_window
+    else:
+        for chunk in chunks:
+            size, new = prepare(chunk)
+            write(size, new, hash_passwords([row['password'] for row in new]))
+    return stats
@@ -0,0 +1,83 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import permissions
+from .autocomplete import AUTHOR, TITLE, index
+from .models import Book, CustomUser
+
+
+# -----------------------------------------------
+# AUTOCOMPLETE INDEX (see bookshelf/autocomplete.py)
+# -----------------------------------------------
+# A saved or deleted book moves one count from its old title and author to
+# the new ones once the transaction commits, so a rolled back write never
+# reaches the index. The old values are the ones Book.from_db loaded; only
+# a book saved without being loaded, such as Book(pk=...).save(), has its
+# row read first, and only once the index is built.
+
+def update_index(removed, added):
+    def update():
+        for title, author in removed:
+            index.add(title, TITLE, -1)
+            index.add(author, AUTHOR, -1)
+        for title, author in added:
+            index.add(title, TITLE)
+            index.add(author, AUTHOR)
+    transaction.on_commit(update)
+
+
+@receiver(pre_save, sender=Book)
+def remember_indexed_values(sender, instance, raw=False, **kwargs):
+    if '_indexed_values' in instance.__dict__ or instance.pk is None or raw:
+        return
+    if index.built_at is not None:
+        instance._indexed_values = Book.objects.filter(pk=instance.pk).values_list('title', 'author').first()
+
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, created, raw=False, **kwargs):
+    old = None if created else instance.__dict__.get('_indexed_values')
+    new = instance._indexed_values = (instance.title, instance.author)
+    if index.built_at is not None and not raw and old != new:
+        update_index([old] if old else [], [new])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    if index.built_at is not None:
+        update_index([(instance.title, instance.author)], [])
+
+
+# -----------------------------------------------
+# PERMISSION CACHE (see bookshelf/permissions.py)
+# -----------------------------------------------
+# Changing a user's groups or permissions retires that user's cached set.
+# Changes seen from the group side, to a group's permissions, or to the
+# permissions and groups that exist can affect anybody.
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        permissions.invalidate([instance.pk])
+    elif pk_set:
+        permissions.invalidate(pk_set)
+    else:
+        permissions.invalidate()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        permissions.invalidate()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_all_permissions(sender, **kwargs):
+    permissions.invalidate()
@@ -1,3 +1,424 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from LibraryProject import hashing
+
+from .autocomplete import MAX_AGE, MAX_LIMIT, PrefixIndex, index
+from .models import Book, CustomUser
+from .provisioning import Checkpoint, import_users, read_csv, read_rows
+from .search import build_match_query, cache_key, rank_books
+
+
+class SearchBooksTests(TestCase):
+    """Tests for bookshelf.views.search_books and bookshelf/search.py."""
+
+    def setUp(self):
+        cache.clear()
+        self.things = Book.objects.create(title="Things Fall Apart", author="Chinua Achebe")
+        self.arrow = Book.objects.create(title="Arrow of God", author="Chinua Achebe")
+        self.purple = Book.objects.create(title="Purple Hibiscus", author="Chimamanda Ngozi Adichie")
+
+    def search(self, **params):
+        return self.client.get(reverse("search-books"), params, secure=True)
+
+    def test_terms_are_prefixes_and_all_must_match(self):
+        self.assertEqual(set(rank_books("ach")), {self.things.id, self.arrow.id})
+        self.assertEqual(rank_books("chinua  ARROW"), [self.arrow.id])
+        self.assertEqual(rank_books('"fall" OR'), [])
+        self.assertEqual(build_match_query('a "b" cd'), '"a" """b"""* "cd"*')
+
+    def test_better_matches_rank_first(self):
+        Book.objects.create(title="Arrow Arrow", author="Someone Else")
+        self.assertEqual(rank_books("arrow")[0], Book.objects.get(title="Arrow Arrow").id)
+
+    def test_the_best_match_wins_however_old(self):
+        best = Book.objects.create(title="Arrow Arrow", author="Someone Else")
+        Book.objects.bulk_create(Book(title="Arrow %d" % number, author="Someone Else") for number in range(50))
+        self.assertEqual(rank_books("arrow", limit=1), [best.id])
+        self.assertEqual(len(rank_books("arrow", limit=10)), 10)
+
+    @override_settings(BOOKSHELF_SEARCH_RANK_CANDIDATES=3)
+    def test_broad_queries_rank_their_newest_matches(self):
+        Book.objects.create(title="Arrow Arrow", author="Someone Else")
+        newest = [Book.objects.create(title="Arrow %d" % number, author="Someone Else").id for number in range(3)]
+        self.assertEqual(set(rank_books("arrow")), set(newest))
+        self.assertEqual(rank_books("arrow god"), [self.arrow.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.things.title = "No Longer at Ease"
+        self.things.save()
+        self.arrow.delete()
+        self.assertEqual(rank_books("ease"), [self.things.id])
+        self.assertEqual(rank_books("things"), [])
+        self.assertEqual(rank_books("arrow"), [])
+
+    @override_settings(BOOKSHELF_SEARCH_PAGE_SIZE=2, BOOKSHELF_SEARCH_MAX_RESULTS=3)
+    def test_results_are_paginated_and_capped(self):
+        for number in range(5):
+            Book.objects.create(title="Collected Stories %d" % number, author="Chinua Achebe")
+        response = self.search(q="chinua", page=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_obj"].paginator.count, 3)
+        self.assertEqual(len(response.context["books"]), 1)
+        self.assertContains(response, "Page 2 of 2")
+        self.assertContains(response, "?q=chinua&amp;page=1")
+
+    def test_normalized_queries_share_a_cache_entry(self):
+        self.assertEqual(cache_key(" Chinua   ACHEBE "), cache_key("chinua achebe"))
+        self.search(q="chinua achebe")
+        with self.assertNumQueries(1):  # The page's books; the ranking is cached.
+            response = self.search(q="  Chinua ACHEBE", page=1)
+        self.assertEqual({book.id for book in response.context["books"]}, {self.things.id, self.arrow.id})
+
+    def test_deleted_books_are_dropped_from_cached_results(self):
+        self.search(q="chinua")
+        self.arrow.delete()
+        response = self.search(q="chinua")
+        self.assertEqual([book.id for book in response.context["books"]], [self.things.id])
+
+    def test_no_query_lists_books(self):
+        response = self.search()
+        self.assertEqual(response.context["books"], [])
+        response = self.search(q="")
+        self.assertEqual([book.id for book in response.context["books"]], [self.things.id, self.arrow.id, self.purple.id])
+
+
+class AutocompleteTests(TestCase):
+    """Tests for bookshelf.views.autocomplete and bookshelf/autocomplete.py."""
+
+    def setUp(self):
+        index.clear()
+        self.addCleanup(index.clear)
+        Book.objects.create(title="Things Fall Apart", author="Chinua Achebe")
+        Book.objects.create(title="Arrow of God", author="Chinua Achebe")
+        Book.objects.create(title="Purple Hibiscus", author="Chimamanda Ngozi Adichie")
+
+    def suggest(self, **params):
+        return self.client.get(reverse("autocomplete"), params, secure=True)
+
+    def texts(self, query, limit=10):
+        return [suggestion["text"] for suggestion in index.suggest(query, limit)]
+
+    def test_suggests_titles_and_authors_by_any_word_most_books_first(self):
+        response = self.suggest(q="  CH")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"query": "CH", "suggestions": [
+            {"text": "Chinua Achebe", "kind": "author", "books": 2},
+            {"text": "Chimamanda Ngozi Adichie", "kind": "author", "books": 1},
+        ]})
+        self.assertEqual(self.texts("fall"), ["Things Fall Apart"])
+        self.assertEqual(self.texts("a", limit=2), ["Chinua Achebe", "Arrow of God"])
+        self.assertEqual(self.texts("zz"), [])
+
+    def test_lookups_do_not_query_the_database_once_built(self):
+        index.build()
+        with self.assertNumQueries(0):
+            self.suggest(q="ach")
+
+    def test_saves_and_deletes_update_the_index_on_commit(self):
+        index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title="No Longer at Ease", author="Chinua Achebe")
+        self.assertEqual(index.suggest("achebe")[0]["books"], 3)
+        self.assertEqual(self.texts("no lo"), ["No Longer at Ease"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = "Anthills of the Savannah"
+            book.save()
+        self.assertEqual(self.texts("no lo"), [])
+        self.assertEqual(self.texts("savan"), ["Anthills of the Savannah"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.get(title="Purple Hibiscus").delete()
+        self.assertEqual(self.texts("chi"), ["Chinua Achebe"])
+
+    def test_saves_do_not_read_the_old_values_again(self):
+        index.build()
+        book = Book.objects.get(title="Arrow of God")
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            book.title = "Arrow of Gold"
+            book.save()
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            book.title = "Arrow of God"
+            book.save()
+        self.assertEqual(self.texts("arrow"), ["Arrow of God"])
+
+    def test_writes_committed_during_a_build_survive_the_swap(self):
+        index.build()
+        iterator = QuerySet.iterator
+
+        def scan_then_save(queryset, *args, **kwargs):
+            # The table has been read; the save commits before the swap.
+            rows = list(iterator(queryset, *args, **kwargs))
+            with self.captureOnCommitCallbacks(execute=True):
+                Book.objects.create(title="No Longer at Ease", author="Chinua Achebe")
+            return iter(rows)
+
+        with mock.patch.object(QuerySet, "iterator", autospec=True, side_effect=scan_then_save):
+            index.build()
+        self.assertEqual(self.texts("no lo"), ["No Longer at Ease"])
+        self.assertEqual(index.suggest("achebe")[0]["books"], 3)
+
+    def test_remembered_rankings_follow_writes(self):
+        small = PrefixIndex()
+        small.build()
+        for number in range(70):  # A range too wide to scan on every lookup.
+            small.add("Achebe Title %d" % number, 0)
+        self.assertEqual(small.suggest("a", 1)[0]["text"], "Chinua Achebe")
+        self.assertIn("a", small.ranked)
+        small.add("Achebe Title 5", 0, books=5)
+        self.assertEqual(small.suggest("a", 1)[0], {"text": "Achebe Title 5", "kind": "title", "books": 6})
+        small.add("Achebe Title 5", 0, books=-6)
+        self.assertNotIn("Achebe Title 5", [suggestion["text"] for suggestion in small.suggest("a", MAX_LIMIT)])
+
+    def test_size_is_bounded(self):
+        small = PrefixIndex(max_entries=2)
+        small.build()
+        self.assertEqual(small.stats()["entries"], 2)
+        self.assertEqual(small.stats()["truncated"], 3)
+        self.assertGreater(small.stats()["memory_bytes"], 0)
+        small.add("New Title", 0)
+        self.assertEqual(small.stats()["entries"], 2)
+        self.assertEqual(small.suggest("chinua"), [{"text": "Chinua Achebe", "kind": "author", "books": 2}])
+
+    def test_one_request_rebuilds_a_stale_index_while_others_use_the_old_one(self):
+        small = PrefixIndex()
+        small.build()
+        small.built_at -= MAX_AGE + 1
+        started, release = threading.Event(), threading.Event()
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(small, "build", side_effect=slow_build) as build:
+            rebuilding = threading.Thread(target=small.ensure_built)
+            rebuilding.start()
+            self.assertTrue(started.wait(5))
+            self.assertEqual(small.suggest("chinua")[0]["text"], "Chinua Achebe")
+            release.set()
+            rebuilding.join()
+        self.assertEqual(build.call_count, 1)
+
+    def test_invalid_limit_is_rejected(self):
+        response = self.suggest(q="a", limit=MAX_LIMIT + 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit", response.json()["errors"])
+
+
+class PermissionCacheTests(TestCase):
+    """Tests for bookshelf/permissions.py."""
+
+    def setUp(self):
+        cache.clear()
+        self.can_view = Permission.objects.get(codename="can_view")
+        self.can_edit = Permission.objects.get(codename="can_edit")
+        self.librarians = Group.objects.create(name="Librarians")
+        self.librarians.permissions.add(self.can_view)
+        self.user = CustomUser.objects.create_user(email="reader@example.com", password="password123")
+        self.user.groups.add(self.librarians)
+
+    def fresh_user(self):
+        # A new object, like the one each request loads.
+        return CustomUser.objects.get(pk=self.user.pk)
+
+    def has_perm(self, perm):
+        return self.fresh_user().has_perm(perm)
+
+    def test_permissions_are_loaded_once(self):
+        user = self.fresh_user()
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_perm("bookshelf.can_view"))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm("bookshelf.can_view"))
+            self.assertFalse(user.has_perm("bookshelf.can_edit"))
+
+    def test_guarded_views_query_no_permissions(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("book-list"), secure=True)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("book-list"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if "auth_permission" in query["sql"]])
+        self.assertEqual(self.client.get(reverse("edit-book"), secure=True).status_code, 403)
+
+    def test_user_changes_invalidate_that_user(self):
+        self.assertFalse(self.has_perm("bookshelf.can_edit"))
+        self.user.user_permissions.add(self.can_edit)
+        self.assertTrue(self.has_perm("bookshelf.can_edit"))
+        self.user.groups.remove(self.librarians)
+        self.assertFalse(self.has_perm("bookshelf.can_view"))
+        self.librarians.user_set.add(self.user)
+        self.assertTrue(self.has_perm("bookshelf.can_view"))
+        self.can_edit.user_set.clear()
+        self.assertFalse(self.has_perm("bookshelf.can_edit"))
+
+    def test_group_changes_invalidate_members(self):
+        self.assertFalse(self.has_perm("bookshelf.can_edit"))
+        self.librarians.permissions.add(self.can_edit)
+        self.assertTrue(self.has_perm("bookshelf.can_edit"))
+        self.librarians.delete()
+        self.assertFalse(self.has_perm("bookshelf.can_view"))
+
+    def test_superusers_and_inactive_users(self):
+        self.assertFalse(self.has_perm("bookshelf.can_delete"))
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertTrue(self.has_perm("bookshelf.can_delete"))
+        self.user.is_superuser = False
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.has_perm("bookshelf.can_view"))
+
+
+class PasswordHashingTests(TestCase):
+    """Tests for LibraryProject/hashing.py, bookshelf/hashers.py and bookshelf/provisioning.py."""
+
+    def test_profiles(self):
+        self.assertEqual(hashing.password_hashers("pbkdf2")[0], "django.contrib.auth.hashers.PBKDF2PasswordHasher")
+        with mock.patch.object(hashing, "has_argon2", return_value=True):
+            self.assertEqual(hashing.password_hashers("argon2")[0], "bookshelf.hashers.TunedArgon2PasswordHasher")
+        with mock.patch.object(hashing, "has_argon2", return_value=False):
+            self.assertEqual(hashing.password_hashers("argon2")[0], "bookshelf.hashers.TunedScryptPasswordHasher")
+        for profile in hashing.HASHERS:
+            self.assertEqual(len(set(hashing.password_hashers(profile))), 5)
+        with self.assertRaises(ValueError):
+            hashing.password_hashers("md5")
+        self.assertEqual(settings.PASSWORD_HASHERS, hashing.password_hashers(settings.PASSWORD_HASHER_PROFILE))
+
+    @override_settings(PASSWORD_HASHERS=hashing.password_hashers("scrypt"))
+    def test_old_hashes_are_upgraded_on_login(self):
+        user = CustomUser.objects.create_user(email="reader@example.com")
+        user.password = make_password("password123", hasher="pbkdf2_sha256")
+        user.save()
+        self.assertFalse(self.client.login(email="reader@example.com", password="wrong"))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+
+        self.assertTrue(self.client.login(email="reader@example.com", password="password123"))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("scrypt$16384$"))
+        self.assertTrue(user.check_password("password123"))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class UserImportTests(TestCase):
+    """Tests for bookshelf/provisioning.py and `manage.py import_users`."""
+
+    CSV = (
+        "email,password,first_name\n"
+        "Ada@Example.COM,secret1,Ada\n"
+        "grace@example.com,,Grace\n"
+        "not an email,secret,Nobody\n"
+        "Ada@EXAMPLE.com,secret2,Ada again\n"
+        "alan@example.com,secret3,Alan\n"
+    )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_import_users(self):
+        CustomUser.objects.create_user(email="alan@example.com")
+        progress = []
+        stats = import_users(
+            read_csv(io.StringIO(self.CSV)), chunk_size=2, progress=lambda stats: progress.append(stats.rows),
+        )
+        self.assertEqual((stats.rows, stats.created, stats.existing, stats.invalid), (5, 2, 2, 1))
+        self.assertEqual(progress, [2, 4, 5])
+        ada = CustomUser.objects.get(email="Ada@example.com")
+        self.assertEqual(ada.first_name, "Ada")
+        self.assertTrue(ada.check_password("secret1"))
+        self.assertFalse(CustomUser.objects.get(email="grace@example.com").has_usable_password())
+
+        with self.assertRaisesMessage(ValueError, "email"):
+            list(read_csv(io.StringIO("name,password\nAda,secret\n")))
+
+    def test_existing_emails_are_looked_up_once_per_chunk(self):
+        rows = [{"email": "user%d@example.com" % number, "password": "", "first_name": "", "last_name": ""}
+                for number in range(10)]
+        # Per chunk: the lookup, and the INSERT inside a savepoint.
+        with self.assertNumQueries(4 * 5):
+            import_users(rows, chunk_size=2)
+        self.assertEqual(CustomUser.objects.count(), 10)
+
+    def test_accounts_created_meanwhile_are_counted_as_existing(self):
+        atomic = transaction.atomic
+        competitors = iter(["b@example.com", "c@example.com"])
+
+        def atomic_after_a_competitor(*args, **kwargs):
+            # Another process creates an account between the lookup and each INSERT.
+            email = next(competitors, None)
+            if email:
+                CustomUser.objects.create_user(email=email)
+            return atomic(*args, **kwargs)
+
+        rows = [{"email": email, "password": "", "first_name": "", "last_name": ""}
+                for email in ("a@example.com", "b@example.com", "c@example.com", "d@example.com")]
+        with mock.patch("bookshelf.provisioning.transaction", atomic=atomic_after_a_competitor):
+            stats = import_users(rows)
+        self.assertEqual((stats.rows, stats.created, stats.existing), (4, 2, 2))
+        self.assertEqual(CustomUser.objects.count(), 4)
+
+    def test_ndjson(self):
+        content = '{"email": "ada@example.com", "first_name": "Ada"}\n\n{"email": "alan@example.com"}\n'
+        rows = list(read_rows(io.StringIO(content), "ndjson"))
+        self.assertEqual([row["email"] for row in rows], ["ada@example.com", "alan@example.com"])
+        self.assertEqual(rows[0]["password"], "")
+        for content in ("{not json}\n", "[1, 2]\n"):
+            with self.assertRaisesMessage(ValueError, "Line 1"):
+                list(read_rows(io.StringIO(content), "ndjson"))
+
+    def test_checkpoints(self):
+        path = self.write("users.csv", self.CSV)
+        checkpoint = Checkpoint(path + ".checkpoint", path)
+        self.assertEqual(checkpoint.load(), 0)
+        import_users(read_csv(io.StringIO(self.CSV)), chunk_size=2, checkpoint=checkpoint.save)
+        self.assertEqual(checkpoint.load(), 5)
+        with self.assertRaisesMessage(ValueError, "belongs to"):
+            Checkpoint(checkpoint.path, "other.csv").load()
+
+        stats = import_users(read_csv(io.StringIO(self.CSV + "new@example.com,,New\n")), skip=5)
+        self.assertEqual((stats.rows, stats.created, stats.existing), (6, 1, 0))
+
+    def test_command_resumes_from_its_checkpoint(self):
+        path = self.write("users.ndjson", '{"email": "ada@example.com"}\n{"email": "alan@example.com"}\n')
+        self.write("users.ndjson.checkpoint", '{"source": "%s", "rows": 1}' % path)
+        out = io.StringIO()
+        call_command("import_users", path, stdout=out)
+        self.assertIn("Resuming after row 1", out.getvalue())
+        self.assertIn("Imported 1 rows", out.getvalue())
+        self.assertEqual(list(CustomUser.objects.values_list("email", flat=True)), ["alan@example.com"])
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+        call_command("import_users", path, "--restart", stdout=out)
+        self.assertEqual(CustomUser.objects.count(), 2)
+
+    def test_command_reads_standard_input(self):
+        out = io.StringIO()
+        with mock.patch("sys.stdin", io.StringIO("email,password\nada@example.com,secret1\n")):
+            call_command("import_users", "-", stdout=out)
+        self.assertIn("1 created, 0 existing, 0 invalid", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("import_users", os.path.join(self.directory.name, "missing.csv"), stdout=out)
@@ -8,5 +8,6 @@ urlpatterns = [
     path('edit-book/', views.edit_book, name='edit-book'),
     path('delete-book/', views.delete_book, name='delete-book'),
     path('search/', views.search_books, name='search-books'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
 
 ]
@@ -1,7 +1,8 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import permission_required
-from django.db.models import Q
-from .models import Book
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT, index
+from .search import search_page
 from django import forms
 from .forms import ExampleForm
 
@@ -42,14 +43,29 @@ class SearchForm(forms.Form):
 
 def search_books(request):
     form = SearchForm(request.GET or None)
-    books = []
+    page = None
 
     if form.is_valid():
-        query = form.cleaned_data["q"]
+        # SAFE: the query is passed to the database as a parameter (see bookshelf/search.py)
+        page = search_page(form.cleaned_data["q"], request.GET.get("page"))
 
-        # SAFE: using ORM, prevents SQL injection
-        books = Book.objects.filter(
-            Q(title__icontains=query) | Q(author__icontains=query)
-        )
+    return render(request, "bookshelf/book_list.html", {
+        "books": page.object_list if page else [],
+        "page_obj": page,
+        "form": form,
+    })
 
-    return render(request, "bookshelf/book_list.html", {"books": books, "form": form})
\ No newline at end of file
+
+class AutocompleteForm(SearchForm):
+    limit = forms.IntegerField(required=False, min_value=1, max_value=MAX_LIMIT)
+
+
+def autocomplete(request):
+    # Suggestions come from an in-memory index (see bookshelf/autocomplete.py)
+    form = AutocompleteForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    query = form.cleaned_data["q"]
+    limit = form.cleaned_data["limit"] or DEFAULT_LIMIT
+    return JsonResponse({"query": query, "suggestions": index.suggest(query, limit)})
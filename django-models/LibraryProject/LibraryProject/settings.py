@@ -75,10 +75,21 @@ WSGI_APPLICATION = 'LibraryProject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# WAL lets the relationship_app pages read while the admin writes; the busy
+# timeout waits out a write lock instead of failing with "database is locked".
+SQLITE_OPTIONS = {
+    'init_command': 'PRAGMA journal_mode=WAL;',
+    'timeout': 20,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        # Reuse connections for 10 minutes; see advanced-api-project's settings.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 